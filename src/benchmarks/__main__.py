@@ -0,0 +1,141 @@
+import sys
+from pathlib import Path
+
+import click
+from loguru import logger
+
+from src.utils.paths import DATA_DIR_PATH
+
+from .mock_server import MockServerConfig
+from .suite import (
+    BENCHMARKS,
+    DEFAULT_REGRESSION_TOLERANCE,
+    DEFAULT_REPEAT,
+    BenchmarkComparison,
+    BenchmarkRun,
+    SuiteConfig,
+    compare_runs,
+    find_baseline,
+    load_run,
+    run_suite,
+    save_run,
+)
+
+DEFAULT_RESULTS_DIR = (DATA_DIR_PATH / "benchmarks").resolve()
+
+tolerance_option = click.option(
+    "--tolerance",
+    default=DEFAULT_REGRESSION_TOLERANCE,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Relative slowdown of a benchmark mean counted as a regression",
+)
+
+
+def _log_run(run: BenchmarkRun) -> None:
+    for result in run.results:
+        logger.info(
+            f"{result.name:<45} mean {result.mean * 1000:10.2f} ms ± {result.stdev * 1000:8.2f} ms"
+            f" {result.throughput:12.1f} items/s"
+        )
+
+
+def _log_comparisons(comparisons: list[BenchmarkComparison]) -> bool:
+    """Log the comparisons, return whether any benchmark regressed"""
+    for comparison in comparisons:
+        log = logger.warning if comparison.is_regression else logger.info
+        log(
+            f"{comparison.name:<45} {comparison.baseline_mean * 1000:10.2f} ms ->"
+            f" {comparison.current_mean * 1000:10.2f} ms ({comparison.change:+.1%})"
+            f"{' REGRESSION' if comparison.is_regression else ''}"
+        )
+    return any(comparison.is_regression for comparison in comparisons)
+
+
+def _warn_config_mismatch(baseline: BenchmarkRun, current: BenchmarkRun) -> None:
+    if baseline.config != current.config:
+        logger.warning(
+            f"The baseline was run with another config, the comparison may not be meaningful: {baseline.config} vs"
+            f" {current.config}"
+        )
+
+
+@click.group()
+def cli() -> None:
+    """Benchmarks of the parsers, models, ndjson files and crawls against a local mock of the ToS;DR servers"""
+    # the clients log every request, only warnings are useful while timing them
+    logger.remove()
+    logger.add(sys.stderr, filter={"": "WARNING", "src.benchmarks": "INFO", "__main__": "INFO"})
+
+
+@cli.command()
+@click.option(
+    "--only", multiple=True, type=click.Choice(list(BENCHMARKS)), help="Run only these benchmarks, default to all"
+)
+@click.option("--repeat", default=DEFAULT_REPEAT, show_default=True, type=click.IntRange(min=1))
+@click.option(
+    "--results-dir",
+    default=DEFAULT_RESULTS_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+)
+@click.option(
+    "--baseline",
+    default=None,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path),
+    help="Results to compare with, default to the latest results in the results directory run with the same config",
+)
+@click.option("--latency", default=0.0, show_default=True, type=click.FloatRange(min=0), help="Mock server latency")
+@click.option(
+    "--throttle-rate",
+    default=0.0,
+    show_default=True,
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of the mock server responses that are 429",
+)
+@tolerance_option
+@click.option("--fail-on-regression", is_flag=True, default=False, help="Exit with an error on a regression")
+def run(  # noqa: PLR0913
+    only: tuple[str, ...],
+    repeat: int,
+    results_dir: Path,
+    baseline: None | Path,
+    latency: float,
+    throttle_rate: float,
+    tolerance: float,
+    fail_on_regression: bool,
+) -> None:
+    """Run the benchmarks, save their results and compare them with a baseline"""
+    config = SuiteConfig(
+        repeat=repeat,
+        crawl_server=MockServerConfig(num_services=300, num_cases=50, latency=latency, throttle_rate=throttle_rate),
+    )
+    baseline = baseline or find_baseline(results_dir=results_dir, config=config)
+    current = run_suite(config=config, names=only or None)
+    _log_run(current)
+    logger.info(f"Saved results to {save_run(run=current, results_dir=results_dir)}")
+    if not baseline:
+        logger.info("No previous results run with the same config to compare with")
+        return
+    logger.info(f"Comparing with {baseline}")
+    baseline_run = load_run(baseline)
+    _warn_config_mismatch(baseline=baseline_run, current=current)
+    has_regression = _log_comparisons(compare_runs(baseline=baseline_run, current=current, tolerance=tolerance))
+    if has_regression and fail_on_regression:
+        raise click.ClickException("Benchmarks regressed")
+
+
+@cli.command()
+@click.argument("baseline_file", type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path))
+@click.argument("current_file", type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path))
+@tolerance_option
+def compare(baseline_file: Path, current_file: Path, tolerance: float) -> None:
+    """Compare two saved results"""
+    baseline, current = load_run(baseline_file), load_run(current_file)
+    _warn_config_mismatch(baseline=baseline, current=current)
+    comparisons = compare_runs(baseline=baseline, current=current, tolerance=tolerance)
+    if _log_comparisons(comparisons):
+        raise click.ClickException("Benchmarks regressed")
+
+
+if __name__ == "__main__":
+    cli()
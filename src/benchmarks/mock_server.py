@@ -0,0 +1,250 @@
+import asyncio
+import html
+import math
+import random
+from collections import Counter
+from types import TracebackType
+
+from aiohttp import web
+from aiohttp.typedefs import Handler
+from pydantic import BaseModel
+
+__all__ = [
+    "MockServerConfig",
+    "MockToSDRServer",
+    "make_case_page_html",
+    "make_case_payload",
+    "make_service_payload",
+    "make_services_metadata_page_payload",
+]
+
+_TIMESTAMP = "2023-01-01T00:00:00+00:00"
+_RATINGS = ("A", "B", "C", "D", "E")
+_CLASSIFICATIONS = ("good", "neutral", "bad", "blocker")
+_STATUSES = ("APPROVED", "DECLINED", "PENDING")
+
+
+class MockServerConfig(BaseModel):
+    num_services: int = 1000
+    num_cases: int = 200
+    page_size: int = 100
+    points_per_service: int = 20
+    case_points_per_case: int = 50
+    # every response is delayed by `latency` plus a uniform random delay up to `latency_jitter` seconds
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    # fraction of the requests answered by a 429 with a `Retry-After` of `retry_after` seconds
+    throttle_rate: float = 0.0
+    retry_after: float = 0.0
+    seed: int = 0
+
+
+def _page_info(total: int, page_size: int, current: int) -> dict:
+    return {"total": total, "current": current, "start": 1, "end": max(math.ceil(total / page_size), 1)}
+
+
+def _page_ids(total: int, page_size: int, page: int) -> range:
+    start = (page - 1) * page_size + 1
+    return range(start, min(start + page_size, total + 1))
+
+
+def make_service_payload(service_id: int, num_points: int = 20) -> dict:
+    """A service as returned by `/service/v1?service=`"""
+    return {
+        "id": service_id,
+        "name": f"Service {service_id}",
+        "rating": _RATINGS[service_id % len(_RATINGS)],
+        "urls": [f"service{service_id}.example.com"],
+        "points": [
+            {
+                "id": service_id * 1000 + i,
+                "title": f"Point {i} of service {service_id}",
+                "status": _STATUSES[i % len(_STATUSES)].lower(),
+                "analysis": f"The service {service_id} shares your data with {i} partners for advertising.",
+                "case_id": i,
+                "source": None,
+                "document_id": service_id,
+                "created_at": _TIMESTAMP,
+                "updated_at": _TIMESTAMP,
+            }
+            for i in range(num_points)
+        ],
+        "documents": [
+            {
+                "id": service_id,
+                "name": "Terms of Service",
+                "url": f"https://service{service_id}.example.com/terms",
+                "xpath": "//main",
+                "created_at": _TIMESTAMP,
+                "updated_at": _TIMESTAMP,
+            }
+        ],
+        "created_at": _TIMESTAMP,
+        "updated_at": _TIMESTAMP,
+    }
+
+
+def _make_service_metadata_payload(service_id: int) -> dict:
+    return {
+        "id": service_id,
+        "name": f"Service {service_id}",
+        "rating": {"human": _RATINGS[service_id % len(_RATINGS)]},
+        # the v1 api sends its timestamps as objects
+        "created_at": {"timezone": "UTC", "pgsql": _TIMESTAMP, "unix": 1672531200},
+        "updated_at": {"timezone": "UTC", "pgsql": _TIMESTAMP, "unix": 1672531200},
+    }
+
+
+def make_services_metadata_page_payload(num_services: int, page: int, page_size: int = 100) -> dict:
+    """A page of services metadata as returned by `/service/v1?page=`"""
+    return {
+        "parameters": {
+            "_page": _page_info(total=num_services, page_size=page_size, current=page),
+            "services": [_make_service_metadata_payload(i) for i in _page_ids(num_services, page_size, page)],
+        }
+    }
+
+
+def make_case_payload(case_id: int) -> dict:
+    """A case as returned by `/case/v1?case=`"""
+    return {
+        "id": case_id,
+        "title": f"Case {case_id}: the service may share your data",
+        "description": f"Description of case {case_id}",
+        "classification": {"human": _CLASSIFICATIONS[case_id % len(_CLASSIFICATIONS)]},
+        "created_at": _TIMESTAMP,
+        "updated_at": _TIMESTAMP,
+    }
+
+
+def _make_case_point_row(case_id: int, index: int) -> str:
+    quote = html.escape(f'"Quote {index} of case {case_id}: we may share your personal data with our partners."')
+    status = _STATUSES[index % len(_STATUSES)]
+    return f"""<tr class="toSort" data-classification="good">
+    <th scope="row">Service {index}</th>
+    <td><a title="View more details" href="/points/{case_id * 1000 + index}">{quote}</a></td>
+    <td class="point-good"></td>
+    <td> <span class="label label-success"><span class="fa5-text"> {status}</span></span> </td>
+    <td>Author {index} </td>
+</tr>"""
+
+
+def make_case_page_html(case_id: int, num_rows: int = 50) -> str:
+    """A case page of the edit site, with the case points table the html parser reads"""
+    rows = "\n".join(_make_case_point_row(case_id, i) for i in range(num_rows))
+    return f"""<!DOCTYPE html>
+<html><head><title>Case {case_id}</title><script>var x = "<table>";</script></head>
+<body><nav><a href="/">ToS;DR</a></nav><div class="container">
+<table id="myTable" class="table table-striped">
+<thead><tr><th scope="col">Service</th><th scope="col">Title</th><th scope="col">Rating</th>
+<th scope="col">Status</th><th scope="col">Author</th></tr></thead>
+<tbody id="myTableBody">
+{rows}
+</tbody></table></div></body></html>"""
+
+
+class MockToSDRServer:
+    """Local stand-in for the `/service/v1` and `/case/v1` api endpoints and the `/cases/{id}` edit site pages.
+
+    Both clients can be pointed at `url`. Responses are generated from ids so any corpus size costs no setup, with a
+    configurable latency and a fraction of throttled requests. `request_counts` and `throttled_counts` count requests
+    per endpoint.
+    """
+
+    def __init__(self, config: None | MockServerConfig = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockServerConfig()
+        self.host = host
+        self.port = port
+        self.request_counts: Counter[str] = Counter()
+        self.throttled_counts: Counter[str] = Counter()
+        self._random = random.Random(self.config.seed)
+        self._runner: None | web.AppRunner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._delay_and_throttle])
+        app.router.add_get("/service/v1", self._handle_service)
+        app.router.add_get("/service/v1/", self._handle_service)
+        app.router.add_get("/case/v1", self._handle_case)
+        app.router.add_get("/case/v1/", self._handle_case)
+        app.router.add_get("/cases/{case_id}", self._handle_case_page)
+        return app
+
+    @web.middleware
+    async def _delay_and_throttle(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        endpoint = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.request_counts[endpoint] += 1
+        config = self.config
+        delay = config.latency + self._random.uniform(0, config.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if config.throttle_rate and self._random.random() < config.throttle_rate:
+            self.throttled_counts[endpoint] += 1
+            raise web.HTTPTooManyRequests(headers={"Retry-After": f"{config.retry_after:g}"})
+        return await handler(request)
+
+    @staticmethod
+    def _int_param(request: web.Request, name: str) -> None | int:
+        value = request.query.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=f"Invalid {name}: {value}") from e
+
+    async def _handle_service(self, request: web.Request) -> web.Response:
+        config = self.config
+        service_id = self._int_param(request, "service")
+        if service_id is not None:
+            if not 1 <= service_id <= config.num_services:
+                raise web.HTTPNotFound()
+            return web.json_response({"parameters": make_service_payload(service_id, config.points_per_service)})
+        page = self._int_param(request, "page") or 1
+        return web.json_response(make_services_metadata_page_payload(config.num_services, page, config.page_size))
+
+    async def _handle_case(self, request: web.Request) -> web.Response:
+        config = self.config
+        case_id = self._int_param(request, "case")
+        if case_id is not None:
+            if not 1 <= case_id <= config.num_cases:
+                raise web.HTTPNotFound()
+            return web.json_response({"parameters": make_case_payload(case_id)})
+        page = self._int_param(request, "page") or 1
+        cases = [make_case_payload(i) for i in _page_ids(config.num_cases, config.page_size, page)]
+        page_info = _page_info(total=config.num_cases, page_size=config.page_size, current=page)
+        return web.json_response({"parameters": {"_page": page_info, "cases": cases}})
+
+    async def _handle_case_page(self, request: web.Request) -> web.Response:
+        case_id = int(request.match_info["case_id"])
+        if not 1 <= case_id <= self.config.num_cases:
+            raise web.HTTPNotFound()
+        markup = make_case_page_html(case_id, num_rows=self.config.case_points_per_case)
+        return web.Response(text=markup, content_type="text/html")
+
+    async def start(self) -> "MockToSDRServer":
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=self.host, port=self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockToSDRServer":
+        return await self.start()
+
+    async def __aexit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        await self.close()
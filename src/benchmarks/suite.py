@@ -0,0 +1,261 @@
+import asyncio
+import json
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pydantic import AwareDatetime, BaseModel
+
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import (
+    APIClient,
+    EditSiteClient,
+    GetServiceMetadataPageResponse,
+    GetServiceResponse,
+    Service,
+    parse_case_point_rows_from_html,
+    parse_table_bs4,
+)
+from src.utils.file_utils import iter_ndjson_gz_models, write_pydantic_models_ndjson_gz
+
+from .mock_server import (
+    MockServerConfig,
+    MockToSDRServer,
+    make_case_page_html,
+    make_service_payload,
+    make_services_metadata_page_payload,
+)
+
+__all__ = [
+    "BENCHMARKS",
+    "BenchmarkComparison",
+    "BenchmarkResult",
+    "BenchmarkRun",
+    "SuiteConfig",
+    "compare_runs",
+    "find_baseline",
+    "load_run",
+    "run_suite",
+    "save_run",
+    "time_function",
+]
+
+DEFAULT_REPEAT = 5
+DEFAULT_REGRESSION_TOLERANCE = 0.1
+# requests per second the clients may send to the mock server, far above the production limits
+_MOCK_RATE = 10_000.0
+
+
+class BenchmarkResult(BaseModel):
+    name: str
+    repeat: int
+    items: int
+    mean: float
+    stdev: float
+    min: float  # noqa: A003
+    max: float  # noqa: A003
+
+    @property
+    def throughput(self) -> float:
+        """Items per second"""
+        return self.items / self.mean if self.mean else float("inf")
+
+
+class SuiteConfig(BaseModel):
+    repeat: int = DEFAULT_REPEAT
+    num_services: int = 1000
+    case_page_rows: int = 1000
+    crawl_server: MockServerConfig = MockServerConfig(num_services=300, num_cases=50)
+    crawl_workers: int = 20
+
+
+class BenchmarkRun(BaseModel):
+    created_at: AwareDatetime
+    python_version: str
+    platform: str
+    # None for the runs saved before the config was recorded
+    config: None | SuiteConfig = None
+    results: list[BenchmarkResult]
+
+
+class BenchmarkComparison(BaseModel):
+    name: str
+    baseline_mean: float
+    current_mean: float
+    change: float
+    is_regression: bool
+
+
+def time_function(name: str, func: Callable[[], int], repeat: int = DEFAULT_REPEAT, warmup: int = 1) -> BenchmarkResult:
+    """Time `repeat` runs of `func`, which returns the number of items it processed, after `warmup` untimed runs"""
+    for _ in range(warmup):
+        func()
+    durations = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        durations.append(time.perf_counter() - start)
+    return BenchmarkResult(
+        name=name,
+        repeat=repeat,
+        items=items,
+        mean=statistics.mean(durations),
+        stdev=statistics.stdev(durations) if len(durations) > 1 else 0.0,
+        min=min(durations),
+        max=max(durations),
+    )
+
+
+def _bench_html_parser(config: SuiteConfig) -> list[BenchmarkResult]:
+    markup = make_case_page_html(case_id=1, num_rows=config.case_page_rows).encode("utf-8")
+    return [
+        time_function(
+            "html_parser.lxml", lambda: len(list(parse_case_point_rows_from_html(markup))), repeat=config.repeat
+        ),
+        time_function("html_parser.bs4", lambda: len(list(parse_table_bs4(markup))), repeat=config.repeat),
+    ]
+
+
+def _bench_model_validation(config: SuiteConfig) -> list[BenchmarkResult]:
+    """Decoding of raw response bodies, as done by the clients"""
+    bodies = [
+        json.dumps({"parameters": make_service_payload(i)}).encode("utf-8") for i in range(1, config.num_services + 1)
+    ]
+    page = json.dumps(
+        make_services_metadata_page_payload(num_services=config.num_services, page=1, page_size=config.num_services)
+    ).encode("utf-8")
+
+    def _validate_services() -> int:
+        return len([GetServiceResponse.model_validate_json(body).service for body in bodies])
+
+    def _validate_metadata_page() -> int:
+        return len(GetServiceMetadataPageResponse.model_validate_json(page).services_metadata)
+
+    return [
+        time_function("model_validation.service", _validate_services, repeat=config.repeat),
+        time_function("model_validation.services_metadata_page", _validate_metadata_page, repeat=config.repeat),
+    ]
+
+
+def _bench_ndjson(config: SuiteConfig) -> list[BenchmarkResult]:
+    services = [Service.model_validate(make_service_payload(i)) for i in range(1, config.num_services + 1)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_file = Path(tmp_dir) / "services.ndjson.gz"
+
+        def _write() -> int:
+            return write_pydantic_models_ndjson_gz(models=services, output_file=output_file)
+
+        def _read() -> int:
+            return sum(len(batch) for batch in iter_ndjson_gz_models(input_path=output_file, model_type=Service))
+
+        return [
+            time_function("ndjson.write_services", _write, repeat=config.repeat),
+            time_function("ndjson.read_services", _read, repeat=config.repeat),
+        ]
+
+
+async def _crawl(server_config: MockServerConfig, num_workers: int) -> int:
+    """Crawl every service, case and case point of a mock server, return the number of downloaded items"""
+    async with MockToSDRServer(config=server_config) as server:
+        api_client = APIClient(
+            num_workers=num_workers, rate_limiter=AdaptiveRateLimiter(initial_rate=_MOCK_RATE, max_rate=_MOCK_RATE)
+        )
+        edit_client = EditSiteClient(
+            num_workers=num_workers, rate_limiter=AdaptiveRateLimiter(initial_rate=_MOCK_RATE, max_rate=_MOCK_RATE)
+        )
+        api_client.base_url = edit_client.base_url = server.url
+        async with api_client, edit_client:
+            services_ids = [serv_meta.id async for serv_meta in api_client.async_iter_all_services_metadata()]
+            services = [serv async for _, serv in api_client.async_iter_services(services_ids=services_ids)]
+            cases = [case async for case in api_client.async_iter_all_cases()]
+            case_points = [
+                cps async for _, cps in edit_client.async_iter_case_points(case_ids=[case.id for case in cases])
+            ]
+    failures = [res for res in (*services, *case_points) if isinstance(res, Exception)]
+    if failures:
+        raise RuntimeError(f"{len(failures)} requests failed during the crawl, e.g. {failures[0]}")
+    return len(services) + len(cases) + sum(len(cps) for cps in case_points if isinstance(cps, list))
+
+
+def _bench_crawl(config: SuiteConfig) -> list[BenchmarkResult]:
+    return [
+        time_function(
+            "crawl.end_to_end",
+            lambda: asyncio.run(_crawl(server_config=config.crawl_server, num_workers=config.crawl_workers)),
+            repeat=config.repeat,
+            warmup=0,
+        )
+    ]
+
+
+BENCHMARKS: dict[str, Callable[[SuiteConfig], list[BenchmarkResult]]] = {
+    "html_parser": _bench_html_parser,
+    "model_validation": _bench_model_validation,
+    "ndjson": _bench_ndjson,
+    "crawl": _bench_crawl,
+}
+
+
+def run_suite(config: None | SuiteConfig = None, names: None | Iterable[str] = None) -> BenchmarkRun:
+    config = config or SuiteConfig()
+    names = list(names or BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)}, expected some of {list(BENCHMARKS)}")
+    return BenchmarkRun(
+        created_at=datetime.now(tz=timezone.utc),
+        python_version=platform.python_version(),
+        platform=platform.platform(),
+        config=config,
+        results=[result for name in names for result in BENCHMARKS[name](config)],
+    )
+
+
+def save_run(run: BenchmarkRun, results_dir: Path) -> Path:
+    """Save a run as `<results_dir>/<timestamp>.json`, the file names sort chronologically"""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    run_file = results_dir / f"{run.created_at.strftime('%Y%m%dT%H%M%S%f')}.json"
+    run_file.write_text(run.model_dump_json(indent=2), encoding="utf-8")
+    return run_file
+
+
+def load_run(run_file: Path) -> BenchmarkRun:
+    return BenchmarkRun.model_validate_json(run_file.read_text(encoding="utf-8"))
+
+
+def find_baseline(results_dir: Path, config: SuiteConfig) -> None | Path:
+    """Latest saved run made with the same config, timings of runs with different configs are not comparable"""
+    if not results_dir.exists():
+        return None
+    for run_file in sorted(results_dir.glob("*.json"), reverse=True):
+        if load_run(run_file).config == config:
+            return run_file
+    return None
+
+
+def compare_runs(
+    baseline: BenchmarkRun, current: BenchmarkRun, tolerance: float = DEFAULT_REGRESSION_TOLERANCE
+) -> list[BenchmarkComparison]:
+    """Compare the mean durations of the benchmarks of both runs, slower by more than `tolerance` is a regression"""
+    baseline_results = {result.name: result for result in baseline.results}
+    comparisons = []
+    for result in current.results:
+        baseline_result = baseline_results.get(result.name)
+        if not baseline_result:
+            continue
+        change = result.mean / baseline_result.mean - 1 if baseline_result.mean else 0.0
+        comparisons.append(
+            BenchmarkComparison(
+                name=result.name,
+                baseline_mean=baseline_result.mean,
+                current_mean=result.mean,
+                change=change,
+                is_regression=change > tolerance,
+            )
+        )
+    return comparisons
@@ -1,12 +1,146 @@
+import asyncio
+import itertools
+import math
+import time
 from abc import ABC
-from typing import Any
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Iterable
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from types import TracebackType
+from typing import Any, Generic, TypeVar
 
-import requests
-from aiohttp.client import ClientSession, _RequestContextManager
+import backoff
+from aiohttp import ClientResponseError, TCPConnector
+from aiohttp.client import ClientResponse, ClientSession, _RequestContextManager
+from backoff.types import Details
+from loguru import logger
 from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
 from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from yarl import URL
+
+from .metrics import ClientMetrics, EndpointKey, normalize_endpoint
+from .rate_limiter import AdaptiveRateLimiter, is_throttled
+from .response_cache import CachedResponse, CacheEntry, ResponseCache
 
 DEFAULT_TIMEOUT = 10.0
+DEFAULT_NUM_WORKERS = 16
+DEFAULT_MAX_TRIES = 10
+
+ItemType = TypeVar("ItemType")
+ResultType = TypeVar("ResultType")
+ClientType = TypeVar("ClientType", bound="BaseAPIClient")
+FuncType = TypeVar("FuncType", bound=Callable[..., Any])
+
+_WORKER_DONE = object()
+
+
+async def iter_worker_pool(
+    func: Callable[[ItemType], Awaitable[ResultType]],
+    items: Iterable[ItemType],
+    num_workers: int = DEFAULT_NUM_WORKERS,
+) -> AsyncIterator[tuple[ItemType, ResultType | Exception]]:
+    """Run `func` over `items` with a fixed number of workers, yield `(item, result or exception)` in completion order.
+
+    Workers lazily pull the next item from the shared items iterator and hand results over through a bounded queue, so
+    the number of coroutines and buffered results stays constant however many items there are.
+    """
+    if num_workers < 1:
+        raise ValueError(f"num_workers must be positive: {num_workers}")
+
+    items_iter = iter(items)
+    results: asyncio.Queue[Any] = asyncio.Queue(maxsize=num_workers)
+
+    async def _worker() -> None:
+        try:
+            for item in items_iter:
+                try:
+                    res: ResultType | Exception = await func(item)
+                except Exception as e:
+                    res = e
+                await results.put((item, res))
+        except Exception as e:
+            # the items iterator itself failed
+            await results.put(e)
+            return
+        await results.put(_WORKER_DONE)
+
+    workers = [asyncio.create_task(_worker()) for _ in range(num_workers)]
+    running_workers = len(workers)
+    try:
+        while running_workers:
+            entry = await results.get()
+            if entry is _WORKER_DONE:
+                running_workers -= 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield entry
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+
+class PriorityWorkerPool(Generic[ItemType, ResultType]):
+    """Run `func` over items submitted while it runs, lowest priority first, with a fixed number of workers.
+
+    Unlike `iter_worker_pool`, items can be `put` while the results are consumed with `iter_results`, e.g. ids read
+    from listing pages as they arrive, until the pool is closed. Items of equal priority run in submission order.
+    """
+
+    def __init__(
+        self, func: Callable[[ItemType], Awaitable[ResultType]], num_workers: int = DEFAULT_NUM_WORKERS
+    ) -> None:
+        if num_workers < 1:
+            raise ValueError(f"num_workers must be positive: {num_workers}")
+        self.func = func
+        self.num_workers = num_workers
+        self._items: asyncio.PriorityQueue[tuple[float, int, Any]] = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self.closed = False
+
+    def put(self, item: ItemType, priority: float = 0.0) -> None:
+        if self.closed:
+            raise RuntimeError("Cannot put items into a closed worker pool")
+        self._items.put_nowait((priority, next(self._counter), item))
+
+    def close(self) -> None:
+        """No more items will be put, the workers stop once the queued items are done"""
+        if self.closed:
+            return
+        self.closed = True
+        for _ in range(self.num_workers):
+            self._items.put_nowait((math.inf, next(self._counter), _WORKER_DONE))
+
+    async def iter_results(self) -> AsyncIterator[tuple[ItemType, ResultType | Exception]]:
+        """Yield `(item, result or exception)` in completion order until the pool is closed and drained"""
+        results: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.num_workers)
+
+        async def _worker() -> None:
+            while True:
+                _, _, item = await self._items.get()
+                if item is _WORKER_DONE:
+                    await results.put(_WORKER_DONE)
+                    return
+                try:
+                    res: ResultType | Exception = await self.func(item)
+                except Exception as e:
+                    res = e
+                await results.put((item, res))
+
+        workers = [asyncio.create_task(_worker()) for _ in range(self.num_workers)]
+        running_workers = len(workers)
+        try:
+            while running_workers:
+                entry = await results.get()
+                if entry is _WORKER_DONE:
+                    running_workers -= 1
+                else:
+                    yield entry
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
 
 class BaseAPIOperation(BaseModel, ABC):
@@ -30,11 +164,147 @@ class BaseAPIOperation(BaseModel, ABC):
         return val
 
 
+class ConnectionPoolConfig(BaseModel):
+    limit: int = 64
+    limit_per_host: int = 16
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+
+
 class BaseAPIClient:
-    def __init__(self, base_url: str, default_timeout: float = DEFAULT_TIMEOUT) -> None:
+    """Base of the API clients, owning long-lived pooled sessions reused by every request.
+
+    Sessions are created lazily, the async one is bound to the event loop it was created in. Use the client as a
+    context manager, or call `close` / `aclose`, to release the connections. Requests are recorded in `metrics`, which
+    can be shared between clients.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        base_url: str,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        rate_limiter: None | AdaptiveRateLimiter = None,
+        response_cache: None | ResponseCache = None,
+        pool_config: None | ConnectionPoolConfig = None,
+        metrics: None | ClientMetrics = None,
+    ) -> None:
         self.base_url = base_url
         self.default_timeout = default_timeout
+        self.num_workers = num_workers
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(name=base_url)
+        self.response_cache = response_cache
+        self.pool_config = pool_config or ConnectionPoolConfig()
+        self.metrics = metrics or ClientMetrics()
         self.default_req_params = {"timeout": self.default_timeout}  # enforce ruff S113
+        self._session: None | Session = None
+        self._async_session: None | ClientSession = None
+        self._async_session_loop: None | asyncio.AbstractEventLoop = None
+
+    @property
+    def session(self) -> Session:
+        """Pooled keep-alive sync session"""
+        if not self._session:
+            self._session = Session()
+            limit, limit_per_host = self.pool_config.limit, self.pool_config.limit_per_host
+            # `pool_connections` is the number of cached host pools, `pool_maxsize` the connections kept per host
+            adapter = HTTPAdapter(pool_connections=max(limit // limit_per_host, 1), pool_maxsize=limit_per_host)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def get_async_session(self) -> ClientSession:
+        """Pooled keep-alive async session with DNS caching, bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_session and not self._async_session.closed and self._async_session_loop is loop:
+            return self._async_session
+        self._drop_foreign_async_session()
+
+        connector = TCPConnector(
+            limit=self.pool_config.limit,
+            limit_per_host=self.pool_config.limit_per_host,
+            ttl_dns_cache=self.pool_config.dns_cache_ttl,
+            keepalive_timeout=self.pool_config.keepalive_timeout,
+        )
+        self._async_session = ClientSession(
+            connector=connector,
+            raise_for_status=True,
+            trace_configs=[self.metrics.trace_config(key_func=self.metrics_key)],
+        )
+        self._async_session_loop = loop
+        return self._async_session
+
+    def close(self) -> None:
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    def _drop_foreign_async_session(self) -> None:
+        """Drop an async session bound to another event loop, it can only be closed by `aclose` on that loop.
+
+        A loop running in another thread is asked to close it, otherwise its connections leak.
+        """
+        session, loop = self._async_session, self._async_session_loop
+        self._async_session = None
+        self._async_session_loop = None
+        if session is None or session.closed or loop is None:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        logger.warning(
+            f"The async session of {self.base_url} was not closed by `aclose` on its event loop, its connections leak"
+        )
+
+    async def aclose(self) -> None:
+        if self._async_session and self._async_session_loop is asyncio.get_running_loop():
+            await self._async_session.close()
+            self._async_session = None
+            self._async_session_loop = None
+        self._drop_foreign_async_session()
+        self.close()
+
+    def run(self, aw: Coroutine[Any, Any, ResultType]) -> ResultType:
+        """Run a coroutine from sync code in a fresh event loop, closing the async session bound to it afterward"""
+
+        async def _run() -> ResultType:
+            try:
+                return await aw
+            finally:
+                await self.aclose()
+
+        return asyncio.run(_run())
+
+    def __enter__(self: ClientType) -> ClientType:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        self.close()
+
+    async def __aenter__(self: ClientType) -> ClientType:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        await self.aclose()
+
+    def metrics_key(self, url: str | URL) -> EndpointKey:
+        """Key of the metrics of a request url, ids in the path are replaced so that an endpoint has a single key"""
+        url = URL(url)
+        return url.host or "", normalize_endpoint(url.path)
+
+    def get_rate_limiter(self, url: str | URL) -> AdaptiveRateLimiter:
+        """Rate limiter pacing the requests to an url, a single one for the whole client by default"""
+        return self.rate_limiter
 
     def _build_req_params(self, api_op: None | BaseAPIOperation = None, **kwargs: Any) -> dict[str, Any]:
         if api_op:
@@ -44,6 +314,21 @@ class BaseAPIClient:
             req_kwargs = {}
         return {**self.default_req_params, **req_kwargs, **kwargs}
 
+    def _lookup_cache(self, req_kwargs: dict[str, Any]) -> tuple[None | str, None | CacheEntry]:
+        """Cache key and entry of a request, stale entries add their revalidation headers to `req_kwargs`"""
+        if not self.response_cache:
+            return None, None
+        cache_key = self.response_cache.build_key(
+            method=req_kwargs["method"], url=req_kwargs["url"], params=req_kwargs.get("params")
+        )
+        entry = self.response_cache.get(cache_key) if cache_key else None
+        if entry and not self.response_cache.is_fresh(entry):
+            req_kwargs["headers"] = {
+                **(req_kwargs.get("headers") or {}),
+                **self.response_cache.conditional_headers(entry),
+            }
+        return cache_key, entry
+
     def request(
         self,
         session: None | Session = None,
@@ -52,8 +337,30 @@ class BaseAPIClient:
         **kwargs: Any,
     ) -> Response:
         req_kwargs = self._build_req_params(api_op=api_op, **kwargs)
-        req_func = session.request if session else requests.request
-        resp = req_func(**req_kwargs)
+        metrics_key = self.metrics_key(req_kwargs["url"])
+        cache_key, entry = self._lookup_cache(req_kwargs=req_kwargs)
+        if self.response_cache and entry and self.response_cache.is_fresh(entry):
+            self.metrics.record_cache_hit(metrics_key)
+            return self.response_cache.to_response(entry=entry, url=req_kwargs["url"]).to_requests_response()
+
+        start = time.monotonic()
+        try:
+            resp = (session or self.session).request(**req_kwargs)
+        except Exception as e:
+            self.metrics.observe_request(key=metrics_key, duration=time.monotonic() - start, error=e)
+            raise
+        self.metrics.observe_request(
+            key=metrics_key,
+            duration=time.monotonic() - start,
+            status=resp.status_code,
+            bytes_received=len(resp.content),
+        )
+        if self.response_cache and cache_key:
+            if entry and resp.status_code == HTTPStatus.NOT_MODIFIED:
+                entry = self.response_cache.refresh(entry=entry)
+                return self.response_cache.to_response(entry=entry, url=req_kwargs["url"]).to_requests_response()
+            if resp.status_code == HTTPStatus.OK:
+                self.response_cache.put(key=cache_key, headers=resp.headers, body=resp.content)
         if raise_for_status:
             resp.raise_for_status()
         return resp
@@ -66,3 +373,64 @@ class BaseAPIClient:
     ) -> _RequestContextManager:
         req_kwargs = self._build_req_params(api_op=api_op, **kwargs)
         return session.request(**req_kwargs)
+
+    @asynccontextmanager
+    async def async_send(
+        self,
+        session: None | ClientSession = None,
+        api_op: None | BaseAPIOperation = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ClientResponse | CachedResponse]:
+        """Rate limited request going through the response cache when there is one.
+
+        Fresh cache hits skip the rate limiter, stale entries are revalidated with a conditional request. Default to the
+        client's pooled session.
+        """
+        req_kwargs = self._build_req_params(api_op=api_op, **kwargs)
+        metrics_key = self.metrics_key(req_kwargs["url"])
+        cache_key, entry = self._lookup_cache(req_kwargs=req_kwargs)
+        if self.response_cache and entry and self.response_cache.is_fresh(entry):
+            self.metrics.record_cache_hit(metrics_key)
+            yield self.response_cache.to_response(entry=entry, url=req_kwargs["url"])
+            return
+
+        session = session or self.get_async_session()
+        wait_start = time.monotonic()
+        async with self.get_rate_limiter(req_kwargs["url"]):
+            self.metrics.observe_rate_limit_wait(key=metrics_key, duration=time.monotonic() - wait_start)
+            async with session.request(**req_kwargs) as resp:
+                if not self.response_cache or not cache_key:
+                    yield resp
+                    return
+                if entry and resp.status == HTTPStatus.NOT_MODIFIED:
+                    entry = self.response_cache.refresh(entry=entry)
+                elif resp.status == HTTPStatus.OK:
+                    entry = self.response_cache.put(key=cache_key, headers=resp.headers, body=await resp.read())
+                else:
+                    yield resp
+                    return
+        yield self.response_cache.to_response(entry=entry, url=req_kwargs["url"])
+
+
+def _record_retry(details: Details) -> None:
+    """Count a retry in the metrics of the client the retried method is bound to"""
+    client = details["args"][0] if details["args"] else None
+    # backoff passes the retried exception to the handlers of `on_exception`
+    exception = details.get("exception")
+    if isinstance(client, BaseAPIClient) and isinstance(exception, ClientResponseError):
+        client.metrics.record_retry(client.metrics_key(exception.request_info.url))
+
+
+def retry_on_throttle(max_tries: int = DEFAULT_MAX_TRIES) -> Callable[[FuncType], FuncType]:
+    """Retry a coroutine on 429. The wait is left to the `AdaptiveRateLimiter` it goes through, which knows the
+    `Retry-After` and the reduced rate, so retries are not delayed twice. Retries of `BaseAPIClient` methods are counted
+    in the client metrics."""
+    return backoff.on_exception(
+        wait_gen=backoff.constant,
+        exception=ClientResponseError,
+        max_tries=max_tries,
+        giveup=lambda e: not is_throttled(e),
+        interval=0,
+        jitter=None,
+        on_backoff=_record_retry,
+    )
@@ -0,0 +1,326 @@
+import json
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable, Iterable
+from types import SimpleNamespace
+from typing import Any
+
+from aiohttp import ClientResponseError, ClientSession, TraceConfig
+from aiohttp.tracing import (
+    TraceRequestChunkSentParams,
+    TraceRequestEndParams,
+    TraceRequestExceptionParams,
+    TraceRequestStartParams,
+    TraceResponseChunkReceivedParams,
+)
+from pydantic import BaseModel
+from yarl import URL
+
+__all__ = [
+    "ClientMetrics",
+    "EndpointKey",
+    "EndpointSummary",
+    "Histogram",
+    "normalize_endpoint",
+]
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEFAULT_METRICS_PREFIX = "tosdr_client"
+
+# `(host, endpoint)` label values of a metric
+EndpointKey = tuple[str, str]
+
+_ID_SEGMENT_RE = re.compile(r"(?<=/)\d+(?=/|$)")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Replace the numeric segments of a path so requests of one resource share their metrics, e.g. `/cases/{id}`"""
+    return _ID_SEGMENT_RE.sub("{id}", path) or "/"
+
+
+class Histogram:
+    """Prometheus-like histogram, counting observations in buckets of upper bounds `buckets`"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # the last count is the `+Inf` bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        if other.buckets != self.buckets:
+            raise ValueError(f"Cannot merge histograms of different buckets: {self.buckets}, {other.buckets}")
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts, strict=True)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within its bucket, like Prometheus `histogram_quantile`"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"Expected 0 <= q <= 1: {q}")
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+        return self.max
+
+
+class EndpointSummary(BaseModel):
+    host: str
+    endpoint: str
+    requests: int
+    statuses: dict[int, int]
+    errors: dict[str, int]
+    retries: int
+    cache_hits: int
+    bytes_sent: int
+    bytes_received: int
+    latency_mean: float
+    latency_p50: float
+    latency_p95: float
+    latency_max: float
+    rate_limit_wait_mean: float
+    rate_limit_wait_max: float
+
+    def format_line(self) -> str:
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items()))
+        errors = sum(self.errors.values())
+        return (
+            f"{self.host}{self.endpoint}: {self.requests} requests ({statuses or 'no response'}), "
+            f"{self.retries} retries, {errors} errors, {self.cache_hits} cache hits, "
+            f"latency mean {self.latency_mean:.3f}s p50 {self.latency_p50:.3f}s p95 {self.latency_p95:.3f}s "
+            f"max {self.latency_max:.3f}s, rate limit wait mean {self.rate_limit_wait_mean:.3f}s "
+            f"max {self.rate_limit_wait_max:.3f}s, {self.bytes_received / 1024:.1f} KiB received"
+        )
+
+
+def _default_key(url: URL) -> EndpointKey:
+    return url.host or "", normalize_endpoint(url.path)
+
+
+class ClientMetrics:
+    """Counters and histograms of the requests of the clients, keyed by `(host, endpoint)`.
+
+    Async requests are observed by the aiohttp `TraceConfig` of `trace_config`, sync requests, rate limiter waits,
+    retries and cache hits are recorded by the clients. A single instance can be shared by several clients. Dump with
+    `to_prometheus` in the Prometheus text format or `to_json` as per endpoint summaries.
+    """
+
+    def __init__(self, latency_buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.latency_buckets = tuple(latency_buckets)
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests: Counter[EndpointKey] = Counter()
+        self.statuses: Counter[tuple[EndpointKey, int]] = Counter()
+        self.errors: Counter[tuple[EndpointKey, str]] = Counter()
+        self.retries: Counter[EndpointKey] = Counter()
+        self.cache_hits: Counter[EndpointKey] = Counter()
+        self.bytes_sent: Counter[EndpointKey] = Counter()
+        self.bytes_received: Counter[EndpointKey] = Counter()
+        self.latency: defaultdict[EndpointKey, Histogram] = defaultdict(self._new_histogram)
+        self.rate_limit_wait: defaultdict[EndpointKey, Histogram] = defaultdict(self._new_histogram)
+
+    def _new_histogram(self) -> Histogram:
+        return Histogram(buckets=self.latency_buckets)
+
+    def merge(self, other: "ClientMetrics") -> None:
+        """Add the metrics of `other` to these"""
+        self.requests.update(other.requests)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+        self.retries.update(other.retries)
+        self.cache_hits.update(other.cache_hits)
+        self.bytes_sent.update(other.bytes_sent)
+        self.bytes_received.update(other.bytes_received)
+        for key, histogram in other.latency.items():
+            self.latency[key].merge(histogram)
+        for key, histogram in other.rate_limit_wait.items():
+            self.rate_limit_wait[key].merge(histogram)
+
+    def observe_request(  # noqa: PLR0913
+        self,
+        key: EndpointKey,
+        duration: float,
+        status: None | int = None,
+        error: None | BaseException = None,
+        bytes_received: int = 0,
+    ) -> None:
+        """Record a completed request, with the status of its response or the error it failed with"""
+        self.requests[key] += 1
+        self.latency[key].observe(duration)
+        if status is not None:
+            self.statuses[key, status] += 1
+        if error is not None:
+            self.errors[key, type(error).__name__] += 1
+        self.bytes_received[key] += bytes_received
+
+    def observe_rate_limit_wait(self, key: EndpointKey, duration: float) -> None:
+        self.rate_limit_wait[key].observe(duration)
+
+    def record_retry(self, key: EndpointKey) -> None:
+        self.retries[key] += 1
+
+    def record_cache_hit(self, key: EndpointKey) -> None:
+        self.cache_hits[key] += 1
+
+    def trace_config(self, key_func: Callable[[URL], EndpointKey] = _default_key) -> TraceConfig:
+        """Trace config observing the requests of an aiohttp session, `key_func` gives the key of a request url"""
+        trace_config = TraceConfig()
+
+        async def _on_request_start(
+            session: ClientSession, ctx: SimpleNamespace, params: TraceRequestStartParams
+        ) -> None:
+            ctx.key = key_func(params.url)
+            ctx.start = time.monotonic()
+            ctx.done = False
+
+        async def _on_request_chunk_sent(
+            session: ClientSession, ctx: SimpleNamespace, params: TraceRequestChunkSentParams
+        ) -> None:
+            self.bytes_sent[ctx.key] += len(params.chunk)
+
+        async def _on_request_end(session: ClientSession, ctx: SimpleNamespace, params: TraceRequestEndParams) -> None:
+            # the latency is the time to the response headers, the body is read by the caller
+            self.observe_request(key=ctx.key, duration=time.monotonic() - ctx.start, status=params.response.status)
+            ctx.done = True
+
+        async def _on_request_exception(
+            session: ClientSession, ctx: SimpleNamespace, params: TraceRequestExceptionParams
+        ) -> None:
+            if ctx.done:
+                return
+            duration = time.monotonic() - ctx.start
+            # a session raising for status fails the request of an error response before its end
+            if isinstance(params.exception, ClientResponseError):
+                self.observe_request(key=ctx.key, duration=duration, status=params.exception.status)
+            else:
+                self.observe_request(key=ctx.key, duration=duration, error=params.exception)
+
+        async def _on_response_chunk_received(
+            session: ClientSession, ctx: SimpleNamespace, params: TraceResponseChunkReceivedParams
+        ) -> None:
+            self.bytes_received[ctx.key] += len(params.chunk)
+
+        # the signals expect variadic callbacks
+        callbacks: list[tuple[Any, Callable[..., Awaitable[None]]]] = [
+            (trace_config.on_request_start, _on_request_start),
+            (trace_config.on_request_chunk_sent, _on_request_chunk_sent),
+            (trace_config.on_request_end, _on_request_end),
+            (trace_config.on_request_exception, _on_request_exception),
+            (trace_config.on_response_chunk_received, _on_response_chunk_received),
+        ]
+        for signal, callback in callbacks:
+            signal.append(callback)
+        trace_config.freeze()
+        return trace_config
+
+    def keys(self) -> list[EndpointKey]:
+        return sorted({*self.requests, *self.cache_hits, *self.rate_limit_wait})
+
+    def summarize(self, key: EndpointKey) -> EndpointSummary:
+        latency = self.latency.get(key) or self._new_histogram()
+        rate_limit_wait = self.rate_limit_wait.get(key) or self._new_histogram()
+        return EndpointSummary(
+            host=key[0],
+            endpoint=key[1],
+            requests=self.requests[key],
+            statuses={status: count for (k, status), count in self.statuses.items() if k == key},
+            errors={error: count for (k, error), count in self.errors.items() if k == key},
+            retries=self.retries[key],
+            cache_hits=self.cache_hits[key],
+            bytes_sent=self.bytes_sent[key],
+            bytes_received=self.bytes_received[key],
+            latency_mean=latency.mean,
+            latency_p50=latency.quantile(0.5),
+            latency_p95=latency.quantile(0.95),
+            latency_max=latency.max,
+            rate_limit_wait_mean=rate_limit_wait.mean,
+            rate_limit_wait_max=rate_limit_wait.max,
+        )
+
+    def summaries(self) -> list[EndpointSummary]:
+        return [self.summarize(key) for key in self.keys()]
+
+    def to_json(self, indent: None | int = None) -> str:
+        return json.dumps([summary.model_dump(mode="json") for summary in self.summaries()], indent=indent)
+
+    def to_prometheus(self, prefix: str = DEFAULT_METRICS_PREFIX) -> str:
+        """Dump the metrics in the Prometheus text exposition format"""
+        lines: list[str] = []
+
+        def _labels(key: EndpointKey, **extra: str) -> str:
+            labels = {"host": key[0], "endpoint": key[1], **extra}
+            escaped = (f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+            return "{" + ",".join(escaped) + "}"
+
+        def _counter(name: str, help_text: str, values: Iterable[tuple[str, float]]) -> None:
+            lines.extend([f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"])
+            lines.extend(f"{prefix}_{name}{labels} {value:g}" for labels, value in values)
+
+        def _histogram(name: str, help_text: str, histograms: dict[EndpointKey, Histogram]) -> None:
+            lines.extend([f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} histogram"])
+            for key, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip([*histogram.buckets, float("inf")], histogram.counts, strict=True):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{prefix}_{name}_bucket{_labels(key, le=le)} {cumulative}")
+                lines.append(f"{prefix}_{name}_sum{_labels(key)} {histogram.sum:g}")
+                lines.append(f"{prefix}_{name}_count{_labels(key)} {histogram.count}")
+
+        _counter("requests_total", "Requests sent", ((_labels(k), v) for k, v in sorted(self.requests.items())))
+        _counter(
+            "responses_total",
+            "Responses by status",
+            ((_labels(k, status=str(s)), v) for (k, s), v in sorted(self.statuses.items())),
+        )
+        _counter(
+            "errors_total",
+            "Requests failed without a response, by exception type",
+            ((_labels(k, error=e), v) for (k, e), v in sorted(self.errors.items())),
+        )
+        _counter(
+            "retries_total", "Throttled requests retried", ((_labels(k), v) for k, v in sorted(self.retries.items()))
+        )
+        _counter(
+            "cache_hits_total",
+            "Requests answered from the response cache",
+            ((_labels(k), v) for k, v in sorted(self.cache_hits.items())),
+        )
+        _counter(
+            "sent_bytes_total", "Request body bytes", ((_labels(k), v) for k, v in sorted(self.bytes_sent.items()))
+        )
+        _counter(
+            "received_bytes_total",
+            "Response body bytes",
+            ((_labels(k), v) for k, v in sorted(self.bytes_received.items())),
+        )
+        _histogram("request_duration_seconds", "Time to the response headers", self.latency)
+        _histogram("rate_limit_wait_seconds", "Time waiting for the rate limiter", self.rate_limit_wait)
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
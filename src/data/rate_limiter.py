@@ -0,0 +1,113 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from types import TracebackType
+
+from aiohttp import ClientResponseError
+from loguru import logger
+from requests import codes
+
+__all__ = [
+    "AdaptiveRateLimiter",
+    "is_throttled",
+    "parse_retry_after",
+]
+
+
+def parse_retry_after(value: None | str) -> None | float:
+    """Parse a `Retry-After` header, either delay seconds or an HTTP date, into a delay in seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid Retry-After header: {value}")
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(tz=timezone.utc)).total_seconds(), 0.0)
+
+
+def is_throttled(e: BaseException) -> bool:
+    return isinstance(e, ClientResponseError) and e.status == codes.too_many
+
+
+class AdaptiveRateLimiter:
+    """AIMD rate limiter: the rate grows additively while requests succeed and is cut multiplicatively on throttling.
+
+    Used as an async context manager around a request, a `ClientResponseError` 429 raised within the block cuts the rate
+    and blocks every acquisition until its `Retry-After` has elapsed.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        initial_rate: float = 1.0,
+        min_rate: float = 0.1,
+        max_rate: float = 10.0,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        name: str = "",
+    ) -> None:
+        if not 0 < min_rate <= initial_rate <= max_rate:
+            raise ValueError(
+                f"Expected 0 < min_rate <= initial_rate <= max_rate: {min_rate}, {initial_rate}, {max_rate}"
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be in (0, 1): {decrease_factor}")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.name = name
+        self._rate = initial_rate
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Current rate in requests per second"""
+        return self._rate
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name} {self._rate:.2f} req/s)"
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            start_at = max(self._next_slot, self._blocked_until)
+            if start_at <= now:
+                self._next_slot = now + 1 / self._rate
+                return
+            await asyncio.sleep(start_at - now)
+
+    def on_success(self) -> None:
+        self._rate = min(self._rate + self.increase_step, self.max_rate)
+
+    def on_throttle(self, retry_after: None | float = None) -> None:
+        self._rate = max(self._rate * self.decrease_factor, self.min_rate)
+        now = time.monotonic()
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+        # the next request should not go out before the reduced rate allows it
+        self._next_slot = max(self._next_slot, now + 1 / self._rate)
+        logger.warning(f"Throttled, {self} (retry after: {retry_after})")
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        if exc_val is None:
+            self.on_success()
+        elif isinstance(exc_val, ClientResponseError) and is_throttled(exc_val):
+            retry_after = exc_val.headers.get("Retry-After") if exc_val.headers else None
+            self.on_throttle(retry_after=parse_retry_after(retry_after))
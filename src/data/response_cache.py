@@ -0,0 +1,252 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Mapping
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from pydantic import BaseModel
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+__all__ = [
+    "CacheEntry",
+    "CachedResponse",
+    "ResponseCache",
+]
+
+DEFAULT_TTL = 24 * 60 * 60.0
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+# access times of cache hits are written in batches
+ACCESS_FLUSH_SIZE = 100
+EVICT_BATCH_SIZE = 100
+CACHEABLE_METHODS = ("GET", "HEAD")
+# only headers still meaningful once the body is decoded are stored
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    body_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_body_hash ON entries (body_hash);
+"""
+
+
+class CacheEntry(BaseModel):
+    key: str
+    body_hash: str
+    size: int
+    headers: dict[str, str]
+    stored_at: float
+    accessed_at: float
+
+    @property
+    def etag(self) -> None | str:
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self) -> None | str:
+        return self.headers.get("Last-Modified")
+
+
+class CachedResponse:
+    """Minimal stand-in for an aiohttp `ClientResponse` served from the cache"""
+
+    def __init__(self, url: str, headers: Mapping[str, str], body: bytes, status: int = HTTPStatus.OK) -> None:
+        self.url = url
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return self._body.decode(encoding)
+
+    async def json(self, content_type: None | str = None, **kwargs: Any) -> Any:
+        return json.loads(self._body)
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def to_requests_response(self) -> Response:
+        resp = Response()
+        resp.url = self.url
+        resp.status_code = self.status
+        resp.headers = self.headers
+        resp._content = self._body
+        resp.encoding = "utf-8"
+        return resp
+
+
+class ResponseCache:
+    """On-disk cache of successful responses with TTL, size based LRU eviction and revalidation validators.
+
+    Entries are keyed on method, url and params. Bodies are content-addressed so identical responses are stored once,
+    the entries index lives in a sqlite database next to them. The total size is read once and then kept up to date by
+    this instance, and the access times of hits are written in batches, so a lookup costs a single indexed query.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.bodies_dir = self.cache_dir / "bodies"
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._conn = sqlite3.connect(self.cache_dir / "index.sqlite3")
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT SUM(size) FROM (SELECT DISTINCT body_hash, size FROM entries)").fetchone()
+        self._size: int = row[0] or 0
+        self._pending_accesses: dict[str, float] = {}
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def flush(self) -> None:
+        """Write the access times of the hits not written yet"""
+        if not self._pending_accesses:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_accesses.items()],
+            )
+        self._pending_accesses.clear()
+
+    @staticmethod
+    def build_key(method: str, url: str, params: None | Mapping[str, Any] = None) -> None | str:
+        """Cache key of a request, `None` if the request is not cacheable"""
+        method = method.upper()
+        if method not in CACHEABLE_METHODS:
+            return None
+        params_items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        raw_key = json.dumps([method, url, params_items])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _body_path(self, body_hash: str) -> Path:
+        return self.bodies_dir / body_hash[:2] / body_hash
+
+    def get(self, key: str) -> None | CacheEntry:
+        row = self._conn.execute(
+            "SELECT key, body_hash, size, headers, stored_at, accessed_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        entry = CacheEntry(
+            key=row[0], body_hash=row[1], size=row[2], headers=json.loads(row[3]), stored_at=row[4], accessed_at=row[5]
+        )
+        if not self._body_path(entry.body_hash).exists():
+            logger.warning(f"Cache body of {key} is missing, dropping entry")
+            self.delete(key)
+            return None
+        entry.accessed_at = self._pending_accesses[key] = time.time()
+        if len(self._pending_accesses) >= ACCESS_FLUSH_SIZE:
+            self.flush()
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def read_body(self, entry: CacheEntry) -> bytes:
+        return self._body_path(entry.body_hash).read_bytes()
+
+    def to_response(self, entry: CacheEntry, url: str) -> CachedResponse:
+        return CachedResponse(url=url, headers=entry.headers, body=self.read_body(entry))
+
+    def put(self, key: str, headers: Mapping[str, str], body: bytes) -> CacheEntry:
+        body_hash = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(body_hash)
+        if not body_path.exists():
+            body_path.parent.mkdir(exist_ok=True)
+            tmp_path = body_path.with_suffix(".tmp")
+            tmp_path.write_bytes(body)
+            tmp_path.replace(body_path)
+
+        now = time.time()
+        entry = CacheEntry(
+            key=key,
+            body_hash=body_hash,
+            size=len(body),
+            headers={h: headers[h] for h in STORED_HEADERS if h in headers},
+            stored_at=now,
+            accessed_at=now,
+        )
+        previous = self._conn.execute("SELECT body_hash, size FROM entries WHERE key = ?", (key,)).fetchone()
+        is_new_body = not self._is_referenced(body_hash)
+        self._pending_accesses.pop(key, None)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body_hash, entry.size, json.dumps(entry.headers), now, now),
+            )
+        if is_new_body:
+            self._size += entry.size
+        if previous and previous[0] != body_hash:
+            self._release_body(body_hash=previous[0], size=previous[1])
+        if self._size > self.max_size:
+            self.evict()
+        return entry
+
+    def refresh(self, entry: CacheEntry) -> CacheEntry:
+        """Mark an entry as fresh again, e.g. after a `304 Not Modified`"""
+        entry.stored_at = time.time()
+        with self._conn:
+            self._conn.execute("UPDATE entries SET stored_at = ? WHERE key = ?", (entry.stored_at, entry.key))
+        return entry
+
+    def _is_referenced(self, body_hash: str) -> bool:
+        return bool(self._conn.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone())
+
+    def _release_body(self, body_hash: str, size: int) -> None:
+        """Delete a body no entry refers to anymore"""
+        if not self._is_referenced(body_hash):
+            self._body_path(body_hash).unlink(missing_ok=True)
+            self._size -= size
+
+    def delete(self, key: str) -> None:
+        self._pending_accesses.pop(key, None)
+        row = self._conn.execute("SELECT body_hash, size FROM entries WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._release_body(body_hash=row[0], size=row[1])
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored bodies"""
+        return self._size
+
+    def evict(self) -> None:
+        """Drop least recently accessed entries until the cache fits in `max_size`"""
+        self.flush()
+        while self._size > self.max_size:
+            rows = self._conn.execute(
+                "SELECT key FROM entries ORDER BY accessed_at LIMIT ?", (EVICT_BATCH_SIZE,)
+            ).fetchall()
+            if not rows:
+                return
+            for (key,) in rows:
+                if self._size <= self.max_size:
+                    return
+                self.delete(key)
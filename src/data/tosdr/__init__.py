@@ -1,7 +1,44 @@
-from . import api_client, edit_site_client, html_parser, models
+from . import (
+    api_client,
+    case_index,
+    chunks,
+    crawl,
+    documents,
+    edit_site_client,
+    html_parser,
+    models,
+    parquet_export,
+    records,
+    store,
+    summaries,
+    sync,
+)
 from .api_client import *
+from .case_index import *
+from .chunks import *
+from .crawl import *
+from .documents import *
 from .edit_site_client import *
 from .html_parser import *
 from .models import *
+from .parquet_export import *
+from .records import *
+from .store import *
+from .summaries import *
+from .sync import *
 
-__all__ = api_client.__all__ + models.__all__ + edit_site_client.__all__ + html_parser.__all__
+__all__ = (
+    api_client.__all__
+    + models.__all__
+    + edit_site_client.__all__
+    + documents.__all__
+    + case_index.__all__
+    + chunks.__all__
+    + crawl.__all__
+    + html_parser.__all__
+    + parquet_export.__all__
+    + records.__all__
+    + store.__all__
+    + summaries.__all__
+    + sync.__all__
+)
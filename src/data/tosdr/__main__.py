@@ -1,11 +1,58 @@
 import asyncio
+import hashlib
+import itertools
+from collections.abc import AsyncIterator, Coroutine, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Any, TextIO, TypeVar
 
 import click
 from loguru import logger
 
-from src.data.tosdr import APIClient, Case, EditSiteClient, ServiceMetadata
-from src.utils.file_utils import read_ndjson_gz, write_pydantic_models_ndjson_gz
+from src.data.base_client import BaseAPIClient, ClientType
+from src.data.metrics import ClientMetrics
+from src.data.response_cache import DEFAULT_TTL, ResponseCache
+from src.data.tosdr import (
+    APIClient,
+    Case,
+    CaseIndex,
+    CasePoint,
+    CorpusStore,
+    DocumentClient,
+    DocumentTextStore,
+    EditSiteClient,
+    Service,
+    ServiceHeader,
+    ServiceMetadata,
+    ServicesSyncPlan,
+    case_label_texts,
+    case_point_key,
+    chunk_corpus,
+    crawl_all,
+    download_documents,
+    export_case_points_parquet,
+    export_cases_parquet,
+    export_services_parquet,
+    merge_services_snapshot,
+    plan_services_sync,
+    read_services_headers,
+    read_services_timestamps,
+    summarize_documents,
+)
+from src.text.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, ChunkCache, TextChunker
+from src.text.dedup import DEFAULT_THRESHOLD, MinHasher, MinHashLSH
+from src.text.summarizer import DEFAULT_NUM_SENTENCES, ExtractiveSummarizer
+from src.text.tfidf import TfidfVocabulary
+from src.utils.checkpoint import CrawlCheckpoint
+from src.utils.file_utils import (
+    DEFAULT_COMPRESS_LEVEL,
+    async_write_pydantic_models_ndjson_gz,
+    iter_ndjson_gz_models,
+    read_ndjson_gz_field,
+    write_pydantic_models_ndjson_gz,
+)
+from src.utils.parquet_utils import DEFAULT_ROW_GROUP_SIZE
 from src.utils.paths import DATA_DIR_PATH
 
 TOSDR_DATA_DIR = (DATA_DIR_PATH / "tosdr").resolve()
@@ -13,11 +60,176 @@ DEFAULT_ALL_SERVICES_METADATA_OUTPUT_FILE = TOSDR_DATA_DIR / "all_services_metad
 DEFAULT_ALL_SERVICES_OUTPUT_FILE = TOSDR_DATA_DIR / "all_services.ndjson.gz"
 DEFAULT_ALL_CASES_OUTPUT_FILE = TOSDR_DATA_DIR / "all_cases.ndjson.gz"
 DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE = TOSDR_DATA_DIR / "all_case_points.ndjson.gz"
+DEFAULT_PARQUET_OUTPUT_DIR = TOSDR_DATA_DIR / "parquet"
+DEFAULT_STORE_FILE = TOSDR_DATA_DIR / "tosdr.sqlite3"
+DEFAULT_DOCUMENTS_OUTPUT_DIR = TOSDR_DATA_DIR / "documents"
+DEFAULT_DEDUP_INDEX_FILE = TOSDR_DATA_DIR / "dedup_index.npz"
+DEFAULT_DUPLICATES_OUTPUT_FILE = TOSDR_DATA_DIR / "duplicates.ndjson.gz"
+DEFAULT_VOCABULARY_FILE = TOSDR_DATA_DIR / "tfidf_vocabulary.json"
+DEFAULT_SUMMARIES_OUTPUT_FILE = TOSDR_DATA_DIR / "summaries.ndjson.gz"
+DEFAULT_CASE_INDEX_DIR = TOSDR_DATA_DIR / "case_index"
+DEFAULT_CHUNK_CACHE_FILE = TOSDR_DATA_DIR / "chunk_cache.sqlite3"
+DEFAULT_CHUNKS_OUTPUT_FILE = TOSDR_DATA_DIR / "chunks.ndjson.gz"
+
+ResultType = TypeVar("ResultType")
+
+compress_level_option = click.option(
+    "--compress-level",
+    default=DEFAULT_COMPRESS_LEVEL,
+    show_default=True,
+    type=click.IntRange(min=0, max=9),
+    help="gzip compression level of the output file",
+)
+
+resume_option = click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Resume from the checkpoint of a previous run, skipping already completed ids",
+)
+
+cache_dir_option = click.option(
+    "--cache-dir",
+    default=None,
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+    help="Cache responses in this directory, revalidating them on later runs",
+)
+
+
+class CliState:
+    """Event loop and clients shared by the chained commands of one invocation, so their connections are reused.
+
+    The requests of the clients are recorded in `metrics` until `flush_metrics`, which adds them to `total_metrics`.
+    """
+
+    def __init__(self, metrics_file: None | Path = None) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.metrics = ClientMetrics()
+        self.total_metrics = ClientMetrics()
+        self.metrics_file = metrics_file
+        self._clients: dict[tuple[type[BaseAPIClient], None | Path, float], BaseAPIClient] = {}
+        self._process_pools: dict[int, ProcessPoolExecutor] = {}
+
+    def get_client(self, client_type: type[ClientType], cache_dir: None | Path, ttl: float = DEFAULT_TTL) -> ClientType:
+        key = (client_type, cache_dir, ttl)
+        if key not in self._clients:
+            response_cache = ResponseCache(cache_dir=cache_dir, ttl=ttl) if cache_dir else None
+            self._clients[key] = client_type(  # type: ignore[call-arg]
+                response_cache=response_cache, metrics=self.metrics
+            )
+        return self._clients[key]  # type: ignore[return-value]
+
+    def get_process_pool(self, max_workers: int) -> ProcessPoolExecutor:
+        if max_workers not in self._process_pools:
+            self._process_pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+        return self._process_pools[max_workers]
+
+    def run(self, aw: Coroutine[Any, Any, ResultType]) -> ResultType:
+        return self.loop.run_until_complete(aw)
+
+    def flush_metrics(self) -> None:
+        """Log the per endpoint breakdown of the requests of the last command"""
+        for summary in self.metrics.summaries():
+            logger.info(summary.format_line())
+        self.total_metrics.merge(self.metrics)
+        self.metrics.reset()
+
+    def write_metrics(self, metrics_file: Path) -> None:
+        """Write the metrics of every command as JSON for a `.json` file, in the Prometheus text format otherwise"""
+        self.total_metrics.merge(self.metrics)
+        self.metrics.reset()
+        metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        if metrics_file.suffix == ".json":
+            metrics_file.write_text(self.total_metrics.to_json(indent=2), encoding="utf-8")
+        else:
+            metrics_file.write_text(self.total_metrics.to_prometheus(), encoding="utf-8")
+        logger.info(f"Wrote request metrics to {metrics_file}")
+
+    def close(self) -> None:
+        if self.metrics_file:
+            self.write_metrics(metrics_file=self.metrics_file)
+        for client in self._clients.values():
+            self.run(client.aclose())
+            if client.response_cache:
+                client.response_cache.close()
+        self._clients.clear()
+        for pool in self._process_pools.values():
+            pool.shutdown()
+        self._process_pools.clear()
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+
+
+def _finalize_checkpoint(checkpoint: CrawlCheckpoint) -> None:
+    if checkpoint.failed_ids:
+        logger.warning(f"{len(checkpoint.failed_ids)} ids failed, keeping {checkpoint.path} to retry with --resume")
+    else:
+        checkpoint.remove()
+
+
+def _write_checkpoint_results(checkpoint: CrawlCheckpoint, output_file: Path, compress_level: int) -> int:
+    count = write_pydantic_models_ndjson_gz(
+        models=checkpoint.iter_results(), output_file=output_file, compress_level=compress_level
+    )
+    _finalize_checkpoint(checkpoint=checkpoint)
+    return count
+
+
+async def _download_services_headers(
+    client: APIClient, metadata_file: Path, compress_level: int
+) -> dict[int, ServiceHeader]:
+    headers: dict[int, ServiceHeader] = {}
 
+    async def _collect_headers() -> AsyncIterator[ServiceMetadata]:
+        async for serv_meta in client.async_iter_all_services_metadata():
+            headers[serv_meta.id] = ServiceHeader.from_metadata(serv_meta)
+            yield serv_meta
 
-@click.group()
-def cli() -> None:
-    pass
+    await async_write_pydantic_models_ndjson_gz(
+        models=_collect_headers(), output_file=metadata_file, compress_level=compress_level
+    )
+    return headers
+
+
+def _plan_services_sync(headers: dict[int, ServiceHeader], previous: Mapping[int, datetime]) -> ServicesSyncPlan:
+    """Plan the sync of the listed services against the `updated_at` of the previous snapshot"""
+    return plan_services_sync(
+        current={serv_id: header.updated_at for serv_id, header in headers.items()}, previous=previous, headers=headers
+    )
+
+
+def _merge_services_checkpoint(
+    checkpoint: CrawlCheckpoint[Service],
+    plan: ServicesSyncPlan,
+    previous_file: Path,
+    output_file: Path,
+    compress_level: int,
+) -> int:
+    """Merge the services fetched in a checkpoint with the previous snapshot, then finalize the checkpoint"""
+    count = merge_services_snapshot(
+        previous_file=previous_file,
+        fetched_services=checkpoint.iter_results(),
+        plan=plan,
+        output_file=output_file,
+        compress_level=compress_level,
+    )
+    _finalize_checkpoint(checkpoint=checkpoint)
+    return count
+
+
+@click.group(chain=True)
+@click.option(
+    "--metrics-file",
+    default=None,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Write the request metrics of all commands to this file, as JSON for a .json file, Prometheus text otherwise",
+)
+@click.pass_context
+def cli(ctx: click.Context, metrics_file: None | Path) -> None:
+    """Chained commands, e.g. `download-all-services-metadata download-all-services`, share pooled connections"""
+    state = CliState(metrics_file=metrics_file)
+    ctx.obj = state
+    ctx.call_on_close(state.close)
 
 
 @cli.command()
@@ -27,11 +239,22 @@ def cli() -> None:
     default=DEFAULT_ALL_SERVICES_METADATA_OUTPUT_FILE,
     type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
 )
-def download_all_services_metadata(output_file: Path) -> None:
+@compress_level_option
+@cache_dir_option
+@click.pass_obj
+def download_all_services_metadata(
+    state: CliState, output_file: Path, compress_level: int, cache_dir: None | Path
+) -> None:
     """Download all services metadata to a gzipped ndjson file"""
-    client = APIClient()
-    services_metadata = client.get_all_services_metadata()
-    write_pydantic_models_ndjson_gz(models=services_metadata, output_file=output_file)
+    client = state.get_client(APIClient, cache_dir=cache_dir)
+    services_metadata = client.async_iter_all_services_metadata()
+    count = state.run(
+        async_write_pydantic_models_ndjson_gz(
+            models=services_metadata, output_file=output_file, compress_level=compress_level
+        )
+    )
+    logger.info(f"Downloaded {count} services metadata")
+    state.flush_metrics()
 
 
 @cli.command()
@@ -46,15 +269,56 @@ def download_all_services_metadata(output_file: Path) -> None:
     default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
     type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
 )
-def download_all_services(metadata_file: Path, output_file: Path) -> None:
+@compress_level_option
+@resume_option
+@cache_dir_option
+@click.option(
+    "--only-updated",
+    is_flag=True,
+    default=False,
+    help="Only download the services new or updated since the existing output file, keep and refresh the others "
+    "from the metadata file",
+)
+@click.pass_obj
+def download_all_services(  # noqa: PLR0913
+    state: CliState,
+    metadata_file: Path,
+    output_file: Path,
+    compress_level: int,
+    resume: bool,
+    cache_dir: None | Path,
+    only_updated: bool,
+) -> None:
     """Download all services to a gzipped ndjson file"""
-    services_metadata = read_ndjson_gz(input_path=metadata_file)
-    services_ids = [ServiceMetadata.model_validate(serv).id for serv in services_metadata]
+    plan = None
+    if only_updated:
+        plan = _plan_services_sync(
+            headers=read_services_headers(metadata_file=metadata_file),
+            previous=read_services_timestamps(services_file=output_file),
+        )
+        services_ids = plan.fetch_ids
+    else:
+        services_ids = read_ndjson_gz_field(input_path=metadata_file, field="id")
 
-    logger.info(f"Downloading {len(services_ids)} services")
-    client = APIClient()
-    services = asyncio.run(client.async_get_services(services_ids=services_ids))
-    write_pydantic_models_ndjson_gz(models=services, output_file=output_file)
+    client = state.get_client(APIClient, cache_dir=cache_dir)
+    with CrawlCheckpoint(output_file=output_file, model_type=Service, resume=resume) as checkpoint:
+        pending_ids = [serv_id for serv_id in services_ids if serv_id not in checkpoint.done_ids]
+        logger.info(f"Downloading {len(pending_ids)} services ({len(services_ids) - len(pending_ids)} already done)")
+        state.run(checkpoint.record_all(client.async_iter_services(services_ids=pending_ids)))
+        if plan is None:
+            count = _write_checkpoint_results(
+                checkpoint=checkpoint, output_file=output_file, compress_level=compress_level
+            )
+        else:
+            count = _merge_services_checkpoint(
+                checkpoint=checkpoint,
+                plan=plan,
+                previous_file=output_file,
+                output_file=output_file,
+                compress_level=compress_level,
+            )
+    logger.info(f"Downloaded {count} services")
+    state.flush_metrics()
 
 
 @cli.command()
@@ -64,11 +328,18 @@ def download_all_services(metadata_file: Path, output_file: Path) -> None:
     default=DEFAULT_ALL_CASES_OUTPUT_FILE,
     type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
 )
-def download_all_cases(output_file: Path) -> None:
+@compress_level_option
+@cache_dir_option
+@click.pass_obj
+def download_all_cases(state: CliState, output_file: Path, compress_level: int, cache_dir: None | Path) -> None:
     """Download all cases to a gzipped ndjson file"""
-    client = APIClient()
-    cases = client.get_all_cases()
-    write_pydantic_models_ndjson_gz(models=cases, output_file=output_file)
+    client = state.get_client(APIClient, cache_dir=cache_dir)
+    cases = client.async_iter_all_cases()
+    count = state.run(
+        async_write_pydantic_models_ndjson_gz(models=cases, output_file=output_file, compress_level=compress_level)
+    )
+    logger.info(f"Downloaded {count} cases")
+    state.flush_metrics()
 
 
 @cli.command()
@@ -83,15 +354,557 @@ def download_all_cases(output_file: Path) -> None:
     default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
     type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
 )
-def download_all_case_points(all_cases_file: Path, output_file: Path) -> None:
+@compress_level_option
+@resume_option
+@cache_dir_option
+@click.option(
+    "--parse-processes",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Parse the case pages in a pool of this many processes, 0 to parse them in a thread",
+)
+@click.pass_obj
+def download_all_case_points(  # noqa: PLR0913
+    state: CliState,
+    all_cases_file: Path,
+    output_file: Path,
+    compress_level: int,
+    resume: bool,
+    cache_dir: None | Path,
+    parse_processes: int,
+) -> None:
     """Download all case points to a gzipped ndjson file"""
-    all_cases = read_ndjson_gz(input_path=all_cases_file)
-    case_ids = [Case.model_validate(case).id for case in all_cases]
+    case_ids = read_ndjson_gz_field(input_path=all_cases_file, field="id")
+
+    client = state.get_client(EditSiteClient, cache_dir=cache_dir)
+    client.parse_executor = state.get_process_pool(max_workers=parse_processes) if parse_processes else None
+    with CrawlCheckpoint(output_file=output_file, model_type=CasePoint, resume=resume) as checkpoint:
+        pending_ids = [c_id for c_id in case_ids if c_id not in checkpoint.done_ids]
+        logger.info(
+            f"Downloading case points of {len(pending_ids)} cases ({len(case_ids) - len(pending_ids)} already done)"
+        )
+        state.run(checkpoint.record_all(client.async_iter_case_points(case_ids=pending_ids)))
+        count = _write_checkpoint_results(checkpoint=checkpoint, output_file=output_file, compress_level=compress_level)
+    logger.info(f"Downloaded {count} case points")
+    state.flush_metrics()
+
+
+@cli.command(name="download-documents")
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "-o",
+    "--output-dir",
+    default=DEFAULT_DOCUMENTS_OUTPUT_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+)
+@click.option("--force", is_flag=True, default=False, help="Refetch documents even if not updated since last run")
+@cache_dir_option
+@click.pass_obj
+def download_documents_text(
+    state: CliState, services_file: Path, output_dir: Path, force: bool, cache_dir: None | Path
+) -> None:
+    """Download the text of the services documents, storing each distinct text once"""
+    services = (serv for batch in iter_ndjson_gz_models(input_path=services_file, model_type=Service) for serv in batch)
+    client = state.get_client(DocumentClient, cache_dir=cache_dir)
+    state.run(
+        download_documents(client=client, services=services, store=DocumentTextStore(store_dir=output_dir), force=force)
+    )
+    state.flush_metrics()
+
+
+@cli.command()
+@click.option(
+    "--metadata-file",
+    default=DEFAULT_ALL_SERVICES_METADATA_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Previous services snapshot",
+)
+@click.option(
+    "-o",
+    "--output-file",
+    default=None,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="New services snapshot, default to overwrite the previous one",
+)
+@click.option(
+    "--store-file",
+    default=None,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Also upsert the updated services into this SQLite store",
+)
+@compress_level_option
+@resume_option
+@cache_dir_option
+@click.pass_obj
+def sync(  # noqa: PLR0913
+    state: CliState,
+    metadata_file: Path,
+    services_file: Path,
+    output_file: None | Path,
+    store_file: None | Path,
+    compress_level: int,
+    resume: bool,
+    cache_dir: None | Path,
+) -> None:
+    """Refresh the services snapshot, only downloading services updated since the previous snapshot"""
+    output_file = output_file or services_file
+    # always revalidate cached responses, a sync must see the latest updates
+    client = state.get_client(APIClient, cache_dir=cache_dir, ttl=0)
+    headers = state.run(
+        _download_services_headers(client=client, metadata_file=metadata_file, compress_level=compress_level)
+    )
+    plan = _plan_services_sync(headers=headers, previous=read_services_timestamps(services_file=services_file))
+
+    with CrawlCheckpoint(output_file=output_file, model_type=Service, resume=resume) as checkpoint:
+        pending_ids = [serv_id for serv_id in plan.fetch_ids if serv_id not in checkpoint.done_ids]
+        logger.info(f"Downloading {len(pending_ids)} updated services")
+        state.run(checkpoint.record_all(client.async_iter_services(services_ids=pending_ids)))
+        if store_file:
+            with CorpusStore(db_file=store_file) as store:
+                store.upsert_services(services=checkpoint.iter_results())
+                store.delete_services(service_ids=plan.removed_ids)
+        count = _merge_services_checkpoint(
+            checkpoint=checkpoint,
+            plan=plan,
+            previous_file=services_file,
+            output_file=output_file,
+            compress_level=compress_level,
+        )
+    logger.info(f"Synced {count} services to {output_file}")
+    state.flush_metrics()
 
-    logger.info(f"Downloading case points of {len(case_ids)} cases")
-    client = EditSiteClient()
-    services = asyncio.run(client.async_get_multiple_case_points(case_ids=case_ids))
-    write_pydantic_models_ndjson_gz(models=services, output_file=output_file)
+
+@cli.command()
+@click.option(
+    "--metadata-file",
+    default=DEFAULT_ALL_SERVICES_METADATA_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--cases-file",
+    default=DEFAULT_ALL_CASES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--case-points-file",
+    default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--only-updated",
+    is_flag=True,
+    default=False,
+    help="Only download the services new or updated since the existing services file, keep and refresh the others",
+)
+@compress_level_option
+@resume_option
+@cache_dir_option
+@click.pass_obj
+def crawl(  # noqa: PLR0913
+    state: CliState,
+    metadata_file: Path,
+    services_file: Path,
+    cases_file: Path,
+    case_points_file: Path,
+    only_updated: bool,
+    compress_level: int,
+    resume: bool,
+    cache_dir: None | Path,
+) -> None:
+    """Download services, cases and case points concurrently, each upstream host at its own rate"""
+    # an incremental crawl must see the latest updates
+    api_client = state.get_client(APIClient, cache_dir=cache_dir, ttl=0 if only_updated else DEFAULT_TTL)
+    edit_client = state.get_client(EditSiteClient, cache_dir=cache_dir)
+    previous_services = read_services_timestamps(services_file=services_file) if only_updated else None
+    with CrawlCheckpoint(
+        output_file=services_file, model_type=Service, resume=resume
+    ) as services_checkpoint, CrawlCheckpoint(
+        output_file=case_points_file, model_type=CasePoint, resume=resume
+    ) as case_points_checkpoint:
+        headers = state.run(
+            crawl_all(
+                api_client=api_client,
+                edit_client=edit_client,
+                metadata_file=metadata_file,
+                cases_file=cases_file,
+                services_checkpoint=services_checkpoint,
+                case_points_checkpoint=case_points_checkpoint,
+                previous_services=previous_services,
+                compress_level=compress_level,
+            )
+        )
+        if previous_services is None:
+            num_services = _write_checkpoint_results(
+                checkpoint=services_checkpoint, output_file=services_file, compress_level=compress_level
+            )
+        else:
+            num_services = _merge_services_checkpoint(
+                checkpoint=services_checkpoint,
+                plan=_plan_services_sync(headers=headers, previous=previous_services),
+                previous_file=services_file,
+                output_file=services_file,
+                compress_level=compress_level,
+            )
+        num_case_points = _write_checkpoint_results(
+            checkpoint=case_points_checkpoint, output_file=case_points_file, compress_level=compress_level
+        )
+    logger.info(f"Crawled {num_services} services and {num_case_points} case points")
+    state.flush_metrics()
+
+
+@cli.command()
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--cases-file",
+    default=DEFAULT_ALL_CASES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--case-points-file",
+    default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "-o",
+    "--output-dir",
+    default=DEFAULT_PARQUET_OUTPUT_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+)
+@click.option("--row-group-size", default=DEFAULT_ROW_GROUP_SIZE, show_default=True, type=click.IntRange(min=1))
+def export_parquet(
+    services_file: Path, cases_file: Path, case_points_file: Path, output_dir: Path, row_group_size: int
+) -> None:
+    """Export the downloaded dumps to normalized parquet tables, one directory per table"""
+    if services_file.exists():
+        services = (
+            serv for batch in iter_ndjson_gz_models(input_path=services_file, model_type=Service) for serv in batch
+        )
+        counts = export_services_parquet(services=services, output_dir=output_dir, row_group_size=row_group_size)
+        logger.info(f"Exported {counts} rows from {services_file}")
+    if cases_file.exists():
+        cases = (case for batch in iter_ndjson_gz_models(input_path=cases_file, model_type=Case) for case in batch)
+        count = export_cases_parquet(cases=cases, output_dir=output_dir, row_group_size=row_group_size)
+        logger.info(f"Exported {count} cases")
+    if case_points_file.exists():
+        case_points = (
+            cp for batch in iter_ndjson_gz_models(input_path=case_points_file, model_type=CasePoint) for cp in batch
+        )
+        count = export_case_points_parquet(
+            case_points=case_points, output_dir=output_dir, row_group_size=row_group_size
+        )
+        logger.info(f"Exported {count} case points")
+
+
+@cli.command()
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--cases-file",
+    default=DEFAULT_ALL_CASES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--case-points-file",
+    default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--store-file",
+    default=DEFAULT_STORE_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+def load_store(services_file: Path, cases_file: Path, case_points_file: Path, store_file: Path) -> None:
+    """Upsert the downloaded dumps into the SQLite store"""
+    with CorpusStore(db_file=store_file) as store:
+        if services_file.exists():
+            services = (
+                serv for batch in iter_ndjson_gz_models(input_path=services_file, model_type=Service) for serv in batch
+            )
+            logger.info(f"Loaded {store.upsert_services(services=services)} services")
+        if cases_file.exists():
+            cases = (case for batch in iter_ndjson_gz_models(input_path=cases_file, model_type=Case) for case in batch)
+            logger.info(f"Loaded {store.upsert_cases(cases=cases)} cases")
+        if case_points_file.exists():
+            case_points = (
+                cp for batch in iter_ndjson_gz_models(input_path=case_points_file, model_type=CasePoint) for cp in batch
+            )
+            logger.info(f"Loaded {store.upsert_case_points(case_points=case_points)} case points")
+
+
+def _iter_dedup_texts(services_file: Path, case_points_file: Path, documents_dir: Path) -> Iterator[tuple[str, str]]:
+    """`(key, text)` of the point titles, case point quotes and document texts, keys change along with the texts"""
+    if services_file.exists():
+        for services in iter_ndjson_gz_models(input_path=services_file, model_type=Service):
+            for serv in services:
+                for point in serv.points:
+                    title_hash = hashlib.sha256(point.title.encode("utf-8")).hexdigest()[:16]
+                    yield f"point:{point.id}:{title_hash}", point.title
+    if case_points_file.exists():
+        for case_points in iter_ndjson_gz_models(input_path=case_points_file, model_type=CasePoint):
+            yield from ((case_point_key(cp), cp.quote) for cp in case_points)
+    if documents_dir.exists():
+        store = DocumentTextStore(store_dir=documents_dir)
+        for record in store.load_index().values():
+            yield f"document:{record.document_id}:{record.content_hash}", store.read(record.content_hash)
+
+
+@cli.command()
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--case-points-file",
+    default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--documents-dir",
+    default=DEFAULT_DOCUMENTS_OUTPUT_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+)
+@click.option(
+    "--index-file",
+    default=DEFAULT_DEDUP_INDEX_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="LSH index, texts already indexed by a previous run are not hashed again",
+)
+@click.option(
+    "-o",
+    "--output-file",
+    default=DEFAULT_DUPLICATES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option(
+    "--threshold",
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    help="Minimum estimated Jaccard similarity of near duplicates, only used when creating the index",
+)
+@compress_level_option
+def find_duplicates(  # noqa: PLR0913
+    services_file: Path,
+    case_points_file: Path,
+    documents_dir: Path,
+    index_file: Path,
+    output_file: Path,
+    threshold: float,
+    compress_level: int,
+) -> None:
+    """Cluster near duplicate point titles, case point quotes and document texts"""
+    index = MinHashLSH.load(index_file) if index_file.exists() else MinHashLSH(threshold=threshold)
+    hasher = MinHasher(num_perm=index.num_perm)
+    new_count = 0
+    current_keys: set[str] = set()
+    for key, text in _iter_dedup_texts(services_file, case_points_file, documents_dir):
+        current_keys.add(key)
+        if key not in index:
+            index.add(key, hasher.signature(text))
+            new_count += 1
+    stale_count = len(index) - len(current_keys)
+    if stale_count:
+        # edited or removed texts, their clusters are rebuilt without them
+        index = index.subset(key for key in index if key in current_keys)
+    index.save(index_file)
+    count = write_pydantic_models_ndjson_gz(
+        models=index.clusters(), output_file=output_file, compress_level=compress_level
+    )
+    logger.info(
+        f"Indexed {new_count} new texts, dropped {stale_count} stale ones, "
+        f"found {count} clusters of near duplicates among {len(index)} texts"
+    )
+
+
+@cli.command()
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--cases-file",
+    default=DEFAULT_ALL_CASES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--documents-dir",
+    default=DEFAULT_DOCUMENTS_OUTPUT_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+)
+@click.option(
+    "--vocabulary-file",
+    default=DEFAULT_VOCABULARY_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Fitted tf-idf vocabulary, reused when it exists",
+)
+@click.option("--refit", is_flag=True, default=False, help="Fit the vocabulary again even if it exists")
+@click.option(
+    "-o",
+    "--output-file",
+    default=DEFAULT_SUMMARIES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option("--num-sentences", default=DEFAULT_NUM_SENTENCES, show_default=True, type=click.IntRange(min=1))
+@click.option("--processes", default=0, show_default=True, type=click.IntRange(min=0), help="Summarizing processes")
+@compress_level_option
+def summarize(  # noqa: PLR0913
+    services_file: Path,
+    cases_file: Path,
+    documents_dir: Path,
+    vocabulary_file: Path,
+    refit: bool,
+    output_file: Path,
+    num_sentences: int,
+    processes: int,
+    compress_level: int,
+) -> None:
+    """Summarize the downloaded documents, labeling the extracted sentences with the closest cases"""
+    services = (serv for batch in iter_ndjson_gz_models(input_path=services_file, model_type=Service) for serv in batch)
+    cases = (case for batch in iter_ndjson_gz_models(input_path=cases_file, model_type=Case) for case in batch)
+    labels = case_label_texts(cases=cases, services=services)
+    store = DocumentTextStore(store_dir=documents_dir)
+
+    if refit or not vocabulary_file.exists():
+        content_hashes = {record.content_hash for record in store.load_index().values()}
+        texts = itertools.chain(labels.values(), (store.read(content_hash) for content_hash in content_hashes))
+        vocabulary = TfidfVocabulary.fit(texts)
+        vocabulary.save(vocabulary_file)
+        logger.info(f"Fitted a vocabulary of {len(vocabulary)} terms")
+    else:
+        vocabulary = TfidfVocabulary.load(vocabulary_file)
+
+    summarizer = ExtractiveSummarizer(vocabulary=vocabulary, labels=labels, num_sentences=num_sentences)
+    summaries = summarize_documents(store=store, summarizer=summarizer, processes=processes)
+    count = write_pydantic_models_ndjson_gz(models=summaries, output_file=output_file, compress_level=compress_level)
+    logger.info(f"Summarized {count} documents")
+
+
+@cli.command()
+@click.option(
+    "--services-file",
+    default=DEFAULT_ALL_SERVICES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--documents-dir",
+    default=DEFAULT_DOCUMENTS_OUTPUT_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+)
+@click.option(
+    "--cache-file",
+    default=DEFAULT_CHUNK_CACHE_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help="Chunk boundaries of the texts already chunked with the same parameters, they are not chunked again",
+)
+@click.option(
+    "-o",
+    "--output-file",
+    default=DEFAULT_CHUNKS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+)
+@click.option("--max-tokens", default=DEFAULT_MAX_TOKENS, show_default=True, type=click.IntRange(min=1))
+@click.option("--overlap-tokens", default=DEFAULT_OVERLAP_TOKENS, show_default=True, type=click.IntRange(min=0))
+@click.option("--processes", default=0, show_default=True, type=click.IntRange(min=0), help="Chunking processes")
+@compress_level_option
+def chunk(  # noqa: PLR0913
+    services_file: Path,
+    documents_dir: Path,
+    cache_file: Path,
+    output_file: Path,
+    max_tokens: int,
+    overlap_tokens: int,
+    processes: int,
+    compress_level: int,
+) -> None:
+    """Split the downloaded document texts and the point analyses into overlapping chunks of whole sentences"""
+    services = (
+        (serv for batch in iter_ndjson_gz_models(input_path=services_file, model_type=Service) for serv in batch)
+        if services_file.exists()
+        else iter(())
+    )
+    store = DocumentTextStore(store_dir=documents_dir) if documents_dir.exists() else None
+    try:
+        chunker = TextChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+    cache = ChunkCache(db_file=cache_file)
+    try:
+        chunks = chunk_corpus(services=services, store=store, chunker=chunker, cache=cache, processes=processes)
+        count = write_pydantic_models_ndjson_gz(models=chunks, output_file=output_file, compress_level=compress_level)
+    finally:
+        cache.close()
+    logger.info(f"Wrote {count} chunks")
+
+
+@cli.command()
+@click.option(
+    "--cases-file",
+    default=DEFAULT_ALL_CASES_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--case-points-file",
+    default=DEFAULT_ALL_CASE_POINTS_OUTPUT_FILE,
+    type=click.Path(file_okay=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--index-dir",
+    default=DEFAULT_CASE_INDEX_DIR,
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=Path),
+    help="Case index, updated with the changed cases and the cases and case points not indexed yet when it exists",
+)
+def build_case_index(cases_file: Path, case_points_file: Path, index_dir: Path) -> None:
+    """Index the cases and case point quotes to suggest the cases of new passages"""
+    index = CaseIndex.load(index_dir) if index_dir.exists() else CaseIndex()
+    cases = (case for batch in iter_ndjson_gz_models(input_path=cases_file, model_type=Case) for case in batch)
+    cases_count = index.add_cases(cases)
+    if case_points_file.exists():
+        case_points = (
+            cp for batch in iter_ndjson_gz_models(input_path=case_points_file, model_type=CasePoint) for cp in batch
+        )
+        case_points_count = index.add_case_points(case_points)
+    else:
+        case_points_count = 0
+    index.save(index_dir)
+    logger.info(f"Indexed {cases_count} new or changed cases and {case_points_count} new case points")
+
+
+@cli.command()
+@click.argument("passage_file", type=click.File("r"))
+@click.option(
+    "--index-dir",
+    default=DEFAULT_CASE_INDEX_DIR,
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+)
+@click.option("--top-k", default=5, show_default=True, type=click.IntRange(min=1))
+def suggest_cases(passage_file: TextIO, index_dir: Path, top_k: int) -> None:
+    """Print the candidate cases of the passage in PASSAGE_FILE, `-` to read it from stdin, as ndjson"""
+    for candidate in CaseIndex.load(index_dir).suggest(passage_file.read(), top_k=top_k):
+        click.echo(candidate.model_dump_json())
 
 
 if __name__ == "__main__":
@@ -1,15 +1,22 @@
 import asyncio
-from typing import Generic, TypeVar
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Iterable
+from typing import Any, Generic, TypeVar
 
-import aiohttp
-import backoff
 from aiohttp.client import ClientSession
-from aiolimiter import AsyncLimiter
 from loguru import logger
 from pydantic import BaseModel
-from requests import codes
 
-from src.data.base_client import BaseAPIClient, BaseAPIOperation
+from src.data.base_client import (
+    DEFAULT_NUM_WORKERS,
+    BaseAPIClient,
+    BaseAPIOperation,
+    ConnectionPoolConfig,
+    iter_worker_pool,
+    retry_on_throttle,
+)
+from src.data.metrics import ClientMetrics
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.response_cache import ResponseCache
 
 from .models import (
     BasePage,
@@ -32,6 +39,10 @@ __all__ = [
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 PageModelType = TypeVar("PageModelType", bound=BasePage)
+PageResponseType = TypeVar("PageResponseType", bound="BasePageResponse[Any]")
+
+# pages requested along with the first page, before the page count is known
+DEFAULT_SPECULATIVE_PAGES = 4
 
 
 class BaseResponse(BaseModel, Generic[ModelType]):
@@ -76,6 +87,96 @@ class GetCasePageResponse(BasePageResponse[CasePage]):
         return self.parameters.cases
 
 
+class _PageFetcher(Generic[PageResponseType]):
+    """Page requests in flight and completed pages of `APIClient.async_iter_pages`"""
+
+    def __init__(self, get_page: Callable[[int], Coroutine[Any, Any, PageResponseType]]) -> None:
+        self.get_page = get_page
+        self.tasks: dict[asyncio.Task[PageResponseType], int] = {}
+        # pages past the end, cancelled but not awaited yet
+        self.cancelled: list[asyncio.Task[PageResponseType]] = []
+        self.next_index = 1
+        # known once a page completes
+        self.last_index: None | int = None
+        # failures before the page count is known, they may be speculative pages past the end
+        self.failures: dict[int, BaseException] = {}
+        # pages waiting to be yielded, None for failed pages
+        self.completed: dict[int, None | PageResponseType] = {}
+        self.next_yielded_index = 1
+
+    def schedule(self, count: int) -> None:
+        for _ in range(count):
+            if self.last_index is not None and self.next_index > self.last_index:
+                return
+            self.tasks[asyncio.create_task(self.get_page(self.next_index))] = self.next_index
+            self.next_index += 1
+
+    def _fail(self, page_index: int, error: BaseException) -> None:
+        logger.error(f"Failed to query page {page_index} with {self.get_page.__name__}: {error}")
+        self.completed[page_index] = None
+
+    def _set_last_index(self, last_index: int) -> None:
+        self.last_index = last_index
+        for task, page_index in list(self.tasks.items()):
+            if page_index > last_index:
+                del self.tasks[task]
+                self._drop(task)
+        for page_index, error in self.failures.items():
+            if page_index <= last_index:
+                self._fail(page_index, error)
+        self.failures.clear()
+
+    def _drop(self, task: "asyncio.Task[PageResponseType]") -> None:
+        if not task.done():
+            task.cancel()
+            self.cancelled.append(task)
+        elif not task.cancelled():
+            # retrieved so that the failure of a page past the end is not reported as never retrieved
+            task.exception()
+
+    def on_done(self, task: "asyncio.Task[PageResponseType]") -> None:
+        page_index = self.tasks.pop(task, None)
+        if page_index is None:
+            # past the end, dropped by an earlier page of the same batch
+            return
+        error = task.exception()
+        if error is not None:
+            if self.last_index is None:
+                self.failures[page_index] = error
+            elif page_index <= self.last_index:
+                self._fail(page_index, error)
+            return
+        page = task.result()
+        if self.last_index is None:
+            self._set_last_index(page.total_page_count)
+        if page_index <= (self.last_index or 0):
+            self.completed[page_index] = page
+
+    def first_failure(self) -> BaseException:
+        return self.failures[min(self.failures)]
+
+    def pop_pages(self, ordered: bool) -> list[PageResponseType]:
+        """Completed pages that can be yielded, in page order if `ordered`"""
+        if ordered:
+            pages: list[None | PageResponseType] = []
+            while self.next_yielded_index in self.completed:
+                pages.append(self.completed.pop(self.next_yielded_index))
+                self.next_yielded_index += 1
+        else:
+            pages = list(self.completed.values())
+            self.completed.clear()
+        return [page for page in pages if page is not None]
+
+    async def cancel(self) -> None:
+        """Cancel the pages still in flight and wait for every cancelled page to finish"""
+        for task in self.tasks:
+            task.cancel()
+        cancelled = [*self.tasks, *self.cancelled]
+        self.tasks.clear()
+        self.cancelled.clear()
+        await asyncio.gather(*cancelled, return_exceptions=True)
+
+
 class GetServiceOp(BaseAPIOperation):
     method: str = "GET"
     path: str = "/service/v1"
@@ -89,9 +190,22 @@ class GetCaseOp(BaseAPIOperation):
 class APIClient(BaseAPIClient):
     base_url = "https://api.tosdr.org"
 
-    def __init__(self) -> None:
-        super().__init__(base_url=self.base_url)
-        self.rate_limiter = AsyncLimiter(max_rate=1, time_period=1.5)
+    def __init__(  # noqa: PLR0913
+        self,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        rate_limiter: None | AdaptiveRateLimiter = None,
+        response_cache: None | ResponseCache = None,
+        pool_config: None | ConnectionPoolConfig = None,
+        metrics: None | ClientMetrics = None,
+    ) -> None:
+        super().__init__(
+            base_url=self.base_url,
+            num_workers=num_workers,
+            rate_limiter=rate_limiter or AdaptiveRateLimiter(initial_rate=1 / 1.5, name=self.base_url),
+            response_cache=response_cache,
+            pool_config=pool_config,
+            metrics=metrics,
+        )
 
     @staticmethod
     def _build_get_service_op(service_id: int) -> GetServiceOp:
@@ -103,84 +217,103 @@ class APIClient(BaseAPIClient):
 
     def get_service(self, service_id: int) -> Service:
         resp = self.request(api_op=self._build_get_service_op(service_id=service_id))
-        return GetServiceResponse.model_validate(resp.json()).service
-
-    @backoff.on_exception(
-        wait_gen=backoff.expo,
-        exception=aiohttp.ClientResponseError,
-        max_tries=10,
-        giveup=lambda e: e.status != codes.too_many,
-    )
-    async def async_get_service(self, session: ClientSession, service_id: int) -> Service:
-        async with self.rate_limiter, self.async_request(
-            session=session, api_op=self._build_get_service_op(service_id=service_id)
-        ) as resp:
+        return GetServiceResponse.model_validate_json(resp.content).service
+
+    @retry_on_throttle()
+    async def async_get_service(self, service_id: int, session: None | ClientSession = None) -> Service:
+        async with self.async_send(session=session, api_op=self._build_get_service_op(service_id=service_id)) as resp:
             logger.info(f"Getting service with id: {service_id}")
-            json_resp = await resp.json()
-            return GetServiceResponse.model_validate(json_resp).service
+            body = await resp.read()
+            return GetServiceResponse.model_validate_json(body).service
 
     def get_service_metadata_page(self, page_index: int) -> GetServiceMetadataPageResponse:
         resp = self.request(api_op=self._build_get_service_metadata_op(page_index=page_index))
-        return GetServiceMetadataPageResponse.model_validate(resp.json())
-
-    @backoff.on_exception(
-        wait_gen=backoff.expo,
-        exception=aiohttp.ClientResponseError,
-        max_tries=10,
-        giveup=lambda e: e.status != codes.too_many,
-    )
+        return GetServiceMetadataPageResponse.model_validate_json(resp.content)
+
+    @retry_on_throttle()
     async def async_get_service_metadata_page(
-        self, session: ClientSession, page_index: int
+        self, page_index: int, session: None | ClientSession = None
     ) -> GetServiceMetadataPageResponse:
-        async with self.rate_limiter, self.async_request(
+        async with self.async_send(
             session=session, api_op=self._build_get_service_metadata_op(page_index=page_index)
         ) as resp:
             logger.info(f"Getting service page {page_index}")
-            json_resp = await resp.json(content_type=None)
-            return GetServiceMetadataPageResponse.model_validate(json_resp)
+            body = await resp.read()
+            return GetServiceMetadataPageResponse.model_validate_json(body)
+
+    async def _async_get_pages(
+        self, get_page: Callable[[int], Awaitable[PageResponseType]], page_indices: Iterable[int]
+    ) -> list[PageResponseType]:
+        pages = []
+        async for page_idx, coro_ret in iter_worker_pool(get_page, page_indices, num_workers=self.num_workers):
+            if isinstance(coro_ret, Exception):
+                logger.error(f"Failed to query page {page_idx} with {get_page.__name__}: {coro_ret}")
+            else:
+                pages.append(coro_ret)
+        return pages
+
+    async def async_iter_pages(
+        self,
+        get_page: Callable[[int], Coroutine[Any, Any, PageResponseType]],
+        ordered: bool = False,
+        speculative_pages: int = DEFAULT_SPECULATIVE_PAGES,
+    ) -> AsyncIterator[PageResponseType]:
+        """Stream every page of a paginated resource, with up to `num_workers` pages in flight.
+
+        The first page and `speculative_pages` following pages are requested at once. The page count is read from the
+        first page to complete, then the pages past the end are cancelled, most are still waiting for the rate limiter,
+        and the remaining pages are requested. Pages are yielded in completion order, or in page order if `ordered`.
+        Failed pages are logged and skipped, unless no page succeeds before the page count is known.
+        """
+        fetcher = _PageFetcher(get_page=get_page)
+        fetcher.schedule(count=min(1 + speculative_pages, max(self.num_workers, 1)))
+        try:
+            while fetcher.tasks:
+                done, _ = await asyncio.wait(fetcher.tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    fetcher.on_done(task)
+                if fetcher.last_index is None:
+                    if not fetcher.tasks:
+                        raise fetcher.first_failure()
+                    continue
+                fetcher.schedule(count=self.num_workers - len(fetcher.tasks))
+                for page in fetcher.pop_pages(ordered=ordered):
+                    yield page
+        finally:
+            await fetcher.cancel()
 
     async def async_get_multiple_services_metadata_pages(
         self, page_indices: list[int]
     ) -> list[GetServiceMetadataPageResponse]:
-        async with ClientSession(raise_for_status=True) as session:
-            tasks = (
-                self.async_get_service_metadata_page(session=session, page_index=page_idx) for page_idx in page_indices
-            )
-
-            coro_returns = await asyncio.gather(*tasks, return_exceptions=True)
-
-            pages = []
-            for idx, coro_ret in enumerate(coro_returns):
-                if isinstance(coro_ret, Exception):
-                    logger.error(f"Failed to query service page {page_indices[idx]}: {coro_ret}")
-                else:
-                    pages.append(coro_ret)
-            return pages
+        return await self._async_get_pages(self.async_get_service_metadata_page, page_indices)
 
     def get_all_services_metadata(self) -> list[ServiceMetadata]:
-        first_page = self.get_service_metadata_page(page_index=1)
-        remaining_pages_indices = list(range(2, first_page.total_page_count + 1))
-        remaining_pages = asyncio.run(
-            self.async_get_multiple_services_metadata_pages(page_indices=remaining_pages_indices)
-        )
-        return [
-            *first_page.services_metadata,
-            *(serv_meta for page in remaining_pages for serv_meta in page.services_metadata),
-        ]
+        async def _get_all_services_metadata() -> list[ServiceMetadata]:
+            return [serv_meta async for serv_meta in self.async_iter_all_services_metadata()]
 
-    async def async_get_services(self, services_ids: list[int]) -> list[Service]:
-        async with ClientSession(raise_for_status=True) as session:
-            tasks = (self.async_get_service(session=session, service_id=serv_id) for serv_id in services_ids)
+        return self.run(_get_all_services_metadata())
+
+    async def async_iter_all_services_metadata(self, ordered: bool = False) -> AsyncIterator[ServiceMetadata]:
+        """Stream all services metadata as each page completes, holding at most a few pages per worker"""
+        async for page in self.async_iter_pages(self.async_get_service_metadata_page, ordered=ordered):
+            for serv_meta in page.services_metadata:
+                yield serv_meta
 
-            coro_returns = await asyncio.gather(*tasks, return_exceptions=True)
+    async def async_iter_services(self, services_ids: Iterable[int]) -> AsyncIterator[tuple[int, Service | Exception]]:
+        """Stream `(service_id, service or exception)` pairs in completion order"""
+        async for serv_id, coro_ret in iter_worker_pool(
+            self.async_get_service, services_ids, num_workers=self.num_workers
+        ):
+            yield serv_id, coro_ret
 
-            services = []
-            for idx, coro_ret in enumerate(coro_returns):
-                if isinstance(coro_ret, Exception):
-                    logger.error(f"Failed to query service with id {services_ids[idx]}: {coro_ret}")
-                else:
-                    services.append(coro_ret)
-            return services
+    async def async_get_services(self, services_ids: list[int]) -> list[Service]:
+        services = []
+        async for serv_id, coro_ret in self.async_iter_services(services_ids=services_ids):
+            if isinstance(coro_ret, Exception):
+                logger.error(f"Failed to query service with id {serv_id}: {coro_ret}")
+            else:
+                services.append(coro_ret)
+        return services
 
     @staticmethod
     def _build_get_case_op(case_id: int) -> GetCaseOp:
@@ -192,36 +325,30 @@ class APIClient(BaseAPIClient):
 
     def get_case(self, case_id: int) -> Case:
         resp = self.request(api_op=self._build_get_case_op(case_id=case_id))
-        return GetCaseResponse.model_validate(resp.json()).case
+        return GetCaseResponse.model_validate_json(resp.content).case
 
     def get_case_page(self, page_index: int) -> GetCasePageResponse:
         resp = self.request(api_op=self._build_get_case_page_op(page_index=page_index))
-        return GetCasePageResponse.model_validate(resp.json())
+        return GetCasePageResponse.model_validate_json(resp.content)
 
-    async def async_get_case_page(self, session: ClientSession, page_index: int) -> GetCasePageResponse:
-        async with self.rate_limiter, self.async_request(
-            session=session, api_op=self._build_get_case_page_op(page_index=page_index)
-        ) as resp:
+    @retry_on_throttle()
+    async def async_get_case_page(self, page_index: int, session: None | ClientSession = None) -> GetCasePageResponse:
+        async with self.async_send(session=session, api_op=self._build_get_case_page_op(page_index=page_index)) as resp:
             logger.info(f"Getting case page {page_index}")
-            json_resp = await resp.json(content_type=None)
-            return GetCasePageResponse.model_validate(json_resp)
+            body = await resp.read()
+            return GetCasePageResponse.model_validate_json(body)
 
     async def async_get_multiple_case_pages(self, page_indices: list[int]) -> list[GetCasePageResponse]:
-        async with ClientSession(raise_for_status=True) as session:
-            tasks = (self.async_get_case_page(session=session, page_index=page_idx) for page_idx in page_indices)
+        return await self._async_get_pages(self.async_get_case_page, page_indices)
 
-            coro_returns = await asyncio.gather(*tasks, return_exceptions=True)
-
-            pages = []
-            for idx, coro_ret in enumerate(coro_returns):
-                if isinstance(coro_ret, Exception):
-                    logger.error(f"Failed to query case page {page_indices[idx]}: {coro_ret}")
-                else:
-                    pages.append(coro_ret)
-            return pages
+    async def async_iter_all_cases(self, ordered: bool = False) -> AsyncIterator[Case]:
+        """Stream all cases as each page completes, holding at most a few pages per worker"""
+        async for page in self.async_iter_pages(self.async_get_case_page, ordered=ordered):
+            for case in page.cases:
+                yield case
 
     def get_all_cases(self) -> list[Case]:
-        first_page = self.get_case_page(page_index=1)
-        remaining_pages_indices = list(range(2, first_page.total_page_count + 1))
-        remaining_pages = asyncio.run(self.async_get_multiple_case_pages(page_indices=remaining_pages_indices))
-        return [*first_page.cases, *(case for page in remaining_pages for case in page.cases)]
+        async def _get_all_cases() -> list[Case]:
+            return [case async for case in self.async_iter_all_cases()]
+
+        return self.run(_get_all_cases())
@@ -0,0 +1,119 @@
+import hashlib
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+
+from src.text.bm25 import BM25Index
+from src.utils.file_utils import iter_ndjson_gz_models, write_pydantic_models_ndjson_gz
+
+from .models import Case, CasePoint
+
+__all__ = [
+    "CaseCandidate",
+    "CaseIndex",
+    "case_point_key",
+]
+
+DEFAULT_NUM_CANDIDATES = 5
+
+
+def case_point_key(case_point: CasePoint) -> str:
+    """Case points have no id, a quote is identified by its case, service and content"""
+    quote_hash = hashlib.sha256(case_point.quote.encode("utf-8")).hexdigest()[:16]
+    return f"case-point:{case_point.case_id}:{case_point.service_name}:{quote_hash}"
+
+
+def _key_case_id(key: str) -> int:
+    return int(key.split(":", maxsplit=2)[1])
+
+
+class CaseCandidate(BaseModel):
+    case_id: int
+    title: str
+    human_rating: str
+    score: float
+
+
+class CaseIndex:
+    """Suggest the cases of a passage from a BM25 index of the case titles and descriptions and the case point quotes.
+
+    A case is scored by its best matching text. Case points are only added once, so new ones can be added to a loaded
+    index as they are downloaded. A case already indexed is indexed again when its title or description changed.
+    """
+
+    def __init__(self, index: None | BM25Index = None, cases: None | dict[int, Case] = None) -> None:
+        self.index = index or BM25Index()
+        self.cases = cases or {}
+        self._doc_case_ids: npt.NDArray[np.int64] = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _case_text(case: Case) -> str:
+        return f"{case.title}\n{case.description}"
+
+    def add_cases(self, cases: Iterable[Case]) -> int:
+        """Index new and changed cases, return their count"""
+        count = 0
+        for case in cases:
+            previous = self.cases.get(case.id)
+            self.cases[case.id] = case
+            key = f"case:{case.id}"
+            if key in self.index:
+                if previous and self._case_text(previous) == self._case_text(case):
+                    continue
+                self.index.remove(key)
+                # the case moves to the end of the index, the case ids of the texts are in a new order
+                self._doc_case_ids = np.empty(0, dtype=np.int64)
+            self.index.add(key, self._case_text(case))
+            count += 1
+        return count
+
+    def add_case_points(self, case_points: Iterable[CasePoint]) -> int:
+        count = 0
+        for cp in case_points:
+            key = case_point_key(cp)
+            if key not in self.index:
+                self.index.add(key, cp.quote)
+                count += 1
+        return count
+
+    def _get_doc_case_ids(self) -> npt.NDArray[np.int64]:
+        if len(self._doc_case_ids) != len(self.index):
+            self._doc_case_ids = np.array([_key_case_id(key) for key in self.index.keys], dtype=np.int64)
+        return self._doc_case_ids
+
+    def suggest(self, passage: str, top_k: int = DEFAULT_NUM_CANDIDATES) -> list[CaseCandidate]:
+        """Best `top_k` cases matching a passage, cases of quotes without case metadata are left out"""
+        doc_scores = self.index.scores(passage)
+        case_ids, doc_cases = np.unique(self._get_doc_case_ids(), return_inverse=True)
+        case_scores = np.zeros(len(case_ids))
+        np.maximum.at(case_scores, doc_cases, doc_scores)
+        candidates: list[CaseCandidate] = []
+        for i in np.argsort(-case_scores, kind="stable"):
+            if case_scores[i] <= 0 or len(candidates) == top_k:
+                break
+            if case := self.cases.get(int(case_ids[i])):
+                candidates.append(
+                    CaseCandidate(
+                        case_id=case.id,
+                        title=case.title,
+                        human_rating=case.classification.human_rating,
+                        score=float(case_scores[i]),
+                    )
+                )
+        return candidates
+
+    def save(self, index_dir: Path) -> None:
+        self.index.save(Path(index_dir) / "bm25")
+        write_pydantic_models_ndjson_gz(models=self.cases.values(), output_file=Path(index_dir) / "cases.ndjson.gz")
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "CaseIndex":
+        cases = {
+            case.id: case
+            for batch in iter_ndjson_gz_models(input_path=Path(index_dir) / "cases.ndjson.gz", model_type=Case)
+            for case in batch
+        }
+        return cls(index=BM25Index.load(Path(index_dir) / "bm25"), cases=cases)
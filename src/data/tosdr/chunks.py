@@ -0,0 +1,77 @@
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from itertools import tee
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from src.text.chunker import ChunkCache, TextChunker, chunk_texts
+
+from .documents import DocumentTextStore
+from .models import Service
+
+__all__ = [
+    "CorpusChunk",
+    "chunk_corpus",
+]
+
+
+class _ChunkSource(NamedTuple):
+    source: str
+    source_id: int
+    service_id: int
+
+
+class CorpusChunk(BaseModel):
+    # "document" or "point"
+    source: str
+    source_id: int
+    service_id: int
+    index: int
+    token_count: int
+    text: str
+
+
+def _iter_source_texts(
+    services: Iterable[Service], store: None | DocumentTextStore
+) -> Iterator[tuple[list[_ChunkSource], str]]:
+    """Every distinct document text with the documents sharing it, then the analysis of every point"""
+    if store:
+        sources_by_hash: defaultdict[str, list[_ChunkSource]] = defaultdict(list)
+        for record in store.load_index().values():
+            sources_by_hash[record.content_hash].append(
+                _ChunkSource(source="document", source_id=record.document_id, service_id=record.service_id)
+            )
+        for content_hash, sources in sources_by_hash.items():
+            yield sources, store.read(content_hash)
+    for serv in services:
+        for point in serv.points:
+            if point.analysis:
+                yield [_ChunkSource(source="point", source_id=point.id, service_id=serv.id)], point.analysis
+
+
+def chunk_corpus(
+    services: Iterable[Service],
+    store: None | DocumentTextStore,
+    chunker: TextChunker,
+    cache: None | ChunkCache = None,
+    processes: int = 0,
+) -> Iterator[CorpusChunk]:
+    """Split the document texts of `store` and the point analyses of `services` into chunks, in their order.
+
+    A text shared by many documents is chunked once, texts whose chunks are in `cache` are not chunked again.
+    """
+    # a batch of texts is kept until its chunks are back from the workers
+    sources, chunked = tee(_iter_source_texts(services=services, store=store))
+    all_chunks = chunk_texts((text for _, text in chunked), chunker=chunker, cache=cache, processes=processes)
+    for (text_sources, text), chunks in zip(sources, all_chunks, strict=True):
+        for source in text_sources:
+            for index, chunk in enumerate(chunks):
+                yield CorpusChunk(
+                    source=source.source,
+                    source_id=source.source_id,
+                    service_id=source.service_id,
+                    index=index,
+                    token_count=chunk.token_count,
+                    text=chunk.get_text(text),
+                )
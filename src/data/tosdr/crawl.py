@@ -0,0 +1,99 @@
+import asyncio
+from collections.abc import AsyncIterator, Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.data.base_client import PriorityWorkerPool
+from src.utils.checkpoint import CrawlCheckpoint
+from src.utils.file_utils import DEFAULT_COMPRESS_LEVEL, async_write_pydantic_models_ndjson_gz
+
+from .api_client import APIClient
+from .edit_site_client import EditSiteClient
+from .models import Case, CasePoint, Service, ServiceMetadata
+from .sync import ServiceHeader
+
+__all__ = [
+    "crawl_all",
+    "recency_priority",
+]
+
+
+def recency_priority(updated_at: datetime) -> float:
+    """Priority in a `PriorityWorkerPool` that requests the most recently updated resources first"""
+    return -updated_at.timestamp()
+
+
+async def _write_listing(
+    models: AsyncIterator[BaseModel], output_file: Path, pool: PriorityWorkerPool[int, Any], compress_level: int
+) -> int:
+    try:
+        return await async_write_pydantic_models_ndjson_gz(
+            models=models, output_file=output_file, compress_level=compress_level
+        )
+    finally:
+        # the pool only stops once its listing is over, even a failed one
+        pool.close()
+
+
+async def crawl_all(  # noqa: PLR0913
+    api_client: APIClient,
+    edit_client: EditSiteClient,
+    metadata_file: Path,
+    cases_file: Path,
+    services_checkpoint: CrawlCheckpoint[Service],
+    case_points_checkpoint: CrawlCheckpoint[CasePoint],
+    previous_services: None | Mapping[int, datetime] = None,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+) -> dict[int, ServiceHeader]:
+    """Download the services, cases and case points at once, each upstream host at the pace of its own rate limiter.
+
+    api.tosdr.org serves the listings and the services, edit.tosdr.org the case points. The ids read from the listing
+    pages are fed as they arrive to a `PriorityWorkerPool` per host, most recently updated first, so the edit site
+    starts on the case points while the services are still being listed and the crawl lasts about as long as its
+    slowest host. The listings are written to `metadata_file` and `cases_file`, the services and case points recorded
+    in their checkpoints. Ids already done in the checkpoints are skipped, as are the services whose `updated_at` is
+    still the one in `previous_services`.
+
+    Return the headers of all listed services.
+    """
+    previous_services = previous_services or {}
+    services_pool = PriorityWorkerPool(api_client.async_get_service, num_workers=api_client.num_workers)
+    case_points_pool = PriorityWorkerPool(edit_client.async_get_case_points, num_workers=edit_client.num_workers)
+    headers: dict[int, ServiceHeader] = {}
+
+    async def _list_services() -> AsyncIterator[ServiceMetadata]:
+        async for serv_meta in api_client.async_iter_all_services_metadata():
+            headers[serv_meta.id] = ServiceHeader.from_metadata(serv_meta)
+            is_updated = previous_services.get(serv_meta.id) != serv_meta.updated_at
+            if is_updated and serv_meta.id not in services_checkpoint.done_ids:
+                services_pool.put(serv_meta.id, priority=recency_priority(serv_meta.updated_at))
+            yield serv_meta
+
+    async def _list_cases() -> AsyncIterator[Case]:
+        async for case in api_client.async_iter_all_cases():
+            if case.id not in case_points_checkpoint.done_ids:
+                case_points_pool.put(case.id, priority=recency_priority(case.updated_at))
+            yield case
+
+    tasks = [
+        asyncio.ensure_future(coro)
+        for coro in (
+            _write_listing(_list_services(), metadata_file, services_pool, compress_level),
+            _write_listing(_list_cases(), cases_file, case_points_pool, compress_level),
+            services_checkpoint.record_all(services_pool.iter_results()),
+            case_points_checkpoint.record_all(case_points_pool.iter_results()),
+        )
+    ]
+    try:
+        num_services, num_cases, _, _ = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # the pools and page fetchers of the tasks are stopped before the checkpoints they write to can be closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+    logger.info(f"Crawled {num_services} services metadata and {num_cases} cases")
+    return headers
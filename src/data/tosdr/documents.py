@@ -0,0 +1,303 @@
+import asyncio
+import gzip
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from aiohttp import ClientSession
+from loguru import logger
+from lxml import etree, html
+from pydantic import AwareDatetime, BaseModel
+from yarl import URL
+
+from src.data.base_client import (
+    DEFAULT_NUM_WORKERS,
+    BaseAPIClient,
+    ConnectionPoolConfig,
+    iter_worker_pool,
+    retry_on_throttle,
+)
+from src.data.metrics import ClientMetrics, EndpointKey
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.response_cache import ResponseCache
+from src.utils.file_utils import iter_ndjson_gz_models, write_pydantic_models_ndjson_gz
+
+from .html_parser import MarkupType
+from .models import Service
+
+__all__ = [
+    "DocumentClient",
+    "DocumentTextRecord",
+    "DocumentTextStore",
+    "DocumentsDownloadStats",
+    "download_documents",
+    "extract_document_text",
+    "normalize_text",
+]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_IGNORED_TAGS = ("script", "style", "noscript", "template")
+_BLOCK_TAGS = (
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "br",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "footer",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "td",
+    "th",
+    "tr",
+    "ul",
+)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC normalize, collapse whitespace within lines and drop empty lines"""
+    text = unicodedata.normalize("NFKC", text)
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _collapse_whitespace(text: None | str) -> None | str:
+    return _WHITESPACE_RE.sub(" ", text) if text else text
+
+
+def extract_document_text(markup: MarkupType, xpath: None | str = None) -> str:
+    """Normalized text of the elements of a page matched by `xpath`, default to the whole page"""
+    if not isinstance(markup, str | bytes):
+        markup = markup.read()
+    root = html.document_fromstring(markup)
+    etree.strip_elements(root, *_IGNORED_TAGS, with_tail=False)
+    # source line breaks are not meaningful in html, only block elements start new lines
+    for element in root.iter():
+        element.text = _collapse_whitespace(element.text)
+        element.tail = _collapse_whitespace(element.tail)
+    for block in root.iter(*_BLOCK_TAGS):
+        block.text = "\n" + (block.text or "")
+        block.tail = "\n" + (block.tail or "")
+
+    matches = root.xpath(xpath) if xpath else [root]
+    if not isinstance(matches, list) or not matches:
+        raise ValueError(f"xpath matched nothing: {xpath}")
+    texts = [m.text_content() if isinstance(m, html.HtmlElement) else str(m) for m in matches]
+    return normalize_text("\n".join(texts))
+
+
+class DocumentClient(BaseAPIClient):
+    """Client fetching legal documents from the sites of the services.
+
+    Every site is paced by its own rate limiter, so that a slow or throttling site does not hold back the others. A
+    `rate_limiter` given is shared by all sites instead. Pages are parsed in `parse_executor`, default to the event loop
+    default thread pool.
+    """
+
+    base_url = ""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        rate_limiter: None | AdaptiveRateLimiter = None,
+        response_cache: None | ResponseCache = None,
+        pool_config: None | ConnectionPoolConfig = None,
+        parse_executor: None | Executor = None,
+        metrics: None | ClientMetrics = None,
+    ) -> None:
+        super().__init__(
+            base_url=self.base_url,
+            num_workers=num_workers,
+            rate_limiter=rate_limiter,
+            response_cache=response_cache,
+            pool_config=pool_config,
+            metrics=metrics,
+        )
+        self.parse_executor = parse_executor
+        self.shared_rate_limiter = rate_limiter is not None
+        self._host_rate_limiters: dict[str, AdaptiveRateLimiter] = {}
+
+    def get_rate_limiter(self, url: str | URL) -> AdaptiveRateLimiter:
+        if self.shared_rate_limiter:
+            return self.rate_limiter
+        host = URL(url).host or ""
+        if host not in self._host_rate_limiters:
+            self._host_rate_limiters[host] = AdaptiveRateLimiter(initial_rate=5, max_rate=20, name=host)
+        return self._host_rate_limiters[host]
+
+    def metrics_key(self, url: str | URL) -> EndpointKey:
+        """Documents are spread over the sites of the services, their metrics are only kept per site"""
+        return URL(url).host or "", "*"
+
+    def get_document_text(self, url: str, xpath: None | str = None) -> str:
+        resp = self.request(method="GET", url=url)
+        return extract_document_text(markup=resp.content, xpath=xpath)
+
+    @retry_on_throttle()
+    async def async_get_document_text(
+        self, url: str, xpath: None | str = None, session: None | ClientSession = None
+    ) -> str:
+        async with self.async_send(session=session, method="GET", url=url) as resp:
+            logger.info(f"Getting document {url}")
+            markup = await resp.read()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.parse_executor, extract_document_text, markup, xpath
+        )
+
+
+class DocumentTextRecord(BaseModel):
+    document_id: int
+    service_id: int
+    url: str
+    xpath: None | str = None
+    content_hash: str
+    document_updated_at: AwareDatetime
+    fetched_at: AwareDatetime
+
+
+class DocumentTextStore:
+    """Content-addressed store of document texts, a text shared by many documents is stored once.
+
+    An index maps every document to the hash of its latest text.
+    """
+
+    def __init__(self, store_dir: Path) -> None:
+        self.store_dir = Path(store_dir)
+        self.texts_dir = self.store_dir / "texts"
+        self.index_file = self.store_dir / "index.ndjson.gz"
+        self.texts_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _text_path(self, content_hash: str) -> Path:
+        return self.texts_dir / content_hash[:2] / f"{content_hash}.txt.gz"
+
+    def has(self, content_hash: str) -> bool:
+        return self._text_path(content_hash).exists()
+
+    def put(self, text: str) -> str:
+        """Store a text if not stored yet, return its hash"""
+        content_hash = self.hash_text(text)
+        text_path = self._text_path(content_hash)
+        if not text_path.exists():
+            text_path.parent.mkdir(exist_ok=True)
+            tmp_path = text_path.with_suffix(".tmp")
+            with gzip.open(tmp_path, mode="wt", encoding="utf-8") as f:
+                f.write(text)
+            tmp_path.replace(text_path)
+        return content_hash
+
+    def read(self, content_hash: str) -> str:
+        with gzip.open(self._text_path(content_hash), mode="rt", encoding="utf-8") as f:
+            return f.read()
+
+    def load_index(self) -> dict[int, DocumentTextRecord]:
+        if not self.index_file.exists():
+            return {}
+        return {
+            record.document_id: record
+            for batch in iter_ndjson_gz_models(input_path=self.index_file, model_type=DocumentTextRecord)
+            for record in batch
+        }
+
+    def write_index(self, records: Iterable[DocumentTextRecord]) -> int:
+        return write_pydantic_models_ndjson_gz(models=records, output_file=self.index_file)
+
+
+class DocumentsDownloadStats(BaseModel):
+    skipped: int = 0
+    fetched: int = 0
+    unchanged: int = 0
+    changed: int = 0
+    failed: int = 0
+
+
+async def download_documents(
+    client: DocumentClient, services: Iterable[Service], store: DocumentTextStore, force: bool = False
+) -> DocumentsDownloadStats:
+    """Fetch the text of the documents of `services` into `store`.
+
+    Documents not updated since their text was stored are skipped unless `force`, and each distinct url and xpath is
+    only fetched once. Refetched texts are compared with the stored ones by hash, so unchanged texts are not rewritten.
+    """
+    stats = DocumentsDownloadStats()
+    previous = store.load_index()
+    records: dict[int, DocumentTextRecord] = {}
+    to_fetch: defaultdict[tuple[str, None | str], list[DocumentTextRecord]] = defaultdict(list)
+    for serv in services:
+        for doc in serv.documents or []:
+            prev = previous.get(doc.id)
+            if (
+                not force
+                and prev
+                and (prev.url, prev.xpath) == (doc.url, doc.xpath)
+                and prev.document_updated_at >= doc.updated_at
+                and store.has(prev.content_hash)
+            ):
+                records[doc.id] = prev
+                stats.skipped += 1
+                continue
+            to_fetch[(doc.url, doc.xpath)].append(
+                DocumentTextRecord(
+                    document_id=doc.id,
+                    service_id=serv.id,
+                    url=doc.url,
+                    xpath=doc.xpath,
+                    content_hash="",
+                    document_updated_at=doc.updated_at,
+                    fetched_at=datetime.now(tz=timezone.utc),
+                )
+            )
+
+    async def _fetch(url_xpath: tuple[str, None | str]) -> str:
+        return await client.async_get_document_text(url=url_xpath[0], xpath=url_xpath[1])
+
+    async for (url, xpath), text in iter_worker_pool(_fetch, list(to_fetch), num_workers=client.num_workers):
+        fetched_records = to_fetch[(url, xpath)]
+        if isinstance(text, Exception):
+            logger.error(f"Failed to fetch document {url}: {text}")
+            stats.failed += len(fetched_records)
+            # keep the last known text of the documents
+            records.update(
+                {r.document_id: previous[r.document_id] for r in fetched_records if r.document_id in previous}
+            )
+            continue
+        stats.fetched += 1
+        content_hash = store.put(text)
+        for record in fetched_records:
+            prev = previous.get(record.document_id)
+            if prev and prev.content_hash == content_hash:
+                stats.unchanged += 1
+            else:
+                stats.changed += 1
+            record.content_hash = content_hash
+            record.fetched_at = datetime.now(tz=timezone.utc)
+            records[record.document_id] = record
+
+    store.write_index(records.values())
+    logger.info(f"Documents download: {stats}")
+    return stats
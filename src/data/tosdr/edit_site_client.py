@@ -1,74 +1,110 @@
 import asyncio
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import Executor
 
-import backoff
-from aiohttp import ClientResponseError, ClientSession
-from aiolimiter import AsyncLimiter
+from aiohttp import ClientSession
 from loguru import logger
-from requests import codes
-
-from src.data.base_client import BaseAPIClient, BaseAPIOperation
-
-from .html_parser import parse_case_point_rows_from_html
+from pydantic import TypeAdapter
+
+from src.data.base_client import (
+    DEFAULT_NUM_WORKERS,
+    BaseAPIClient,
+    BaseAPIOperation,
+    ConnectionPoolConfig,
+    iter_worker_pool,
+    retry_on_throttle,
+)
+from src.data.metrics import ClientMetrics
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.response_cache import ResponseCache
+
+from .html_parser import MarkupType, parse_case_point_rows_from_html
 from .models import CasePoint
 
 __all__ = [
     "EditSiteClient",
     "GetCasePointsOp",
+    "parse_case_points_from_html",
 ]
 
+# validates the rows of a page in a single pydantic-core call
+_CASE_POINTS_ADAPTER: TypeAdapter[list[CasePoint]] = TypeAdapter(list[CasePoint])
+
+
+def parse_case_points_from_html(markup: MarkupType, case_id: int) -> list[CasePoint]:
+    """Parse and validate the case points of a case page. Module level so it can be sent to a process pool"""
+    try:
+        rows = parse_case_point_rows_from_html(markup=markup)
+        return _CASE_POINTS_ADAPTER.validate_python([{"case_id": case_id, **row} for row in rows])
+    except Exception as e:
+        logger.error(f"Failed to parse case {case_id} html: {e}")
+        raise
+
 
 class GetCasePointsOp(BaseAPIOperation):
     method: str = "GET"
 
 
 class EditSiteClient(BaseAPIClient):
+    """Client of the edit site, case points are scraped from the case pages.
+
+    Pages are parsed in `parse_executor`, default to the event loop default thread pool. Pass a `ProcessPoolExecutor` to
+    parse across cores, the client does not shut it down.
+    """
+
     base_url = "https://edit.tosdr.org"
 
-    def __init__(self) -> None:
-        super().__init__(base_url=self.base_url)
-        self.rate_limiter = AsyncLimiter(max_rate=1, time_period=1)
+    def __init__(  # noqa: PLR0913
+        self,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        rate_limiter: None | AdaptiveRateLimiter = None,
+        response_cache: None | ResponseCache = None,
+        pool_config: None | ConnectionPoolConfig = None,
+        parse_executor: None | Executor = None,
+        metrics: None | ClientMetrics = None,
+    ) -> None:
+        super().__init__(
+            base_url=self.base_url,
+            num_workers=num_workers,
+            rate_limiter=rate_limiter or AdaptiveRateLimiter(initial_rate=1, name=self.base_url),
+            response_cache=response_cache,
+            pool_config=pool_config,
+            metrics=metrics,
+        )
+        self.parse_executor = parse_executor
 
     @staticmethod
     def _build_get_case_points_op(case_id: int) -> GetCasePointsOp:
         return GetCasePointsOp(path=f"/cases/{case_id}")
 
-    @staticmethod
-    def _parse_case_points_from_html(html: str, case_id: int) -> list[CasePoint]:
-        try:
-            rows = parse_case_point_rows_from_html(markup=html)
-            return [CasePoint.model_validate({"case_id": case_id, **row}) for row in rows]
-        except Exception as e:
-            logger.error(f"Failed to parse case {case_id} html: {e}")
-            raise
-
     def get_case_points(self, case_id: int) -> list[CasePoint]:
         resp = self.request(api_op=self._build_get_case_points_op(case_id=case_id))
-        return self._parse_case_points_from_html(html=resp.text, case_id=case_id)
-
-    @backoff.on_exception(
-        wait_gen=backoff.expo,
-        exception=ClientResponseError,
-        max_tries=10,
-        giveup=lambda e: e.status != codes.too_many,
-    )
-    async def async_get_case_points(self, session: ClientSession, case_id: int) -> list[CasePoint]:
-        async with self.rate_limiter, self.async_request(
-            session=session, api_op=self._build_get_case_points_op(case_id=case_id)
-        ) as resp:
+        return parse_case_points_from_html(markup=resp.content, case_id=case_id)
+
+    @retry_on_throttle()
+    async def async_get_case_points(self, case_id: int, session: None | ClientSession = None) -> list[CasePoint]:
+        async with self.async_send(session=session, api_op=self._build_get_case_points_op(case_id=case_id)) as resp:
             logger.info(f"Getting case with id: {case_id}")
-            resp_text = await resp.text()
-            return self._parse_case_points_from_html(html=resp_text, case_id=case_id)
+            markup = await resp.read()
+        # parse off the event loop so that a large page does not stall the other in-flight requests
+        return await asyncio.get_running_loop().run_in_executor(
+            self.parse_executor, parse_case_points_from_html, markup, case_id
+        )
+
+    async def async_iter_case_points(
+        self, case_ids: Iterable[int]
+    ) -> AsyncIterator[tuple[int, list[CasePoint] | Exception]]:
+        """Stream `(case_id, case points or exception)` pairs in completion order"""
+        async for c_id, coro_ret in iter_worker_pool(
+            self.async_get_case_points, case_ids, num_workers=self.num_workers
+        ):
+            yield c_id, coro_ret
 
     async def async_get_multiple_case_points(self, case_ids: list[int]) -> list[CasePoint]:
-        async with ClientSession(raise_for_status=True) as session:
-            tasks = (self.async_get_case_points(session=session, case_id=c_id) for c_id in case_ids)
-
-            coro_returns = await asyncio.gather(*tasks, return_exceptions=True)
-
-            case_points = []
-            for idx, coro_ret in enumerate(coro_returns):
-                if isinstance(coro_ret, Exception):
-                    logger.error(f"Failed to query service with id {case_ids[idx]}: {coro_ret}")
-                else:
-                    case_points += coro_ret
-            return case_points
+        case_points = []
+        async for c_id, coro_ret in self.async_iter_case_points(case_ids=case_ids):
+            if isinstance(coro_ret, Exception):
+                logger.error(f"Failed to query case points of case with id {c_id}: {coro_ret}")
+            else:
+                case_points += coro_ret
+        return case_points
@@ -2,15 +2,22 @@ from collections.abc import Iterator
 from typing import IO, Any
 
 from bs4 import BeautifulSoup, Tag
+from loguru import logger
+from lxml import etree
 
 __all__ = [
     "MarkupType",
     "TagNotFoundException",
     "parse_case_point_rows_from_html",
+    "parse_table_bs4",
 ]
 
 MarkupType = str | bytes | IO[str] | IO[bytes]
 
+FAST_PARSER_CHUNK_SIZE = 64 * 1024
+
+_element_text = etree.XPath("string()")
+
 
 class TagNotFoundException(Exception):
     def __init__(self, tag: Tag, tag_name: str):
@@ -54,7 +61,59 @@ def _parse_table(table: Tag) -> Iterator[dict]:
     return (dict(zip(headers, row, strict=True)) for row in all_rows)
 
 
-def parse_case_point_rows_from_html(markup: MarkupType) -> Iterator[dict]:
+def parse_table_bs4(markup: str | bytes) -> Iterator[dict]:
+    """Parse the rows of the first table with BeautifulSoup, slower than lxml but lenient with broken tables"""
     page = BeautifulSoup(markup=markup, features="lxml")
     table = _tag_find(tag=page, name="table")
     return _parse_table(table=table)
+
+
+class _FastParserError(Exception):
+    pass
+
+
+def _element_find(element: etree._Element, tag_name: str) -> etree._Element:
+    res = element.find(f".//{tag_name}")
+    if res is None:
+        raise _FastParserError(f"<{tag_name}> not found")
+    return res
+
+
+def _find_first_table_lxml(markup: str | bytes) -> etree._Element:
+    """Feed the markup by chunks, stopping as soon as the first table is fully parsed"""
+    parser = etree.HTMLPullParser(events=("end",), tag="table")
+    chunks = (markup[start : start + FAST_PARSER_CHUNK_SIZE] for start in range(0, len(markup), FAST_PARSER_CHUNK_SIZE))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, table in parser.read_events():
+            if isinstance(table, etree._Element):
+                return table
+    parser.close()
+    raise _FastParserError("<table> not found")
+
+
+def _parse_table_lxml(markup: str | bytes) -> list[dict]:
+    """Same rows as `_parse_table` without building the BeautifulSoup tree of the whole page"""
+    try:
+        table = _find_first_table_lxml(markup=markup)
+    except etree.LxmlError as e:
+        raise _FastParserError(str(e)) from e
+    headers = [_element_text(h) for h in _element_find(table, "thead").iter("th")]
+    rows = []
+    for row in _element_find(table, "tbody").iter("tr"):
+        cells = [_element_text(c) for c in row.iter("th", "td")]
+        if not headers or len(cells) != len(headers):
+            raise _FastParserError(f"{len(cells)} cells for {len(headers)} headers")
+        rows.append(dict(zip(headers, cells, strict=True)))
+    return rows
+
+
+def parse_case_point_rows_from_html(markup: MarkupType) -> Iterator[dict]:
+    """Parse the rows of the first table with lxml, falling back to BeautifulSoup on tables lxml cannot handle"""
+    if not isinstance(markup, str | bytes):
+        markup = markup.read()
+    try:
+        return iter(_parse_table_lxml(markup=markup))
+    except _FastParserError as e:
+        logger.debug(f"Fast parser failed, falling back to BeautifulSoup: {e}")
+    return parse_table_bs4(markup=markup)
@@ -1,10 +1,9 @@
-from typing import Any
-
 from pydantic import (
+    AliasChoices,
+    AliasPath,
     AwareDatetime,
     BaseModel,
     Field,
-    field_validator,
 )
 
 __all__ = [
@@ -22,18 +21,10 @@ __all__ = [
 
 
 class _TrackingTimestampMixin:
-    created_at: AwareDatetime
-    updated_at: AwareDatetime
-
-    @field_validator("created_at", "updated_at", mode="before")
-    @classmethod
-    def convert_v1_timestamp_object(cls, data: Any) -> Any:
-        """v1 one API use an object format instead of timestamp"""
-        if isinstance(data, dict):
-            is_valid_time_obj_format = all(k in data for k in ("timezone", "pgsql", "unix"))
-            if is_valid_time_obj_format:
-                return data["pgsql"]
-        return data
+    # v1 one API use an object format `{"timezone", "pgsql", "unix"}` instead of timestamp, its `pgsql` timestamp is
+    # picked by a validation alias instead of a python validator so that decoding stays within pydantic-core
+    created_at: AwareDatetime = Field(validation_alias=AliasChoices(AliasPath("created_at", "pgsql"), "created_at"))
+    updated_at: AwareDatetime = Field(validation_alias=AliasChoices(AliasPath("updated_at", "pgsql"), "updated_at"))
 
 
 class Document(BaseModel, _TrackingTimestampMixin):
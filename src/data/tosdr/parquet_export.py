@@ -0,0 +1,130 @@
+from collections.abc import Iterable
+from pathlib import Path
+
+import pyarrow as pa
+
+from src.utils.parquet_utils import DEFAULT_ROW_GROUP_SIZE, ParquetDatasetWriter
+
+from .models import Case, CasePoint, Service
+
+__all__ = [
+    "CASES_SCHEMA",
+    "CASE_POINTS_SCHEMA",
+    "DOCUMENTS_SCHEMA",
+    "POINTS_SCHEMA",
+    "SERVICES_SCHEMA",
+    "export_case_points_parquet",
+    "export_cases_parquet",
+    "export_services_parquet",
+]
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+SERVICES_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("name", pa.string(), nullable=False),
+        pa.field("rating", pa.string()),
+        pa.field("urls", pa.list_(pa.string())),
+        pa.field("created_at", _TIMESTAMP, nullable=False),
+        pa.field("updated_at", _TIMESTAMP, nullable=False),
+    ]
+)
+
+POINTS_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("service_id", pa.int64(), nullable=False),
+        pa.field("case_id", pa.int64(), nullable=False),
+        pa.field("document_id", pa.int64()),
+        pa.field("title", pa.string(), nullable=False),
+        pa.field("status", pa.string(), nullable=False),
+        pa.field("analysis", pa.string(), nullable=False),
+        pa.field("source", pa.string()),
+        pa.field("created_at", _TIMESTAMP, nullable=False),
+        pa.field("updated_at", _TIMESTAMP, nullable=False),
+    ]
+)
+
+DOCUMENTS_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("service_id", pa.int64(), nullable=False),
+        pa.field("name", pa.string(), nullable=False),
+        pa.field("url", pa.string(), nullable=False),
+        pa.field("xpath", pa.string()),
+        pa.field("text", pa.string()),
+        pa.field("created_at", _TIMESTAMP, nullable=False),
+        pa.field("updated_at", _TIMESTAMP, nullable=False),
+    ]
+)
+
+CASES_SCHEMA = pa.schema(
+    [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("title", pa.string(), nullable=False),
+        pa.field("description", pa.string(), nullable=False),
+        pa.field("rating", pa.string(), nullable=False),
+        pa.field("created_at", _TIMESTAMP, nullable=False),
+        pa.field("updated_at", _TIMESTAMP, nullable=False),
+    ]
+)
+
+CASE_POINTS_SCHEMA = pa.schema(
+    [
+        pa.field("case_id", pa.int64(), nullable=False),
+        pa.field("service_name", pa.string(), nullable=False),
+        pa.field("quote", pa.string(), nullable=False),
+        pa.field("status", pa.string(), nullable=False),
+    ]
+)
+
+
+def export_services_parquet(
+    services: Iterable[Service], output_dir: Path, row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> dict[str, int]:
+    """Export services to the normalized `services`, `points` and `documents` tables under `output_dir`.
+
+    Points and documents reference their service with a `service_id` column. Return the row count of each table.
+    """
+    output_dir = Path(output_dir)
+    with (
+        ParquetDatasetWriter(
+            output_dir=output_dir / "services", schema=SERVICES_SCHEMA, row_group_size=row_group_size
+        ) as services_writer,
+        ParquetDatasetWriter(
+            output_dir=output_dir / "points", schema=POINTS_SCHEMA, row_group_size=row_group_size
+        ) as points_writer,
+        ParquetDatasetWriter(
+            output_dir=output_dir / "documents", schema=DOCUMENTS_SCHEMA, row_group_size=row_group_size
+        ) as documents_writer,
+    ):
+        for serv in services:
+            services_writer.write(serv.model_dump(exclude={"points", "documents"}))
+            for point in serv.points:
+                points_writer.write({"service_id": serv.id, **point.model_dump()})
+            for doc in serv.documents or []:
+                documents_writer.write({"service_id": serv.id, **doc.model_dump()})
+    return {"services": services_writer.count, "points": points_writer.count, "documents": documents_writer.count}
+
+
+def export_cases_parquet(cases: Iterable[Case], output_dir: Path, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """Export cases to the `cases` table under `output_dir`, flattening their rating"""
+    with ParquetDatasetWriter(
+        output_dir=Path(output_dir) / "cases", schema=CASES_SCHEMA, row_group_size=row_group_size
+    ) as writer:
+        for case in cases:
+            writer.write({**case.model_dump(exclude={"classification"}), "rating": case.rating})
+    return writer.count
+
+
+def export_case_points_parquet(
+    case_points: Iterable[CasePoint], output_dir: Path, row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> int:
+    """Export case points to the `case_points` table under `output_dir`"""
+    with ParquetDatasetWriter(
+        output_dir=Path(output_dir) / "case_points", schema=CASE_POINTS_SCHEMA, row_group_size=row_group_size
+    ) as writer:
+        for case_point in case_points:
+            writer.write(case_point.model_dump())
+    return writer.count
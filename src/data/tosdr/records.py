@@ -0,0 +1,261 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, ClassVar, Generic, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+
+from src.utils.file_utils import iter_ndjson_gz_models
+
+from .models import CasePoint, Document, Point, Service
+
+__all__ = [
+    "CasePointRecords",
+    "DocumentRecords",
+    "PointRecords",
+    "ServiceRecords",
+    "StringPool",
+]
+
+# code of a missing category, and value of a missing integer
+MISSING = -1
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+RecordsType = TypeVar("RecordsType", bound="_Records[Any]")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class StringPool:
+    """Interned strings of the categorical fields, each distinct value is stored once and referenced by its code"""
+
+    __slots__ = ("_codes", "values")
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: None | str) -> int:
+        if value is None:
+            return MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> None | str:
+        return None if code == MISSING else self.values[code]
+
+
+class _Records(Generic[ModelType]):
+    """Columns of the fields of many models.
+
+    Integers and timestamps are packed in arrays, with `MISSING` for `None`, timestamps as UTC microseconds since the
+    epoch. Categorical fields are codes in a `StringPool` that can be shared with other records, other strings are kept
+    as is. Subclasses declare the fields of each kind.
+    """
+
+    model_type: ClassVar[type[BaseModel]]
+    int_fields: ClassVar[tuple[str, ...]] = ()
+    timestamp_fields: ClassVar[tuple[str, ...]] = ("created_at", "updated_at")
+    category_fields: ClassVar[tuple[str, ...]] = ()
+    text_fields: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, strings: None | StringPool = None) -> None:
+        # an empty pool is falsy
+        self.strings = strings if strings is not None else StringPool()
+        self._ints = {name: array("q") for name in (*self.int_fields, *self.timestamp_fields)}
+        self._codes = {name: array("i") for name in self.category_fields}
+        self._texts: dict[str, list[None | str]] = {name: [] for name in self.text_fields}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[ModelType]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> ModelType:
+        index = range(len(self))[index]
+        return self.model_type.model_construct(**self._get_row(index))  # type: ignore[return-value]
+
+    def _truncate(self, size: int) -> None:
+        """Drop the rows from `size` on, including the columns of a row partially appended"""
+        for int_column in (*self._ints.values(), *self._codes.values()):
+            del int_column[size:]
+        for text_column in self._texts.values():
+            del text_column[size:]
+        self._size = size
+
+    def _append_row(self, model: ModelType) -> None:
+        try:
+            for name in self.int_fields:
+                value = getattr(model, name)
+                self._ints[name].append(MISSING if value is None else value)
+            for name in self.timestamp_fields:
+                self._ints[name].append((getattr(model, name) - _EPOCH) // _MICROSECOND)
+            for name in self.category_fields:
+                self._codes[name].append(self.strings.encode(getattr(model, name)))
+            for name in self.text_fields:
+                self._texts[name].append(getattr(model, name))
+        except BaseException:
+            # a failed append leaves no row behind, the columns keep the same length
+            self._truncate(self._size)
+            raise
+        self._size += 1
+
+    def _get_row(self, index: int) -> dict[str, Any]:
+        row: dict[str, Any] = {}
+        for name in self.int_fields:
+            value = self._ints[name][index]
+            row[name] = None if value == MISSING else value
+        for name in self.timestamp_fields:
+            row[name] = _EPOCH + self._ints[name][index] * _MICROSECOND
+        for name in self.category_fields:
+            row[name] = self.strings.decode(self._codes[name][index])
+        for name in self.text_fields:
+            row[name] = self._texts[name][index]
+        return row
+
+    def append(self, model: ModelType) -> None:
+        self._append_row(model)
+
+    def extend(self, models: Iterable[ModelType]) -> None:
+        for model in models:
+            self.append(model)
+
+    @classmethod
+    def from_models(cls: type[RecordsType], models: Iterable[Any], strings: None | StringPool = None) -> RecordsType:
+        records = cls(strings=strings)
+        records.extend(models)
+        return records
+
+    def to_models(self) -> list[ModelType]:
+        return list(self)
+
+    def column(self, name: str) -> npt.NDArray[Any]:
+        """Numpy copy of an integer, timestamp (`datetime64[us]`) or categorical (codes) column.
+
+        A view would lock the size of the underlying array, and with it every later append.
+        """
+        if name in self._codes:
+            return np.array(self._codes[name], dtype=np.int32)
+        if name in self.timestamp_fields:
+            return np.array(self._ints[name], dtype=np.int64).view("datetime64[us]")
+        if name in self._ints:
+            return np.array(self._ints[name], dtype=np.int64)
+        raise KeyError(f"No array column {name}, expected one of {[*self._ints, *self._codes]}")
+
+    def values(self, name: str) -> list[None | str]:
+        """Values of a categorical or text column"""
+        if name in self._codes:
+            return [self.strings.decode(code) for code in self._codes[name]]
+        return list(self._texts[name])
+
+
+class PointRecords(_Records[Point]):
+    model_type = Point
+    int_fields = ("id", "case_id", "document_id")
+    # point titles mostly repeat the titles of their cases
+    category_fields = ("title", "status", "source")
+    text_fields = ("analysis",)
+
+
+class DocumentRecords(_Records[Document]):
+    model_type = Document
+    int_fields = ("id",)
+    category_fields = ("name", "url", "xpath")
+    text_fields = ("text",)
+
+
+class CasePointRecords(_Records[CasePoint]):
+    model_type = CasePoint
+    int_fields = ("case_id",)
+    timestamp_fields = ()
+    category_fields = ("service_name", "status")
+    text_fields = ("quote",)
+
+    @classmethod
+    def load_ndjson_gz(cls, input_path: Path, strings: None | StringPool = None) -> "CasePointRecords":
+        """Read a case points dump batch by batch, so that only a batch of models is held at once"""
+        records = cls(strings=strings)
+        for batch in iter_ndjson_gz_models(input_path=input_path, model_type=CasePoint):
+            records.extend(batch)
+        return records
+
+
+class ServiceRecords(_Records[Service]):
+    """Services with their points and documents in `points` and `documents`, which share the string pool"""
+
+    model_type = Service
+    int_fields = ("id",)
+    category_fields = ("rating",)
+    text_fields = ("name",)
+
+    def __init__(self, strings: None | StringPool = None) -> None:
+        super().__init__(strings=strings)
+        self.points = PointRecords(strings=self.strings)
+        self.documents = DocumentRecords(strings=self.strings)
+        self._url_codes = array("i")
+        # end offsets of the urls, points and documents of each service
+        self._urls_end = array("q")
+        self._points_end = array("q")
+        self._documents_end = array("q")
+        self._has_documents = array("b")
+
+    def _truncate(self, size: int) -> None:
+        super()._truncate(size)
+        for ends in (self._urls_end, self._points_end, self._documents_end, self._has_documents):
+            del ends[size:]
+        del self._url_codes[self._urls_end[size - 1] if size else 0 :]
+        self.points._truncate(self._points_end[size - 1] if size else 0)
+        self.documents._truncate(self._documents_end[size - 1] if size else 0)
+
+    def append(self, model: Service) -> None:
+        size = len(self)
+        self._append_row(model)
+        try:
+            self._url_codes.extend(self.strings.encode(url) for url in model.urls)
+            self._urls_end.append(len(self._url_codes))
+            self.points.extend(model.points)
+            self._points_end.append(len(self.points))
+            self.documents.extend(model.documents or ())
+            self._documents_end.append(len(self.documents))
+            self._has_documents.append(model.documents is not None)
+        except BaseException:
+            self._truncate(size)
+            raise
+
+    @staticmethod
+    def _span(ends: "array[int]", index: int) -> range:
+        return range(ends[index - 1] if index else 0, ends[index])
+
+    def _get_row(self, index: int) -> dict[str, Any]:
+        row = super()._get_row(index)
+        row["urls"] = [self.strings.values[self._url_codes[i]] for i in self._span(self._urls_end, index)]
+        row["points"] = [self.points[i] for i in self._span(self._points_end, index)]
+        documents = [self.documents[i] for i in self._span(self._documents_end, index)]
+        row["documents"] = documents if self._has_documents[index] else None
+        return row
+
+    def point_service_ids(self) -> npt.NDArray[np.int64]:
+        """Service id of each of the `points`"""
+        counts = np.diff(np.array(self._points_end, dtype=np.int64), prepend=0)
+        return np.repeat(self.column("id"), counts)
+
+    @classmethod
+    def load_ndjson_gz(cls, input_path: Path, strings: None | StringPool = None) -> "ServiceRecords":
+        """Read a services dump batch by batch, so that only a batch of models is held at once"""
+        records = cls(strings=strings)
+        for batch in iter_ndjson_gz_models(input_path=input_path, model_type=Service):
+            records.extend(batch)
+        return records
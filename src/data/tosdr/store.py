@@ -0,0 +1,345 @@
+import json
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from types import TracebackType
+from typing import Any, TypeVar
+
+from pydantic import AwareDatetime
+
+from .models import Case, CasePoint, Document, Point, Service
+
+__all__ = [
+    "CorpusStore",
+]
+
+DEFAULT_STORE_BATCH_SIZE = 1000
+# bound of the ids bound in one `IN` list, below SQLITE_MAX_VARIABLE_NUMBER of the oldest SQLite builds (999)
+_MAX_IN_PARAMS = 500
+
+_T = TypeVar("_T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    rating TEXT,
+    urls TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS services_updated_at ON services (updated_at);
+
+CREATE TABLE IF NOT EXISTS points (
+    id INTEGER PRIMARY KEY,
+    service_id INTEGER NOT NULL,
+    case_id INTEGER NOT NULL,
+    document_id INTEGER,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    source TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS points_service_id ON points (service_id);
+CREATE INDEX IF NOT EXISTS points_case_id ON points (case_id);
+CREATE INDEX IF NOT EXISTS points_document_id ON points (document_id);
+CREATE INDEX IF NOT EXISTS points_updated_at ON points (updated_at);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    service_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    xpath TEXT,
+    text TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_service_id ON documents (service_id);
+CREATE INDEX IF NOT EXISTS documents_updated_at ON documents (updated_at);
+
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    rating TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_updated_at ON cases (updated_at);
+
+CREATE TABLE IF NOT EXISTS case_points (
+    case_id INTEGER NOT NULL,
+    service_name TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS case_points_case_id ON case_points (case_id);
+"""
+
+_UPSERT_SERVICE_SQL = """
+INSERT INTO services (id, name, rating, urls, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = excluded.name,
+    rating = excluded.rating,
+    urls = excluded.urls,
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at
+"""
+_UPSERT_POINT_SQL = """
+INSERT OR REPLACE INTO points
+    (id, service_id, case_id, document_id, title, status, analysis, source, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_DOCUMENT_SQL = """
+INSERT OR REPLACE INTO documents (id, service_id, name, url, xpath, text, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_CASE_SQL = """
+INSERT OR REPLACE INTO cases (id, title, description, rating, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+"""
+_INSERT_CASE_POINT_SQL = "INSERT INTO case_points (case_id, service_name, quote, status) VALUES (?, ?, ?, ?)"
+
+
+def _to_timestamp(dt: datetime) -> str:
+    """UTC ISO timestamps, so they sort and compare as text"""
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _iter_batches(items: Iterable[_T], batch_size: int) -> Iterator[list[_T]]:
+    items_iter = iter(items)
+    while batch := list(islice(items_iter, batch_size)):
+        yield batch
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+
+class CorpusStore:
+    """SQLite store of the ToS;DR models, queryable by service, case and document without loading the dumps.
+
+    Services are normalized into `services`, `points` and `documents` tables. Writes are upserts in batches, so the
+    output of an incremental crawl can be loaded over a previous one.
+    """
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_file)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "CorpusStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        self.close()
+
+    def upsert_services(self, services: Iterable[Service], batch_size: int = DEFAULT_STORE_BATCH_SIZE) -> int:
+        """Insert or replace services, their points and documents are replaced as a whole"""
+        count = 0
+        for batch in _iter_batches(services, batch_size=batch_size):
+            service_ids = [(serv.id,) for serv in batch]
+            with self._conn:
+                self._conn.executemany(
+                    _UPSERT_SERVICE_SQL,
+                    (
+                        (
+                            serv.id,
+                            serv.name,
+                            serv.rating,
+                            json.dumps(serv.urls),
+                            _to_timestamp(serv.created_at),
+                            _to_timestamp(serv.updated_at),
+                        )
+                        for serv in batch
+                    ),
+                )
+                self._conn.executemany("DELETE FROM points WHERE service_id = ?", service_ids)
+                self._conn.executemany("DELETE FROM documents WHERE service_id = ?", service_ids)
+                self._conn.executemany(
+                    _UPSERT_POINT_SQL,
+                    (
+                        (
+                            point.id,
+                            serv.id,
+                            point.case_id,
+                            point.document_id,
+                            point.title,
+                            point.status,
+                            point.analysis,
+                            point.source,
+                            _to_timestamp(point.created_at),
+                            _to_timestamp(point.updated_at),
+                        )
+                        for serv in batch
+                        for point in serv.points
+                    ),
+                )
+                self._conn.executemany(
+                    _UPSERT_DOCUMENT_SQL,
+                    (
+                        (
+                            doc.id,
+                            serv.id,
+                            doc.name,
+                            doc.url,
+                            doc.xpath,
+                            doc.text,
+                            _to_timestamp(doc.created_at),
+                            _to_timestamp(doc.updated_at),
+                        )
+                        for serv in batch
+                        for doc in serv.documents or []
+                    ),
+                )
+            count += len(batch)
+        return count
+
+    def delete_services(self, service_ids: Iterable[int]) -> None:
+        ids = [(serv_id,) for serv_id in service_ids]
+        with self._conn:
+            for table in ("points", "documents"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE service_id = ?", ids)  # noqa: S608
+            self._conn.executemany("DELETE FROM services WHERE id = ?", ids)
+
+    def upsert_cases(self, cases: Iterable[Case], batch_size: int = DEFAULT_STORE_BATCH_SIZE) -> int:
+        count = 0
+        for batch in _iter_batches(cases, batch_size=batch_size):
+            with self._conn:
+                self._conn.executemany(
+                    _UPSERT_CASE_SQL,
+                    (
+                        (
+                            case.id,
+                            case.title,
+                            case.description,
+                            case.rating,
+                            _to_timestamp(case.created_at),
+                            _to_timestamp(case.updated_at),
+                        )
+                        for case in batch
+                    ),
+                )
+            count += len(batch)
+        return count
+
+    def upsert_case_points(self, case_points: Iterable[CasePoint], batch_size: int = DEFAULT_STORE_BATCH_SIZE) -> int:
+        """Replace the stored case points of every case present in `case_points`"""
+        count = 0
+        replaced_case_ids: set[int] = set()
+        for batch in _iter_batches(case_points, batch_size=batch_size):
+            # the points of a case may span several batches, only drop the stored ones once
+            new_case_ids = {cp.case_id for cp in batch} - replaced_case_ids
+            replaced_case_ids |= new_case_ids
+            with self._conn:
+                self._conn.executemany("DELETE FROM case_points WHERE case_id = ?", ((c_id,) for c_id in new_case_ids))
+                self._conn.executemany(
+                    _INSERT_CASE_POINT_SQL,
+                    ((cp.case_id, cp.service_name, cp.quote, cp.status) for cp in batch),
+                )
+            count += len(batch)
+        return count
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> list[sqlite3.Row]:
+        return self._conn.execute(sql, params).fetchall()
+
+    def _build_services(self, service_rows: list[sqlite3.Row]) -> list[Service]:
+        if not service_rows:
+            return []
+        service_ids = [row["id"] for row in service_rows]
+        points: dict[int, list[dict]] = {serv_id: [] for serv_id in service_ids}
+        documents: dict[int, list[dict]] = {serv_id: [] for serv_id in service_ids}
+        for ids_batch in _iter_batches(service_ids, batch_size=_MAX_IN_PARAMS):
+            in_clause = f"service_id IN ({_placeholders(len(ids_batch))})"
+            for row in self._query(f"SELECT * FROM points WHERE {in_clause} ORDER BY id", ids_batch):  # noqa: S608
+                points[row["service_id"]].append(dict(row))
+            for row in self._query(f"SELECT * FROM documents WHERE {in_clause} ORDER BY id", ids_batch):  # noqa: S608
+                documents[row["service_id"]].append(dict(row))
+        return [
+            Service.model_validate(
+                {
+                    **dict(row),
+                    "urls": json.loads(row["urls"]),
+                    "points": points[row["id"]],
+                    "documents": documents[row["id"]],
+                }
+            )
+            for row in service_rows
+        ]
+
+    def get_service(self, service_id: int) -> None | Service:
+        services = self._build_services(self._query("SELECT * FROM services WHERE id = ?", (service_id,)))
+        return services[0] if services else None
+
+    def get_services(self, case_id: None | int = None, updated_since: None | AwareDatetime = None) -> list[Service]:
+        """Services with a point on `case_id` and updated after `updated_since`, when given"""
+        conditions: list[str] = []
+        params: list[Any] = []
+        if case_id is not None:
+            conditions.append("id IN (SELECT service_id FROM points WHERE case_id = ?)")
+            params.append(case_id)
+        if updated_since is not None:
+            conditions.append("updated_at > ?")
+            params.append(_to_timestamp(updated_since))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._build_services(self._query(f"SELECT * FROM services {where} ORDER BY id", params))  # noqa: S608
+
+    def get_services_timestamps(self) -> dict[int, AwareDatetime]:
+        return {
+            row["id"]: datetime.fromisoformat(row["updated_at"])
+            for row in self._query("SELECT id, updated_at FROM services")
+        }
+
+    def get_points(
+        self,
+        service_id: None | int = None,
+        case_id: None | int = None,
+        document_id: None | int = None,
+        status: None | str = None,
+    ) -> list[Point]:
+        filters = {"service_id": service_id, "case_id": case_id, "document_id": document_id, "status": status}
+        conditions = [f"{col} = ?" for col, val in filters.items() if val is not None]
+        params = [val for val in filters.values() if val is not None]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT * FROM points {where} ORDER BY id", params)  # noqa: S608
+        return [Point.model_validate(dict(row)) for row in rows]
+
+    def get_documents(self, service_id: int) -> list[Document]:
+        rows = self._query("SELECT * FROM documents WHERE service_id = ? ORDER BY id", (service_id,))
+        return [Document.model_validate(dict(row)) for row in rows]
+
+    def get_case(self, case_id: int) -> None | Case:
+        row = self._conn.execute("SELECT * FROM cases WHERE id = ?", (case_id,)).fetchone()
+        if not row:
+            return None
+        return Case.model_validate({**dict(row), "classification": {"human": row["rating"]}})
+
+    def get_case_points(self, case_id: int) -> list[CasePoint]:
+        rows = self._query("SELECT * FROM case_points WHERE case_id = ? ORDER BY rowid", (case_id,))
+        return [
+            CasePoint.model_validate(
+                {
+                    "case_id": row["case_id"],
+                    "Service": row["service_name"],
+                    "Title": row["quote"],
+                    "Status": row["status"],
+                }
+            )
+            for row in rows
+        ]
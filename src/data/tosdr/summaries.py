@@ -0,0 +1,65 @@
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from itertools import tee
+
+from pydantic import BaseModel
+
+from src.text.summarizer import ExtractiveSummarizer, summarize_texts
+
+from .documents import DocumentTextRecord, DocumentTextStore
+from .models import Case, Service
+
+__all__ = [
+    "DocumentSummary",
+    "DocumentSummarySentence",
+    "case_label_texts",
+    "summarize_documents",
+]
+
+
+class DocumentSummarySentence(BaseModel):
+    text: str
+    score: float
+    case_id: None | int = None
+
+
+class DocumentSummary(BaseModel):
+    document_id: int
+    service_id: int
+    content_hash: str
+    sentences: list[DocumentSummarySentence]
+
+
+def case_label_texts(cases: Iterable[Case], services: Iterable[Service]) -> dict[int, str]:
+    """Describe every case by its title and the analysis of its points, to label the sentences of summaries"""
+    analyses: defaultdict[int, list[str]] = defaultdict(list)
+    for serv in services:
+        for point in serv.points:
+            if point.analysis:
+                analyses[point.case_id].append(point.analysis)
+    return {case.id: "\n".join([case.title, *analyses[case.id]]) for case in cases}
+
+
+def summarize_documents(
+    store: DocumentTextStore, summarizer: ExtractiveSummarizer, processes: int = 0
+) -> Iterator[DocumentSummary]:
+    """Summarize the texts of `store`, each distinct text once, and yield a summary per document"""
+    records_by_hash: defaultdict[str, list[DocumentTextRecord]] = defaultdict(list)
+    for record in store.load_index().values():
+        records_by_hash[record.content_hash].append(record)
+    content_hashes = list(records_by_hash)
+    # the summaries are spans of the texts, a batch of texts is kept until its summaries are back from the workers
+    texts, summarized_texts = tee(store.read(content_hash) for content_hash in content_hashes)
+    summaries = summarize_texts(summarized_texts, summarizer=summarizer, processes=processes)
+    for content_hash, text, sentences in zip(content_hashes, texts, summaries, strict=True):
+        summary_sentences = [
+            DocumentSummarySentence(text=sent.get_text(text), score=sent.score, case_id=sent.label)
+            for sent in sentences
+        ]
+        for record in records_by_hash[content_hash]:
+            yield DocumentSummary(
+                document_id=record.document_id,
+                service_id=record.service_id,
+                content_hash=content_hash,
+                sentences=summary_sentences,
+            )
@@ -0,0 +1,126 @@
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+from loguru import logger
+from pydantic import AwareDatetime, BaseModel
+
+from src.utils.file_utils import DEFAULT_COMPRESS_LEVEL, NdjsonGzWriter, iter_ndjson_gz_models
+
+from .models import Service, ServiceMetadata
+
+__all__ = [
+    "ServiceHeader",
+    "ServicesSyncPlan",
+    "merge_services_snapshot",
+    "plan_services_sync",
+    "read_services_headers",
+    "read_services_timestamps",
+]
+
+
+class _ServiceTimestamp(BaseModel):
+    id: int  # noqa: A003
+    updated_at: AwareDatetime
+
+
+class ServiceHeader(BaseModel):
+    """Fields of a service that the metadata pages already carry, refreshed without requesting the service.
+
+    The points, urls, documents and rating (graded differently by the metadata pages) only come from the service
+    endpoint, which is requested when `updated_at` moves.
+    """
+
+    id: int  # noqa: A003
+    name: str
+    updated_at: AwareDatetime
+
+    @classmethod
+    def from_metadata(cls, serv_meta: ServiceMetadata) -> "ServiceHeader":
+        return cls(id=serv_meta.id, name=serv_meta.name, updated_at=serv_meta.updated_at)
+
+    def apply(self, serv: Service) -> Service:
+        return serv if serv.name == self.name else serv.model_copy(update={"name": self.name})
+
+
+class ServicesSyncPlan(BaseModel):
+    # most recently updated first, so that an interrupted sync has fetched the freshest changes
+    fetch_ids: list[int]
+    keep_ids: set[int]
+    removed_ids: set[int]
+    headers: dict[int, ServiceHeader] = {}
+
+
+def read_services_timestamps(services_file: Path) -> dict[int, AwareDatetime]:
+    """Read the `updated_at` of every service of a services dump without building the full models"""
+    if not Path(services_file).exists():
+        return {}
+    return {
+        serv.id: serv.updated_at
+        for batch in iter_ndjson_gz_models(input_path=services_file, model_type=_ServiceTimestamp)
+        for serv in batch
+    }
+
+
+def read_services_headers(metadata_file: Path) -> dict[int, ServiceHeader]:
+    """Read the headers of every service of a services metadata dump"""
+    return {
+        serv_meta.id: ServiceHeader.from_metadata(serv_meta)
+        for batch in iter_ndjson_gz_models(input_path=metadata_file, model_type=ServiceMetadata)
+        for serv_meta in batch
+    }
+
+
+def plan_services_sync(
+    current: Mapping[int, AwareDatetime],
+    previous: Mapping[int, AwareDatetime],
+    headers: None | Mapping[int, ServiceHeader] = None,
+) -> ServicesSyncPlan:
+    """Only services that are new or whose `updated_at` moved since the previous snapshot need to be fetched.
+
+    The `headers` of the current services, read from the metadata pages, refresh the kept services.
+    """
+    fetch_ids = sorted(
+        (serv_id for serv_id, updated_at in current.items() if previous.get(serv_id) != updated_at),
+        key=lambda serv_id: current[serv_id],
+        reverse=True,
+    )
+    keep_ids = current.keys() - set(fetch_ids)
+    plan = ServicesSyncPlan(
+        fetch_ids=fetch_ids,
+        keep_ids=keep_ids,
+        removed_ids=previous.keys() - current.keys(),
+        headers={serv_id: header for serv_id, header in (headers or {}).items() if serv_id in keep_ids},
+    )
+    logger.info(
+        f"Sync plan: fetch {len(plan.fetch_ids)}, keep {len(plan.keep_ids)}, remove {len(plan.removed_ids)} services"
+    )
+    return plan
+
+
+def merge_services_snapshot(
+    previous_file: Path,
+    fetched_services: Iterable[Service],
+    plan: ServicesSyncPlan,
+    output_file: Path,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+) -> int:
+    """Write a new snapshot from the freshly fetched services and the kept services of the previous snapshot.
+
+    Services that should have been fetched but failed keep their previous version. Kept services are refreshed
+    with their header in the plan. `output_file` may be `previous_file`, the new snapshot only replaces it once fully
+    written.
+    """
+    written_ids: set[int] = set()
+    with NdjsonGzWriter(output_file=output_file, compress_level=compress_level) as writer:
+        for serv in fetched_services:
+            writer.write_model(serv, by_alias=True)
+            written_ids.add(serv.id)
+
+        if Path(previous_file).exists():
+            for batch in iter_ndjson_gz_models(input_path=previous_file, model_type=Service):
+                for serv in batch:
+                    if serv.id in written_ids or serv.id in plan.removed_ids:
+                        continue
+                    header = plan.headers.get(serv.id)
+                    writer.write_model(header.apply(serv) if header else serv, by_alias=True)
+    return writer.count
@@ -0,0 +1,200 @@
+import json
+import re
+import shutil
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from .tokenizer import RegexTokenizer
+
+__all__ = [
+    "BM25Index",
+]
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+# longer tokens are urls or garbage, they would widen every term of the memory-mapped terms array
+MAX_TERM_LENGTH = 64
+
+_WORD_RE = re.compile(r"\w+")
+_FILE_NAMES = ("keys", "doc_lengths", "terms", "offsets", "postings_docs", "postings_tfs")
+
+
+class BM25Index:
+    """BM25 inverted index of texts, the saved postings are memory-mapped so loading does not read them.
+
+    Postings are stored as a sorted terms array, the offsets of the postings of each term, and the concatenated
+    document indices and term frequencies of all postings. Texts added after loading go to an in-memory segment that
+    is searched along with the saved postings and merged into them by `save`. Removed texts are left out of the
+    scores until `save` drops them from the postings.
+    """
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> None:
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = RegexTokenizer(pattern=_WORD_RE)
+        self._keys: npt.NDArray[np.str_] = np.empty(0, dtype=np.str_)
+        self._doc_lengths: npt.NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self._terms: npt.NDArray[np.str_] = np.empty(0, dtype=np.str_)
+        self._offsets: npt.NDArray[np.int64] = np.zeros(1, dtype=np.int64)
+        self._postings_docs: npt.NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self._postings_tfs: npt.NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self._new_keys: list[str] = []
+        self._new_doc_lengths: list[int] = []
+        self._new_postings: defaultdict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._key_indices: None | dict[str, int] = None
+        # indices of the removed texts, their postings are dropped by `save`
+        self._removed: set[int] = set()
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return self._num_indexed() - len(self._removed)
+
+    def _num_indexed(self) -> int:
+        """Number of texts in the postings, removed ones included"""
+        return len(self._keys) + len(self._new_keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._get_key_indices()
+
+    def _get_key_indices(self) -> dict[str, int]:
+        if self._key_indices is None:
+            self._key_indices = {
+                key: i for i, key in enumerate([*self._keys.tolist(), *self._new_keys]) if i not in self._removed
+            }
+        return self._key_indices
+
+    @property
+    def keys(self) -> list[str]:
+        return [key for i, key in enumerate([*self._keys.tolist(), *self._new_keys]) if i not in self._removed]
+
+    def _all_doc_lengths(self) -> npt.NDArray[np.int32]:
+        return np.concatenate([self._doc_lengths, np.array(self._new_doc_lengths, dtype=np.int32)])
+
+    def _live_mask(self) -> npt.NDArray[np.bool_]:
+        mask = np.ones(self._num_indexed(), dtype=np.bool_)
+        mask[list(self._removed)] = False
+        return mask
+
+    def _tokenize(self, text: str) -> list[str]:
+        return [token for token in self.tokenizer.tokenize(text) if len(token) <= MAX_TERM_LENGTH]
+
+    def add(self, key: str, text: str) -> None:
+        key_indices = self._get_key_indices()
+        if key in key_indices:
+            raise ValueError(f"Key already indexed: {key}")
+        index = self._num_indexed()
+        tokens = self._tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self._new_postings[term].append((index, tf))
+        self._new_keys.append(key)
+        self._new_doc_lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        key_indices[key] = index
+
+    def add_many(self, items: Iterable[tuple[str, str]]) -> None:
+        for key, text in items:
+            self.add(key, text)
+
+    def remove(self, key: str) -> None:
+        key_indices = self._get_key_indices()
+        if key not in key_indices:
+            raise ValueError(f"Key not indexed: {key}")
+        index = key_indices.pop(key)
+        self._removed.add(index)
+        self._total_length -= int(self._all_doc_lengths()[index])
+
+    def _saved_postings(self, term: str) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+        position = int(np.searchsorted(self._terms, term))
+        if position == len(self._terms) or self._terms[position] != term:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return self._postings_docs[start:end], self._postings_tfs[start:end]
+
+    def _postings(self, term: str) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+        docs, tfs = self._saved_postings(term)
+        if term in self._new_postings:
+            new_docs, new_tfs = zip(*self._new_postings[term], strict=True)
+            docs = np.concatenate([docs, np.array(new_docs, dtype=np.int32)])
+            tfs = np.concatenate([tfs, np.array(new_tfs, dtype=np.int32)])
+        if self._removed and len(docs):
+            is_live = ~np.isin(docs, list(self._removed))
+            docs, tfs = docs[is_live], tfs[is_live]
+        return docs, tfs
+
+    def scores(self, text: str) -> npt.NDArray[np.float64]:
+        """BM25 score of every indexed text for a query, in the order of `keys`"""
+        num_docs = len(self)
+        if not num_docs:
+            return np.zeros(0)
+        scores = np.zeros(self._num_indexed())
+        doc_lengths = self._all_doc_lengths()
+        average_length = max(self._total_length / num_docs, 1)
+        length_norms = self.k1 * (1 - self.b + self.b * doc_lengths / average_length)
+        for term in set(self._tokenize(text)):
+            docs, tfs = self._postings(term)
+            if not len(docs):
+                continue
+            idf = np.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + length_norms[docs])
+        return np.compress(self._live_mask(), scores) if self._removed else scores
+
+    def search(self, text: str, top_k: int = 10) -> list[tuple[str, float]]:
+        """`(key, score)` of the `top_k` best matching texts with a positive score"""
+        scores = self.scores(text)
+        best = np.argsort(-scores, kind="stable")[:top_k]
+        keys = self.keys
+        return [(keys[i], float(scores[i])) for i in best if scores[i] > 0]
+
+    def save(self, index_dir: Path) -> None:
+        """Merge the texts added since loading into the postings, drop the removed ones and write them to `index_dir`"""
+        index_dir = Path(index_dir)
+        tmp_dir = index_dir.parent / f".{index_dir.name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        live_mask = self._live_mask()
+        # indices of the remaining texts once the removed ones are dropped
+        new_indices = (np.cumsum(live_mask) - 1).astype(np.int32)
+        terms, offsets_list = [], [0]
+        docs_parts, tfs_parts = [], []
+        for term in sorted(set(self._terms.tolist()) | set(self._new_postings)):
+            docs, tfs = self._postings(term)
+            if not len(docs):
+                continue
+            terms.append(term)
+            docs_parts.append(new_indices[docs])
+            tfs_parts.append(tfs)
+            offsets_list.append(offsets_list[-1] + len(docs))
+        arrays = {
+            "keys": np.array(self.keys, dtype=np.str_),
+            "doc_lengths": self._all_doc_lengths()[live_mask],
+            "terms": np.array(terms, dtype=np.str_),
+            "offsets": np.array(offsets_list, dtype=np.int64),
+            "postings_docs": np.concatenate([np.empty(0, dtype=np.int32), *docs_parts]),
+            "postings_tfs": np.concatenate([np.empty(0, dtype=np.int32), *tfs_parts]),
+        }
+        for name in _FILE_NAMES:
+            np.save(tmp_dir / f"{name}.npy", arrays[name])
+        with (tmp_dir / "params.json").open("w") as f:
+            json.dump({"k1": self.k1, "b": self.b}, f)
+        shutil.rmtree(index_dir, ignore_errors=True)
+        tmp_dir.replace(index_dir)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "BM25Index":
+        index_dir = Path(index_dir)
+        with (index_dir / "params.json").open() as f:
+            index = cls(**json.load(f))
+        arrays = {name: np.load(index_dir / f"{name}.npy", mmap_mode="r") for name in _FILE_NAMES}
+        index._keys = arrays["keys"]
+        index._doc_lengths = arrays["doc_lengths"]
+        index._terms = arrays["terms"]
+        index._offsets = arrays["offsets"]
+        index._postings_docs = arrays["postings_docs"]
+        index._postings_tfs = arrays["postings_tfs"]
+        index._total_length = int(index._doc_lengths.sum())
+        return index
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import re
+import sqlite3
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from .tokenizer import RegexTokenizer
+
+__all__ = [
+    "Chunk",
+    "ChunkCache",
+    "TextChunker",
+    "chunk_texts",
+    "split_sentences",
+]
+
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 64
+DEFAULT_CHUNK_BATCH_SIZE = 256
+
+# end of sentence punctuation and closing quotes, followed by what looks like the start of a new sentence
+_SENTENCE_BREAK_RE = re.compile(r"[.!?]+[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+_ABBREVIATIONS = frozenset(
+    ("art", "co", "corp", "dr", "e.g", "etc", "i.e", "inc", "ltd", "mr", "mrs", "ms", "no", "p", "sec", "u.s", "vs")
+)
+_ENUMERATOR_RE = re.compile(r"\(?(?:\d+(?:\.\d+)*|[IVXLC]+|[A-Z])[.)]?", re.IGNORECASE)
+_HEADING_RE = re.compile(r"^(?:(?:\d+(?:\.\d+)*|[IVXLC]+|[A-Z])[.)]\s|(?:section|article|chapter)\b)", re.IGNORECASE)
+_MAX_HEADING_LENGTH = 80
+
+_Span = tuple[int, int, int]  # start, end, token count
+
+
+class Chunk(BaseModel):
+    start: int
+    end: int
+    token_count: int
+
+    def get_text(self, text: str) -> str:
+        return text[self.start : self.end]
+
+
+class _Unit(NamedTuple):
+    start: int
+    end: int
+    token_count: int
+    is_heading: bool
+
+
+def _is_false_sentence_end(segment: str) -> bool:
+    """Abbreviations, initials and list enumerators are followed by a dot and a capital without ending a sentence"""
+    segment = segment.strip()
+    if not segment or _ENUMERATOR_RE.fullmatch(segment):
+        return True
+    last_word = segment.rsplit(maxsplit=1)[-1].rstrip(".").lower()
+    return last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha())
+
+
+def _append_stripped_span(spans: list[tuple[int, int]], text: str, start: int, end: int) -> None:
+    segment = text[start:end]
+    stripped = segment.strip()
+    if stripped:
+        start += len(segment) - len(segment.lstrip())
+        spans.append((start, start + len(stripped)))
+
+
+def split_sentences(text: str) -> list[tuple[int, int]]:
+    """`(start, end)` offsets of the sentences of a text, lines are never merged into one sentence"""
+    spans: list[tuple[int, int]] = []
+    start = 0
+    for match in _SENTENCE_BREAK_RE.finditer(text):
+        is_line_break = "\n" in match.group()
+        if not is_line_break and _is_false_sentence_end(text[start : match.start()]):
+            continue
+        _append_stripped_span(spans, text, start, match.start() + len(match.group().rstrip()))
+        start = match.end()
+    _append_stripped_span(spans, text, start, len(text))
+    return spans
+
+
+def _is_heading(text: str, start: int, end: int) -> bool:
+    is_line_start = start == 0 or text[start - 1] == "\n"
+    is_line_end = end == len(text) or text[end] == "\n"
+    if not (is_line_start and is_line_end):
+        return False
+    line = text[start:end]
+    return bool(_HEADING_RE.match(line)) or (len(line) <= _MAX_HEADING_LENGTH and line[-1] not in ".;:,!?")
+
+
+class TextChunker:
+    """Split texts into chunks of at most `max_tokens` tokens, cut at sentence boundaries and preferably at sections.
+
+    Consecutive chunks share up to `overlap_tokens` tokens of whole sentences. Sentences longer than a chunk are cut at
+    token boundaries. A chunk is a span of the source text so only its boundaries need to be stored.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        tokenizer: None | RegexTokenizer = None,
+    ) -> None:
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError(f"Expected 0 <= overlap_tokens < max_tokens: {overlap_tokens}, {max_tokens}")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer = tokenizer or RegexTokenizer()
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the chunking parameters, chunks cached with other parameters are not reused"""
+        config = [type(self).__name__, self.max_tokens, self.overlap_tokens, self.tokenizer.pattern.pattern]
+        return hashlib.sha256(json.dumps(config).encode("utf-8")).hexdigest()[:16]
+
+    def cache_key(self, text: str) -> str:
+        return f"{self.fingerprint}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _split_long_unit(self, text: str, unit: _Unit) -> Iterator[_Span]:
+        token_spans = self.tokenizer.spans(text[unit.start : unit.end])
+        step = self.max_tokens - self.overlap_tokens
+        for first in range(0, len(token_spans), step):
+            window = token_spans[first : first + self.max_tokens]
+            yield unit.start + window[0][0], unit.start + window[-1][1], len(window)
+            if first + self.max_tokens >= len(token_spans):
+                return
+
+    def _overlap_tail(self, units: list[_Unit]) -> list[_Unit]:
+        tail: list[_Unit] = []
+        tail_tokens = 0
+        for unit in reversed(units):
+            if tail_tokens + unit.token_count > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+            tail_tokens += unit.token_count
+        return tail
+
+    def chunk_spans(self, text: str) -> list[_Span]:
+        """`(start, end, token_count)` of the chunks of a text"""
+        units = [
+            _Unit(start, end, self.tokenizer.count(text[start:end]), _is_heading(text, start, end))
+            for start, end in split_sentences(text)
+        ]
+        chunks: list[_Span] = []
+        current: list[_Unit] = []
+        current_tokens = 0
+        has_new_units = False
+
+        def _emit() -> None:
+            if current and has_new_units:
+                chunks.append((current[0].start, current[-1].end, current_tokens))
+
+        for unit in units:
+            if unit.token_count > self.max_tokens:
+                _emit()
+                chunks.extend(self._split_long_unit(text, unit))
+                current, current_tokens, has_new_units = [], 0, False
+                continue
+
+            starts_section = unit.is_heading and current_tokens >= self.max_tokens // 2
+            if current and (starts_section or current_tokens + unit.token_count > self.max_tokens):
+                _emit()
+                # a new section does not need the end of the previous one as context
+                current = [] if starts_section else self._overlap_tail(current)
+                while current and sum(u.token_count for u in current) + unit.token_count > self.max_tokens:
+                    current.pop(0)
+                current_tokens = sum(u.token_count for u in current)
+                has_new_units = False
+            current.append(unit)
+            current_tokens += unit.token_count
+            has_new_units = True
+        _emit()
+        return chunks
+
+    def chunk(self, text: str) -> list[Chunk]:
+        return [Chunk(start=start, end=end, token_count=count) for start, end, count in self.chunk_spans(text)]
+
+
+class ChunkCache:
+    """Chunk boundaries keyed on the chunking parameters and the content hash of the text"""
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_file)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, spans TEXT NOT NULL)")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[_Span]]:
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._conn.execute(f"SELECT key, spans FROM chunks WHERE key IN ({placeholders})", keys)  # noqa: S608
+        return {key: [tuple(span) for span in json.loads(spans)] for key, spans in rows}  # type: ignore[misc]
+
+    def put_many(self, spans_by_key: dict[str, list[_Span]]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (key, spans) VALUES (?, ?)",
+                ((key, json.dumps(spans)) for key, spans in spans_by_key.items()),
+            )
+
+
+def chunk_texts(
+    texts: Iterable[str],
+    chunker: TextChunker,
+    cache: None | ChunkCache = None,
+    processes: int = 0,
+    batch_size: int = DEFAULT_CHUNK_BATCH_SIZE,
+) -> Iterator[list[Chunk]]:
+    """Stream the chunks of every text, in order.
+
+    Texts are read by batches, texts whose boundaries are in `cache` are not chunked again, the others are chunked in a
+    pool of `processes` processes when given.
+    """
+    executor = ProcessPoolExecutor(max_workers=processes) if processes else None
+    texts_iter = iter(texts)
+    try:
+        while batch := list(islice(texts_iter, batch_size)):
+            keys = [chunker.cache_key(text) for text in batch]
+            spans_by_key = cache.get_many(keys) if cache else {}
+            missing = {key: text for key, text in zip(keys, batch, strict=True) if key not in spans_by_key}
+            if missing:
+                if executor:
+                    chunksize = max(len(missing) // (processes * 4), 1)
+                    new_spans = list(executor.map(chunker.chunk_spans, missing.values(), chunksize=chunksize))
+                else:
+                    new_spans = [chunker.chunk_spans(text) for text in missing.values()]
+                computed = dict(zip(missing, new_spans, strict=True))
+                if cache:
+                    cache.put_many(computed)
+                spans_by_key.update(computed)
+            for key in keys:
+                yield [Chunk(start=start, end=end, token_count=count) for start, end, count in spans_by_key[key]]
+    finally:
+        if executor:
+            executor.shutdown()
@@ -0,0 +1,238 @@
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+
+__all__ = [
+    "DuplicateCluster",
+    "MinHashLSH",
+    "MinHasher",
+]
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_NUM_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SEED = 1
+
+# multiply-shift universal hashing of 32 bits shingle hashes, `(a * x + b) >> 32` wrapping around 2**64, which
+# needs no modulo unlike `(a * x + b) mod p`
+_HASH_SHIFT = np.uint64(32)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHINGLE_BASE = np.uint64(1_000_003)
+# shingles are hashed by blocks to bound the size of the (num_perm, shingles) matrix of long documents
+_SHINGLE_BLOCK_SIZE = 4096
+
+Signature = npt.NDArray[np.uint32]
+
+
+class MinHasher:
+    """MinHash signatures of texts over their character shingles, shingling and hashing are vectorized with numpy.
+
+    Texts are lowercased and their whitespace collapsed, so formatting differences do not lower the similarity.
+    Signatures of hashers with the same parameters and seed are comparable across runs.
+    """
+
+    def __init__(
+        self, num_perm: int = DEFAULT_NUM_PERM, shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = DEFAULT_SEED
+    ) -> None:
+        if num_perm < 1 or shingle_size < 1:
+            raise ValueError(f"Expected positive num_perm and shingle_size: {num_perm}, {shingle_size}")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text: str) -> npt.NDArray[np.uint64]:
+        """Distinct 32 bits hashes of the character shingles of a text"""
+        text = " ".join(text.lower().split())
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if not len(codes):
+            return codes
+        width = min(self.shingle_size, len(codes))
+        count = len(codes) - width + 1
+        hashes: npt.NDArray[np.uint64] = np.zeros(count, dtype=np.uint64)
+        for offset in range(width):
+            # polynomial rolling hash, wrapping around 2**64
+            hashes = hashes * _SHINGLE_BASE + codes[offset : offset + count]
+        hashes = (hashes ^ (hashes >> _HASH_SHIFT)) & _MAX_HASH
+        return np.unique(hashes)
+
+    def _hash_shingles(self, shingles: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint64]:
+        hashes = self._a * shingles
+        hashes += self._b
+        hashes >>= _HASH_SHIFT
+        return hashes
+
+    def signature(self, text: str) -> Signature:
+        """Minimum of each of `num_perm` hash functions over the shingles, empty texts get the maximum hash"""
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        shingles = self.shingles(text)
+        for start in range(0, len(shingles), _SHINGLE_BLOCK_SIZE):
+            hashes = self._hash_shingles(shingles[start : start + _SHINGLE_BLOCK_SIZE])
+            np.minimum(signature, hashes.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def signatures(self, texts: Iterable[str]) -> npt.NDArray[np.uint32]:
+        """`(len(texts), num_perm)` matrix of signatures"""
+        rows = [self.signature(text) for text in texts]
+        return np.vstack(rows) if rows else np.empty((0, self.num_perm), dtype=np.uint32)
+
+
+class DuplicateCluster(BaseModel):
+    canonical: str
+    members: list[str]
+
+
+class MinHashLSH:
+    """Incremental LSH index of MinHash signatures, clustering near duplicate texts.
+
+    Signatures are cut into `num_bands` bands, texts sharing a band are candidates and are put in the same cluster when
+    their estimated Jaccard similarity is at least `threshold`. Inserting a text only compares it with its candidates,
+    and identical signatures are merged without entering the buckets, so large groups of copies of the same boilerplate
+    do not make the buckets grow.
+    """
+
+    def __init__(
+        self, num_perm: int = DEFAULT_NUM_PERM, num_bands: int = DEFAULT_NUM_BANDS, threshold: float = DEFAULT_THRESHOLD
+    ) -> None:
+        if num_bands < 1 or num_perm % num_bands:
+            raise ValueError(f"Expected num_bands to divide num_perm: {num_bands}, {num_perm}")
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Expected 0 < threshold <= 1: {threshold}")
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.threshold = threshold
+        self._rows_per_band = num_perm // num_bands
+        self._keys: list[str] = []
+        self._indices: dict[str, int] = {}
+        self._signatures: npt.NDArray[np.uint32] = np.empty((1024, num_perm), dtype=np.uint32)
+        self._buckets: list[defaultdict[bytes, list[int]]] = [defaultdict(list) for _ in range(num_bands)]
+        self._exact: dict[bytes, int] = {}
+        self._parents: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._indices
+
+    def __iter__(self) -> Iterator[str]:
+        """Indexed keys in insertion order"""
+        return iter(list(self._keys))
+
+    def _find(self, index: int) -> int:
+        parents = self._parents
+        while parents[index] != index:
+            # path halving
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def _union(self, first: int, second: int) -> None:
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            # the root is the earliest inserted member, the canonical member of the cluster
+            self._parents[max(first, second)] = min(first, second)
+
+    def _band_keys(self, signature: Signature) -> list[bytes]:
+        rows = self._rows_per_band
+        return [signature[band * rows : (band + 1) * rows].tobytes() for band in range(self.num_bands)]
+
+    def _candidates(self, band_keys: list[bytes]) -> list[int]:
+        candidates: set[int] = set()
+        for buckets, band_key in zip(self._buckets, band_keys, strict=True):
+            candidates.update(buckets.get(band_key, ()))
+        return sorted(candidates)
+
+    def _similar(self, signature: Signature, candidates: list[int]) -> list[int]:
+        if not candidates:
+            return []
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+        return [c for c, similarity in zip(candidates, similarities, strict=True) if similarity >= self.threshold]
+
+    def add(self, key: str, signature: Signature) -> None:
+        if key in self._indices:
+            raise ValueError(f"Key already indexed: {key}")
+        signature = np.asarray(signature, dtype=np.uint32)
+        if signature.shape != (self.num_perm,):
+            raise ValueError(f"Expected a signature of {self.num_perm} hashes: {signature.shape}")
+        index = len(self._keys)
+        if index == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[index] = signature
+        self._keys.append(key)
+        self._indices[key] = index
+        self._parents.append(index)
+
+        exact_key = signature.tobytes()
+        if exact_key in self._exact:
+            self._union(self._exact[exact_key], index)
+            return
+        self._exact[exact_key] = index
+        band_keys = self._band_keys(signature)
+        for similar in self._similar(signature, self._candidates(band_keys)):
+            self._union(similar, index)
+        for buckets, band_key in zip(self._buckets, band_keys, strict=True):
+            buckets[band_key].append(index)
+
+    def add_many(self, keys: Iterable[str], signatures: Iterable[Signature]) -> None:
+        for key, signature in zip(keys, signatures, strict=True):
+            self.add(key, signature)
+
+    def query(self, signature: Signature) -> list[str]:
+        """Keys of the indexed texts similar to a signature, identical copies are represented by their first copy"""
+        signature = np.asarray(signature, dtype=np.uint32)
+        similar = set(self._similar(signature, self._candidates(self._band_keys(signature))))
+        exact = self._exact.get(signature.tobytes())
+        if exact is not None:
+            similar.add(exact)
+        return [self._keys[i] for i in sorted(similar)]
+
+    def subset(self, keys: Iterable[str]) -> "MinHashLSH":
+        """New index of some of the indexed keys, rebuilt from their stored signatures in their insertion order"""
+        indices = sorted(self._indices[key] for key in keys)
+        index = type(self)(num_perm=self.num_perm, num_bands=self.num_bands, threshold=self.threshold)
+        index.add_many((self._keys[i] for i in indices), self._signatures[indices])
+        return index
+
+    def canonical(self, key: str) -> str:
+        """Key of the canonical member of the cluster of a key, the key itself when it has no duplicate"""
+        return self._keys[self._find(self._indices[key])]
+
+    def clusters(self, min_size: int = 2) -> list[DuplicateCluster]:
+        """Clusters of at least `min_size` texts, their canonical member is the earliest indexed one"""
+        members: defaultdict[int, list[str]] = defaultdict(list)
+        for index, key in enumerate(self._keys):
+            members[self._find(index)].append(key)
+        return [
+            DuplicateCluster(canonical=self._keys[root], members=keys)
+            for root, keys in members.items()
+            if len(keys) >= min_size
+        ]
+
+    def save(self, index_file: Path) -> None:
+        """Save the keys and signatures, buckets and clusters are rebuilt on load"""
+        index_file = Path(index_file)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = index_file.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_file,
+            keys=np.array(self._keys, dtype=np.str_),
+            signatures=self._signatures[: len(self._keys)],
+            params=np.array([self.num_perm, self.num_bands, self.threshold]),
+        )
+        tmp_file.replace(index_file)
+
+    @classmethod
+    def load(cls, index_file: Path) -> "MinHashLSH":
+        with np.load(index_file) as data:
+            num_perm, num_bands, threshold = data["params"].tolist()
+            index = cls(num_perm=int(num_perm), num_bands=int(num_bands), threshold=threshold)
+            index.add_many(data["keys"].tolist(), data["signatures"])
+        return index
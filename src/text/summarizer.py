@@ -0,0 +1,167 @@
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel
+from scipy import sparse
+
+from .chunker import split_sentences
+from .tfidf import TfidfVocabulary
+
+__all__ = [
+    "ExtractiveSummarizer",
+    "SummarySentence",
+    "summarize_texts",
+]
+
+DEFAULT_NUM_SENTENCES = 5
+DEFAULT_LABEL_WEIGHT = 0.5
+DEFAULT_MIN_LABEL_SCORE = 0.1
+DEFAULT_MIN_SENTENCE_TOKENS = 5
+DEFAULT_MAX_TEXTRANK_SENTENCES = 1000
+DEFAULT_SUMMARY_BATCH_SIZE = 256
+_DAMPING = 0.85
+_TEXTRANK_ITERATIONS = 50
+_TEXTRANK_TOLERANCE = 1e-6
+
+
+class SummarySentence(BaseModel):
+    start: int
+    end: int
+    score: float
+    label: None | int = None
+    label_score: float = 0
+
+    def get_text(self, text: str) -> str:
+        return text[self.start : self.end]
+
+
+def _textrank(similarities: sparse.csr_matrix) -> npt.NDArray[np.float64]:
+    """PageRank of the sentences over the graph of their similarities"""
+    size = similarities.shape[0]
+    similarities = similarities.tolil()
+    similarities.setdiag(0)
+    similarities = similarities.tocsr()
+    out_weights = np.asarray(similarities.sum(axis=1)).ravel()
+    out_weights[out_weights == 0] = 1
+    transitions = sparse.csr_matrix(sparse.diags(1 / out_weights) @ similarities).T.tocsr()
+    ranks = np.full(size, 1 / size)
+    for _ in range(_TEXTRANK_ITERATIONS):
+        new_ranks: npt.NDArray[np.float64] = (1 - _DAMPING) / size + _DAMPING * (transitions @ ranks)
+        if np.abs(new_ranks - ranks).sum() < _TEXTRANK_TOLERANCE:
+            return new_ranks
+        ranks = new_ranks
+    return ranks
+
+
+class ExtractiveSummarizer:
+    """Extract the most central and most label-like sentences of texts, with a shared fitted tf-idf vocabulary.
+
+    Sentences are ranked by TextRank over their tf-idf cosine similarities, or by their similarity to the centroid of
+    the text beyond `max_textrank_sentences` sentences to keep the similarity matrix small. `labels` maps label ids to
+    descriptive texts: the score of a sentence is blended with its similarity to the closest label by `label_weight`,
+    and that label is given to the sentence when the similarity reaches `min_label_score`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        vocabulary: TfidfVocabulary,
+        labels: None | Mapping[int, str] = None,
+        num_sentences: int = DEFAULT_NUM_SENTENCES,
+        label_weight: float = DEFAULT_LABEL_WEIGHT,
+        min_label_score: float = DEFAULT_MIN_LABEL_SCORE,
+        min_sentence_tokens: int = DEFAULT_MIN_SENTENCE_TOKENS,
+        max_textrank_sentences: int = DEFAULT_MAX_TEXTRANK_SENTENCES,
+    ) -> None:
+        if not 0 <= label_weight <= 1:
+            raise ValueError(f"Expected 0 <= label_weight <= 1: {label_weight}")
+        self.vocabulary = vocabulary
+        self.num_sentences = num_sentences
+        self.label_weight = label_weight if labels else 0
+        self.min_label_score = min_label_score
+        self.min_sentence_tokens = min_sentence_tokens
+        self.max_textrank_sentences = max_textrank_sentences
+        self.label_ids = np.array(list(labels or {}), dtype=np.int64)
+        self.label_vectors = vocabulary.transform((labels or {}).values())
+
+    def _centrality(self, vectors: sparse.csr_matrix) -> npt.NDArray[np.float64]:
+        scores: npt.NDArray[np.float64]
+        if vectors.shape[0] <= self.max_textrank_sentences:
+            scores = _textrank(sparse.csr_matrix(vectors @ vectors.T))
+        else:
+            centroid = np.asarray(vectors.mean(axis=0)).ravel()
+            scores = np.asarray(vectors @ centroid, dtype=np.float64)
+        max_score = float(scores.max())
+        return scores / max_score if max_score > 0 else scores
+
+    def summarize(self, text: str) -> list[SummarySentence]:
+        """Up to `num_sentences` best sentences, in the order of the text"""
+        tokenizer = self.vocabulary.tokenizer
+        spans = [
+            (start, end)
+            for start, end in split_sentences(text)
+            if tokenizer.count(text[start:end]) >= self.min_sentence_tokens
+        ]
+        if not spans:
+            return []
+        vectors = self.vocabulary.transform(text[start:end] for start, end in spans)
+        scores = self._centrality(vectors)
+        labels: npt.NDArray[np.int64] = np.full(len(spans), -1, dtype=np.int64)
+        label_scores = np.zeros(len(spans))
+        if len(self.label_ids):
+            label_similarities = (vectors @ self.label_vectors.T).toarray()
+            best = label_similarities.argmax(axis=1)
+            label_scores = label_similarities[np.arange(len(spans)), best]
+            labels = np.where(label_scores >= self.min_label_score, self.label_ids[best], -1).astype(np.int64)
+            scores = (1 - self.label_weight) * scores + self.label_weight * label_scores
+
+        selected = np.sort(np.argsort(-scores, kind="stable")[: self.num_sentences])
+        return [
+            SummarySentence(
+                start=spans[i][0],
+                end=spans[i][1],
+                score=float(scores[i]),
+                label=int(labels[i]) if labels[i] >= 0 else None,
+                label_score=float(label_scores[i]),
+            )
+            for i in selected
+        ]
+
+    def summarize_many(self, texts: Iterable[str]) -> Iterator[list[SummarySentence]]:
+        for text in texts:
+            yield self.summarize(text)
+
+
+# the summarizer of a worker process, sent once when the process starts instead of with every text
+_worker_summarizers: dict[str, ExtractiveSummarizer] = {}
+
+
+def _init_worker(summarizer: ExtractiveSummarizer) -> None:
+    _worker_summarizers["summarizer"] = summarizer
+
+
+def _summarize_in_worker(text: str) -> list[SummarySentence]:
+    return _worker_summarizers["summarizer"].summarize(text)
+
+
+def summarize_texts(
+    texts: Iterable[str],
+    summarizer: ExtractiveSummarizer,
+    processes: int = 0,
+    batch_size: int = DEFAULT_SUMMARY_BATCH_SIZE,
+) -> Iterator[list[SummarySentence]]:
+    """Stream the summaries of every text, in order.
+
+    Texts are read by batches and summarized in a pool of `processes` processes when given, each process receiving the
+    summarizer once.
+    """
+    if not processes:
+        yield from summarizer.summarize_many(texts)
+        return
+    texts_iter = iter(texts)
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(summarizer,)) as executor:
+        while batch := list(islice(texts_iter, batch_size)):
+            chunksize = max(len(batch) // (processes * 4), 1)
+            yield from executor.map(_summarize_in_worker, batch, chunksize=chunksize)
@@ -0,0 +1,90 @@
+import json
+import re
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+from scipy import sparse
+
+from .tokenizer import RegexTokenizer
+
+__all__ = [
+    "TfidfVocabulary",
+]
+
+DEFAULT_MIN_DF = 2
+DEFAULT_MAX_DF = 0.9
+
+# words only, punctuation carries no topic
+_WORD_RE = re.compile(r"\w+")
+
+
+class TfidfVocabulary:
+    """Vocabulary and inverse document frequencies fitted once on a corpus, then reused to vectorize any text.
+
+    Terms in fewer than `min_df` documents or in more than a `max_df` fraction of them are dropped, the latter are
+    the stop words of the corpus. Vectors are sublinear tf-idf rows of a CSR matrix, normalized to unit length so their
+    dot products are cosine similarities.
+    """
+
+    def __init__(self, terms: None | dict[str, int] = None, idf: None | npt.NDArray[np.float64] = None) -> None:
+        self.terms = terms or {}
+        self.idf = idf if idf is not None else np.empty(0)
+        self.tokenizer = RegexTokenizer(pattern=_WORD_RE)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def fit(
+        cls, texts: Iterable[str], min_df: int = DEFAULT_MIN_DF, max_df: float = DEFAULT_MAX_DF
+    ) -> "TfidfVocabulary":
+        vocabulary = cls()
+        document_frequencies: Counter[str] = Counter()
+        num_documents = 0
+        for text in texts:
+            document_frequencies.update(set(vocabulary.tokenizer.tokenize(text)))
+            num_documents += 1
+        max_count = max_df * num_documents
+        kept = sorted(term for term, df in document_frequencies.items() if min_df <= df <= max_count)
+        vocabulary.terms = {term: i for i, term in enumerate(kept)}
+        df = np.array([document_frequencies[term] for term in kept], dtype=np.float64)
+        # smoothed idf, as if one more document contained every term
+        vocabulary.idf = np.log((1 + num_documents) / (1 + df)) + 1
+        return vocabulary
+
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """`(len(texts), len(vocabulary))` matrix of unit length tf-idf rows, texts without known terms are zero rows"""
+        indptr = [0]
+        indices: list[int] = []
+        counts: list[int] = []
+        for text in texts:
+            term_counts = Counter(
+                i for token in self.tokenizer.tokenize(text) if (i := self.terms.get(token)) is not None
+            )
+            indices.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+            indptr.append(len(indices))
+        indices_array = np.array(indices, dtype=np.int32)
+        weights = (1 + np.log(np.array(counts, dtype=np.float64))) * self.idf[indices_array]
+        matrix = sparse.csr_matrix((weights, indices_array, indptr), shape=(len(indptr) - 1, len(self.terms)))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+    def save(self, vocabulary_file: Path) -> None:
+        vocabulary_file = Path(vocabulary_file)
+        vocabulary_file.parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.terms, key=self.terms.__getitem__)
+        tmp_file = vocabulary_file.with_suffix(".tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            json.dump({"terms": terms, "idf": self.idf.tolist()}, f)
+        tmp_file.replace(vocabulary_file)
+
+    @classmethod
+    def load(cls, vocabulary_file: Path) -> "TfidfVocabulary":
+        with Path(vocabulary_file).open(encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(terms={term: i for i, term in enumerate(data["terms"])}, idf=np.array(data["idf"]))
@@ -0,0 +1,28 @@
+import re
+
+__all__ = [
+    "RegexTokenizer",
+]
+
+# words, numbers, and every other non space character on its own, a rough match of subword tokenizers counts on
+# english legal text without any model file
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class RegexTokenizer:
+    """Local tokenizer splitting words and punctuation, with character offsets"""
+
+    def __init__(self, pattern: re.Pattern[str] = _TOKEN_RE, lowercase: bool = True) -> None:
+        self.pattern = pattern
+        self.lowercase = lowercase
+
+    def tokenize(self, text: str) -> list[str]:
+        tokens = self.pattern.findall(text)
+        return [t.lower() for t in tokens] if self.lowercase else tokens
+
+    def count(self, text: str) -> int:
+        return len(self.pattern.findall(text))
+
+    def spans(self, text: str) -> list[tuple[int, int]]:
+        """`(start, end)` character offsets of the tokens"""
+        return [m.span() for m in self.pattern.finditer(text)]
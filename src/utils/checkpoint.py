@@ -0,0 +1,131 @@
+from collections.abc import AsyncIterable, Iterator, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Generic, TextIO, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+
+class CheckpointEntry(BaseModel, Generic[ModelType]):
+    id: int  # noqa: A003
+    error: None | str = None
+    results: list[ModelType] = []
+
+    @property
+    def is_done(self) -> bool:
+        return self.error is None
+
+
+def get_checkpoint_file(output_file: Path) -> Path:
+    return output_file.parent / f"{output_file.name}.checkpoint.ndjson"
+
+
+class CrawlCheckpoint(Generic[ModelType]):
+    """Append-only journal of the completed and failed ids of a crawl, along with their results.
+
+    Every entry is flushed as soon as it is recorded so a crashed crawl can be resumed from the last completed id. A
+    truncated trailing line (e.g. from a killed process) is ignored on load.
+    """
+
+    def __init__(self, output_file: Path, model_type: type[ModelType], resume: bool = False) -> None:
+        self.path = get_checkpoint_file(output_file=Path(output_file))
+        self.resume = resume
+        self.done_ids: set[int] = set()
+        self.failed_ids: set[int] = set()
+        self._entry_type: type[CheckpointEntry[ModelType]] = CheckpointEntry[model_type]  # type: ignore[valid-type]
+        self._entry_adapter: TypeAdapter[CheckpointEntry[ModelType]] = TypeAdapter(self._entry_type)
+        self._f: None | TextIO = None
+
+    def _iter_entries(self) -> Iterator[CheckpointEntry[ModelType]]:
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield self._entry_adapter.validate_json(line)
+                except ValidationError:
+                    logger.warning(f"Skipping corrupted checkpoint entry in {self.path}")
+
+    def _load(self) -> None:
+        for entry in self._iter_entries():
+            if entry.is_done:
+                self.done_ids.add(entry.id)
+                self.failed_ids.discard(entry.id)
+            elif entry.id not in self.done_ids:
+                self.failed_ids.add(entry.id)
+        logger.info(f"Loaded checkpoint {self.path}: {len(self.done_ids)} done, {len(self.failed_ids)} failed")
+
+    def open(self) -> "CrawlCheckpoint[ModelType]":  # noqa: A003
+        if self.resume:
+            self._load()
+        else:
+            self.path.unlink(missing_ok=True)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("a")
+        if self._f.tell():
+            # make sure a truncated trailing line does not swallow the next entry
+            self._f.write("\n")
+            self._f.flush()
+        return self
+
+    def close(self) -> None:
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def remove(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def _append(self, entry: CheckpointEntry[ModelType]) -> None:
+        if not self._f:
+            raise RuntimeError("Checkpoint is not opened")
+        self._f.write(entry.model_dump_json(by_alias=True) + "\n")
+        self._f.flush()
+
+    def record_success(self, item_id: int, results: Sequence[ModelType]) -> None:
+        self._append(self._entry_type(id=item_id, results=list(results)))
+        self.done_ids.add(item_id)
+        self.failed_ids.discard(item_id)
+
+    def record_failure(self, item_id: int, error: BaseException) -> None:
+        self._append(self._entry_type(id=item_id, error=repr(error)))
+        self.failed_ids.add(item_id)
+
+    async def record_all(
+        self, item_results: AsyncIterable[tuple[int, ModelType | list[ModelType] | BaseException]]
+    ) -> None:
+        """Record `(id, result(s) or exception)` pairs as they are produced"""
+        async for item_id, res in item_results:
+            if isinstance(res, BaseException):
+                logger.error(f"Failed to query item with id {item_id}: {res}")
+                self.record_failure(item_id=item_id, error=res)
+            else:
+                self.record_success(item_id=item_id, results=res if isinstance(res, list) else [res])
+
+    def iter_results(self) -> Iterator[ModelType]:
+        """Lazily read back the results of all completed ids"""
+        if self._f:
+            self._f.flush()
+        seen_ids: set[int] = set()
+        for entry in self._iter_entries():
+            if entry.is_done and entry.id not in seen_ids:
+                seen_ids.add(entry.id)
+                yield from entry.results
+
+    def __enter__(self) -> "CrawlCheckpoint[ModelType]":
+        return self.open()
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        self.close()
@@ -1,45 +1,203 @@
 import gzip
+import io
 import json
-import shutil
-from collections.abc import Iterable
+from collections.abc import AsyncIterable, Iterable, Iterator, Sequence
+from functools import lru_cache
 from pathlib import Path
+from types import TracebackType
+from typing import Any, TypeVar
 
-import ndjson
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
 
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_READ_BATCH_SIZE = 1000
 
-def gzip_file(input_path: Path, output_path: None | Path = None, keep: bool = False) -> None:
-    if not output_path:
-        output_path = input_path.parent / f"{input_path.name}.gz"
-    with input_path.open("rb") as f_in, gzip.open(output_path, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
-    if not keep:
-        input_path.unlink()
+ModelType = TypeVar("ModelType", bound=BaseModel)
 
 
-def _get_ndjson_file_from_gz_file(ndjson_gz_fp: Path) -> Path:
+def _validate_ndjson_gz_file(ndjson_gz_fp: Path) -> Path:
     if not ndjson_gz_fp.name.endswith(".ndjson.gz"):
         raise ValueError("Output file must end with .ndjson.gz")
-    return ndjson_gz_fp.parent / ndjson_gz_fp.stem
+    return ndjson_gz_fp
 
 
-def write_ndjson_gz(data: list[dict], output_file: Path) -> None:
-    ndjson_file = _get_ndjson_file_from_gz_file(ndjson_gz_fp=output_file)
-    with ndjson_file.open("w") as f:
-        ndjson.dump(data, f)
-    gzip_file(ndjson_file, output_file, keep=False)
+class NdjsonGzWriter:
+    """Compress ndjson records in a single pass as they are written.
+
+    Records go to a temporary file next to `output_file` which is atomically renamed on a clean exit, so readers never
+    see a partial dump and a failed write leaves the previous file untouched.
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        compress_level: int = DEFAULT_COMPRESS_LEVEL,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        self.output_file = _validate_ndjson_gz_file(ndjson_gz_fp=Path(output_file))
+        self.tmp_file = self.output_file.parent / f".{self.output_file.name}.tmp"
+        self.compress_level = compress_level
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._raw: None | io.BufferedWriter = None
+        self._gz: None | gzip.GzipFile = None
+        self._buf: None | io.BufferedWriter = None
+
+    def open(self) -> "NdjsonGzWriter":  # noqa: A003
+        self._raw = self.tmp_file.open("wb")
+        self._gz = gzip.GzipFile(
+            filename=self.output_file.stem, mode="wb", compresslevel=self.compress_level, fileobj=self._raw
+        )
+        self._buf = io.BufferedWriter(self._gz, buffer_size=self.buffer_size)  # type: ignore[arg-type]
+        return self
+
+    def write_line(self, line: str | bytes) -> None:
+        if not self._buf:
+            raise RuntimeError("Writer is not opened")
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        self._buf.write(line)
+        self._buf.write(b"\n")
+        self.count += 1
+
+    def write(self, record: dict) -> None:
+        self.write_line(json.dumps(record))
+
+    def write_model(self, model: BaseModel, **model_dump_conf: Any) -> None:
+        self.write_line(model.model_dump_json(**model_dump_conf))
+
+    def close(self, commit: bool = True) -> None:
+        for f in (self._buf, self._gz, self._raw):
+            if f:
+                f.close()
+        self._raw = self._gz = self._buf = None
+        if commit:
+            self.tmp_file.replace(self.output_file)
+        else:
+            self.tmp_file.unlink(missing_ok=True)
+
+    def __enter__(self) -> "NdjsonGzWriter":
+        return self.open()
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        self.close(commit=exc_type is None)
+
+
+def write_ndjson_gz(
+    data: Iterable[dict],
+    output_file: Path,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> int:
+    with NdjsonGzWriter(output_file=output_file, compress_level=compress_level, buffer_size=buffer_size) as writer:
+        for record in data:
+            writer.write(record)
+    return writer.count
 
 
 def write_pydantic_models_ndjson_gz(
-    models: Iterable[BaseModel], output_file: Path, model_dump_conf: None | dict = None
-) -> None:
-    ndjson_file = _get_ndjson_file_from_gz_file(ndjson_gz_fp=output_file)
+    models: Iterable[BaseModel],
+    output_file: Path,
+    model_dump_conf: None | dict = None,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> int:
+    if not model_dump_conf:
+        model_dump_conf = {"by_alias": True}
+    with NdjsonGzWriter(output_file=output_file, compress_level=compress_level, buffer_size=buffer_size) as writer:
+        for mod in models:
+            writer.write_model(mod, **model_dump_conf)
+    return writer.count
+
 
+async def async_write_pydantic_models_ndjson_gz(
+    models: AsyncIterable[BaseModel],
+    output_file: Path,
+    model_dump_conf: None | dict = None,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+) -> int:
+    """Write models to a gzipped ndjson file as they are produced, return the number of written models"""
     if not model_dump_conf:
         model_dump_conf = {"by_alias": True}
-    with ndjson_file.open("w") as f:
-        f.writelines(mod.model_dump_json(**model_dump_conf) + "\n" for mod in models)
-    gzip_file(ndjson_file, output_file, keep=False)
+    with NdjsonGzWriter(output_file=output_file, compress_level=compress_level, buffer_size=buffer_size) as writer:
+        async for mod in models:
+            writer.write_model(mod, **model_dump_conf)
+    return writer.count
+
+
+def _iter_ndjson_gz_line_batches(input_path: Path, batch_size: int) -> Iterator[list[bytes]]:
+    batch: list[bytes] = []
+    with gzip.open(Path(input_path), "rb") as in_f:
+        for line in in_f:
+            line = line.rstrip(b"\r\n")  # noqa: PLW2901
+            if not line:
+                continue
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _as_json_array(lines: list[bytes]) -> bytes:
+    return b"[" + b",".join(lines) + b"]"
+
+
+@lru_cache
+def _get_list_adapter(item_type: type) -> TypeAdapter:
+    return TypeAdapter(list[item_type])  # type: ignore[valid-type]
+
+
+@lru_cache
+def _get_projection_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    projection = TypedDict("projection", {field: Any for field in fields}, total=False)  # type: ignore[misc]
+    return _get_list_adapter(projection)
+
+
+def iter_ndjson_gz(input_path: Path, batch_size: int = DEFAULT_READ_BATCH_SIZE) -> Iterator[dict]:
+    """Lazily read records of a gzipped ndjson file"""
+    adapter = _get_list_adapter(dict)
+    for lines in _iter_ndjson_gz_line_batches(input_path=input_path, batch_size=batch_size):
+        yield from adapter.validate_json(_as_json_array(lines))
+
+
+def iter_ndjson_gz_models(
+    input_path: Path, model_type: type[ModelType], batch_size: int = DEFAULT_READ_BATCH_SIZE
+) -> Iterator[list[ModelType]]:
+    """Lazily read batches of a gzipped ndjson file, decoding the raw lines directly into `model_type`"""
+    adapter = _get_list_adapter(model_type)
+    for lines in _iter_ndjson_gz_line_batches(input_path=input_path, batch_size=batch_size):
+        yield adapter.validate_json(_as_json_array(lines))
+
+
+def iter_ndjson_gz_projections(
+    input_path: Path, fields: Sequence[str], batch_size: int = DEFAULT_READ_BATCH_SIZE
+) -> Iterator[list[dict]]:
+    """Lazily read batches of a gzipped ndjson file, keeping only the top level `fields` of each record.
+
+    Fields are matched against the raw json keys (i.e. aliases), records missing a field simply omit it.
+    """
+    adapter = _get_projection_adapter(tuple(fields))
+    for lines in _iter_ndjson_gz_line_batches(input_path=input_path, batch_size=batch_size):
+        yield adapter.validate_json(_as_json_array(lines))
+
+
+def read_ndjson_gz_field(input_path: Path, field: str, batch_size: int = DEFAULT_READ_BATCH_SIZE) -> list[Any]:
+    """Read a single field of every record of a gzipped ndjson file, e.g. all ids of a dump"""
+    return [
+        rec[field]
+        for batch in iter_ndjson_gz_projections(input_path=input_path, fields=(field,), batch_size=batch_size)
+        for rec in batch
+    ]
 
 
 def read_ndjson_gz(input_path: Path, decoder: str = "utf-8") -> list[dict]:
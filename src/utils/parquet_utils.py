@@ -0,0 +1,138 @@
+import shutil
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+DEFAULT_MAX_ROWS_PER_FILE = 1024 * 1024
+DEFAULT_PARQUET_COMPRESSION = "zstd"
+
+
+class ParquetDatasetWriter:
+    """Stream rows into a directory of parquet files, holding at most one row group in memory.
+
+    Rows are buffered column-wise and flushed as a row group every `row_group_size` rows, a new part file is started
+    every `max_rows_per_file` rows. Parts go to a temporary directory next to `output_dir` which replaces it on a clean
+    exit, so readers never see a partial dataset. The previous dataset is renamed aside before the replace and only
+    deleted after it, readers may briefly find no dataset between both renames but a crash never loses the previous
+    one, it is restored by the next `open`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        output_dir: Path,
+        schema: pa.Schema,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        max_rows_per_file: int = DEFAULT_MAX_ROWS_PER_FILE,
+        compression: str = DEFAULT_PARQUET_COMPRESSION,
+    ) -> None:
+        if row_group_size < 1 or max_rows_per_file < row_group_size:
+            raise ValueError(f"Expected 0 < row_group_size <= max_rows_per_file: {row_group_size}, {max_rows_per_file}")
+        self.output_dir = Path(output_dir)
+        self.tmp_dir = self.output_dir.parent / f".{self.output_dir.name}.tmp"
+        self.old_dir = self.output_dir.parent / f".{self.output_dir.name}.old"
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.max_rows_per_file = max_rows_per_file
+        self.compression = compression
+        self.count = 0
+        self._columns: dict[str, list] = {name: [] for name in schema.names}
+        self._buffered_count = 0
+        self._file_count = 0
+        self._file_row_count = 0
+        self._writer: None | pq.ParquetWriter = None
+        self._is_open = False
+
+    def open(self) -> "ParquetDatasetWriter":  # noqa: A003
+        if self.old_dir.exists():
+            # a previous commit crashed between its renames
+            if self.output_dir.exists():
+                shutil.rmtree(self.old_dir)
+            else:
+                self.old_dir.replace(self.output_dir)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.tmp_dir.mkdir(parents=True)
+        self._is_open = True
+        return self
+
+    def write(self, row: Mapping[str, Any]) -> None:
+        if not self._is_open:
+            raise RuntimeError("Writer is not opened")
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self._buffered_count += 1
+        self.count += 1
+        if self._buffered_count >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """Write the buffered rows as a row group"""
+        if not self._buffered_count:
+            return
+        if self._writer is None or self._file_row_count >= self.max_rows_per_file:
+            self._open_next_file()
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)  # type: ignore[union-attr]
+        self._file_row_count += self._buffered_count
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered_count = 0
+
+    def _open_next_file(self) -> None:
+        if self._writer:
+            self._writer.close()
+        part_file = self.tmp_dir / f"part-{self._file_count:05d}.parquet"
+        self._writer = pq.ParquetWriter(part_file, schema=self.schema, compression=self.compression)
+        self._file_count += 1
+        self._file_row_count = 0
+
+    def close(self, commit: bool = True) -> None:
+        if commit:
+            self.flush()
+            if self._writer is None:
+                # an empty dataset still has a schema
+                self._open_next_file()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        self._is_open = False
+        if commit:
+            self._commit()
+        else:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _commit(self) -> None:
+        has_previous = self.output_dir.exists()
+        if has_previous:
+            self.output_dir.replace(self.old_dir)
+        try:
+            self.tmp_dir.replace(self.output_dir)
+        except OSError:
+            if has_previous:
+                self.old_dir.replace(self.output_dir)
+            raise
+        if has_previous:
+            shutil.rmtree(self.old_dir, ignore_errors=True)
+
+    def __enter__(self) -> "ParquetDatasetWriter":
+        return self.open()
+
+    def __exit__(
+        self,
+        exc_type: None | type[BaseException],
+        exc_val: None | BaseException,
+        exc_tb: None | TracebackType,
+    ) -> None:
+        self.close(commit=exc_type is None)
+
+
+def read_parquet_columns(input_dir: Path, columns: None | list[str] = None) -> pa.Table:
+    """Read only the given columns of a parquet dataset"""
+    return pq.read_table(input_dir, columns=columns)
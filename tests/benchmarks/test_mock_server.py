@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from aiohttp import ClientResponseError, ClientSession
+
+from src.benchmarks.mock_server import MockServerConfig, MockToSDRServer, make_case_page_html
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import APIClient, EditSiteClient, parse_case_points_from_html
+
+FAST_RATE = 1000.0
+
+
+def _fast_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(initial_rate=FAST_RATE, max_rate=FAST_RATE)
+
+
+def test_case_page_html_parses() -> None:
+    case_points = parse_case_points_from_html(markup=make_case_page_html(case_id=3, num_rows=7), case_id=3)
+    assert len(case_points) == 7  # noqa: PLR2004
+    assert case_points[0].service_name == "Service 0"
+    assert case_points[0].quote.startswith('"Quote 0 of case 3')
+
+
+@pytest.mark.asyncio
+async def test_mock_server_endpoints() -> None:
+    config = MockServerConfig(num_services=25, num_cases=12, page_size=10, case_points_per_case=4)
+    async with MockToSDRServer(config=config) as server:
+        async with APIClient(num_workers=4, rate_limiter=_fast_limiter()) as api_client, EditSiteClient(
+            num_workers=4, rate_limiter=_fast_limiter()
+        ) as edit_client:
+            api_client.base_url = edit_client.base_url = server.url
+            services_metadata = [serv async for serv in api_client.async_iter_all_services_metadata()]
+            assert sorted(serv.id for serv in services_metadata) == list(range(1, 26))
+            service = await api_client.async_get_service(service_id=5)
+            assert len(service.points) == config.points_per_service
+            cases = [case async for case in api_client.async_iter_all_cases()]
+            assert len(cases) == config.num_cases
+            assert len(await edit_client.async_get_case_points(case_id=2)) == config.case_points_per_case
+
+        # speculative pages past the end may reach the server before they are cancelled
+        assert server.request_counts["/service/v1"] >= 4  # noqa: PLR2004
+        assert server.request_counts["/case/v1"] >= 2  # noqa: PLR2004
+        assert server.request_counts["/cases/{case_id}"] == 1
+        async with ClientSession() as session, session.get(f"{server.url}/service/v1?service=26") as resp:
+            assert resp.status == 404  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_mock_server_latency_and_throttling() -> None:
+    config = MockServerConfig(num_services=5, latency=0.05, throttle_rate=0.5, retry_after=0, seed=1)
+    async with MockToSDRServer(config=config) as server:
+        async with ClientSession() as session:
+            statuses = []
+            start = time.monotonic()
+            for _ in range(10):
+                async with session.get(f"{server.url}/service/v1", params={"service": 1}) as resp:
+                    statuses.append(resp.status)
+            assert time.monotonic() - start >= 10 * config.latency
+        assert 429 in statuses and 200 in statuses  # noqa: PLR2004
+        assert server.throttled_counts["/service/v1"] == statuses.count(429)
+
+        async with APIClient(rate_limiter=_fast_limiter()) as client:
+            client.base_url = server.url
+            service = await client.async_get_service(service_id=1)
+            assert service.id == 1, "Expected throttled requests to be retried"
+
+
+@pytest.mark.asyncio
+async def test_mock_server_always_throttling() -> None:
+    async with MockToSDRServer(config=MockServerConfig(throttle_rate=1)) as server, ClientSession(
+        raise_for_status=True
+    ) as session:
+        with pytest.raises(ClientResponseError) as exc_info:
+            await session.get(f"{server.url}/case/v1")
+        assert exc_info.value.status == 429  # noqa: PLR2004
+        assert exc_info.value.headers is not None and exc_info.value.headers["Retry-After"] == "0"
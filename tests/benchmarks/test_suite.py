@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from src.benchmarks.mock_server import MockServerConfig
+from src.benchmarks.suite import (
+    BenchmarkResult,
+    BenchmarkRun,
+    SuiteConfig,
+    compare_runs,
+    find_baseline,
+    load_run,
+    run_suite,
+    save_run,
+    time_function,
+)
+
+
+def _run(means: dict[str, float], config: None | SuiteConfig = None) -> BenchmarkRun:
+    return BenchmarkRun(
+        created_at=datetime.now(tz=timezone.utc),
+        python_version="3.11",
+        platform="test",
+        config=config,
+        results=[
+            BenchmarkResult(name=name, repeat=1, items=10, mean=mean, stdev=0, min=mean, max=mean)
+            for name, mean in means.items()
+        ],
+    )
+
+
+def test_time_function() -> None:
+    calls = []
+
+    def _func() -> int:
+        calls.append(1)
+        return 3
+
+    result = time_function("func", _func, repeat=4, warmup=2)
+    assert len(calls) == 6, "Expected warmup runs not to be timed"  # noqa: PLR2004
+    assert result.repeat == 4  # noqa: PLR2004
+    assert result.items == 3  # noqa: PLR2004
+    assert 0 <= result.min <= result.mean <= result.max
+    assert result.throughput > 0
+
+
+def test_compare_runs() -> None:
+    comparisons = compare_runs(
+        baseline=_run({"a": 1.0, "b": 1.0, "removed": 1.0}), current=_run({"a": 1.05, "b": 1.5, "new": 1.0})
+    )
+    assert [(c.name, c.is_regression) for c in comparisons] == [("a", False), ("b", True)]
+    assert comparisons[1].change == pytest.approx(0.5)
+
+
+def test_save_load_run(tmp_path: Path) -> None:
+    run = _run({"a": 1.0})
+    run_file = save_run(run=run, results_dir=tmp_path / "results")
+    assert run_file.parent == tmp_path / "results"
+    assert load_run(run_file) == run
+
+
+def test_find_baseline(tmp_path: Path) -> None:
+    results_dir = tmp_path / "results"
+    config = SuiteConfig(repeat=1)
+    assert find_baseline(results_dir=results_dir, config=config) is None
+    same_config_file = save_run(run=_run({"a": 1.0}, config=config), results_dir=results_dir)
+    save_run(run=_run({"a": 1.0}, config=SuiteConfig(repeat=1, crawl_workers=1)), results_dir=results_dir)
+    save_run(run=_run({"a": 1.0}), results_dir=results_dir)
+    assert find_baseline(results_dir=results_dir, config=config) == same_config_file, "Expected the same config only"
+
+
+def test_run_suite() -> None:
+    config = SuiteConfig(
+        repeat=1,
+        num_services=10,
+        case_page_rows=10,
+        crawl_server=MockServerConfig(num_services=15, num_cases=3, page_size=10, case_points_per_case=2),
+        crawl_workers=2,
+    )
+    run = run_suite(config=config)
+    assert run.config == config
+    items = {result.name: result.items for result in run.results}
+    assert items == {
+        "html_parser.lxml": 10,
+        "html_parser.bs4": 10,
+        "model_validation.service": 10,
+        "model_validation.services_metadata_page": 10,
+        "ndjson.write_services": 10,
+        "ndjson.read_services": 10,
+        "crawl.end_to_end": 15 + 3 + 3 * 2,
+    }
+    with pytest.raises(ValueError, match="Unknown benchmarks"):
+        run_suite(config=config, names=["nope"])
@@ -1,12 +1,21 @@
-from collections.abc import AsyncIterator
+import asyncio
+from collections.abc import AsyncIterator, Iterator
 
 import pytest
 import pytest_asyncio
 import requests
 from aiohttp import ClientResponseError, ClientSession
 from pytest_mock import MockFixture
-
-from src.data.base_client import DEFAULT_TIMEOUT, BaseAPIClient, BaseAPIOperation
+from requests.adapters import HTTPAdapter
+
+from src.data.base_client import (
+    DEFAULT_TIMEOUT,
+    BaseAPIClient,
+    BaseAPIOperation,
+    ConnectionPoolConfig,
+    PriorityWorkerPool,
+    iter_worker_pool,
+)
 
 TEST_API_URL = "https://jsonplaceholder.typicode.com"
 TEST_POST_ID = 1
@@ -108,6 +117,129 @@ def test_api_op_as_req_kwargs(
     api_op: GetPostOp,
     exp_request_kwargs: dict,
 ) -> None:
-    req_mock = mocker.patch("requests.request")
+    req_mock = mocker.patch("requests.Session.request")
     client.request(api_op=api_op)
     req_mock.assert_called_once_with(**{**default_get_posts_kwargs, **exp_request_kwargs})
+
+
+def test_client_reuses_session(client: BaseAPIClient) -> None:
+    with client:
+        session = client.session
+        assert client.session is session, "Expected the sync session to be reused"
+    assert client._session is None, "Expected the sync session to be closed on exit"
+
+
+def test_client_session_pool_sizes() -> None:
+    pool_config = ConnectionPoolConfig(limit=64, limit_per_host=16)
+    client = BaseAPIClient(base_url=TEST_API_URL, pool_config=pool_config)
+    adapter = client.session.get_adapter(TEST_API_URL)
+    assert isinstance(adapter, HTTPAdapter)
+    # private attributes, not in the stubs
+    assert vars(adapter)["_pool_maxsize"] == pool_config.limit_per_host, "Expected limit_per_host connections per host"
+    assert vars(adapter)["_pool_connections"] == pool_config.limit // pool_config.limit_per_host
+
+
+@pytest.mark.asyncio
+async def test_client_reuses_async_session(client: BaseAPIClient) -> None:
+    async with client:
+        session = client.get_async_session()
+        assert client.get_async_session() is session, "Expected the async session to be reused"
+    assert session.closed, "Expected the async session to be closed on exit"
+
+
+def test_client_run_closes_async_session(client: BaseAPIClient) -> None:
+    async def _get_session() -> ClientSession:
+        return client.get_async_session()
+
+    first_session = client.run(_get_session())
+    assert first_session.closed, "Expected the async session to be closed once the loop is done"
+    second_session = client.run(_get_session())
+    assert second_session is not first_session, "Expected a new async session for a new loop"
+
+
+def test_client_session_per_loop(client: BaseAPIClient) -> None:
+    async def _get_session() -> ClientSession:
+        return client.get_async_session()
+
+    first_loop, second_loop = asyncio.new_event_loop(), asyncio.new_event_loop()
+    try:
+        first_session = first_loop.run_until_complete(_get_session())
+        first_loop.run_until_complete(client.aclose())
+        assert first_session.closed, "Expected aclose to close the session on its loop"
+        second_session = second_loop.run_until_complete(_get_session())
+        assert second_session is not first_session, "Expected a new session for another loop"
+        assert second_loop.run_until_complete(_get_session()) is second_session
+        second_loop.run_until_complete(client.aclose())
+        assert second_session.closed
+    finally:
+        first_loop.close()
+        second_loop.close()
+
+
+async def _delayed(value: int) -> int:
+    await asyncio.sleep(value / 100)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_yields_in_completion_order() -> None:
+    results = [res async for res in iter_worker_pool(func=_delayed, items=[3, 1, 2], num_workers=3)]
+    assert results == [(1, 1), (2, 2), (3, 3)], "Expected results in completion order with their item"
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_bounds_concurrency() -> None:
+    running = 0
+    max_running = 0
+    num_workers = 4
+
+    async def _track(value: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return value
+
+    results = [res async for res in iter_worker_pool(func=_track, items=range(100), num_workers=num_workers)]
+    assert sorted(item for item, _ in results) == list(range(100)), "Expected all items to be processed"
+    assert max_running == num_workers, f"Expected at most {num_workers} items in flight"
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_captures_exceptions() -> None:
+    results = dict([res async for res in iter_worker_pool(func=_delayed, items=[1, -1], num_workers=2)])
+    assert results[1] == 1
+    assert isinstance(results[-1], ValueError), "Expected exception to be yielded instead of raised"
+
+
+@pytest.mark.asyncio
+async def test_priority_worker_pool() -> None:
+    pool: PriorityWorkerPool[int, int] = PriorityWorkerPool(func=_delayed, num_workers=1)
+    for priority, value in enumerate([3, 2, 1]):
+        pool.put(value, priority=-priority)
+    pool.put(-1, priority=10)
+
+    results = []
+    async for item, res in pool.iter_results():
+        results.append((item, res))
+        if item == 1:
+            # the worker already started on 2, an item put while running is picked by priority among the others
+            pool.put(4, priority=-1)
+            pool.close()
+    assert [item for item, _ in results] == [1, 2, 4, 3, -1], "Expected items in priority order"
+    assert isinstance(results[-1][1], ValueError), "Expected exception to be yielded instead of raised"
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.put(5)
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_propagates_items_failure() -> None:
+    def _items() -> Iterator[int]:
+        yield 1
+        raise RuntimeError("items failed")
+
+    with pytest.raises(RuntimeError, match="items failed"):
+        _ = [res async for res in iter_worker_pool(func=_delayed, items=_items(), num_workers=2)]
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from aiohttp import ClientResponseError
+from pytest_mock import MockFixture
+
+from src.benchmarks.mock_server import MockServerConfig, MockToSDRServer
+from src.data.base_client import BaseAPIClient
+from src.data.metrics import ClientMetrics, Histogram, normalize_endpoint
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import APIClient, DocumentClient, EditSiteClient
+
+FAST_RATE = 1000.0
+
+
+def _fast_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(initial_rate=FAST_RATE, min_rate=FAST_RATE / 2, max_rate=FAST_RATE)
+
+
+def test_normalize_endpoint() -> None:
+    assert normalize_endpoint("/cases/123") == "/cases/{id}"
+    assert normalize_endpoint("/service/v1/") == "/service/v1/"
+    assert normalize_endpoint("/a/1/b/22/c3") == "/a/{id}/b/{id}/c3"
+    assert normalize_endpoint("") == "/"
+
+
+def test_histogram() -> None:
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.count == 5  # noqa: PLR2004
+    assert histogram.mean == pytest.approx(16.5 / 5)
+    assert histogram.max == 10  # noqa: PLR2004
+    assert histogram.quantile(0.5) == pytest.approx(1.75), "Expected an interpolation within the (1, 2] bucket"
+    assert histogram.quantile(1) == 10  # noqa: PLR2004
+    assert Histogram().quantile(0.5) == 0
+
+    other = Histogram(buckets=(1, 2, 4))
+    other.observe(20)
+    histogram.merge(other)
+    assert histogram.counts == [1, 2, 1, 2]
+    assert histogram.max == 20  # noqa: PLR2004
+    with pytest.raises(ValueError, match="different buckets"):
+        histogram.merge(Histogram(buckets=(1,)))
+
+
+def test_metrics_dumps() -> None:
+    metrics = ClientMetrics(latency_buckets=(0.1, 1))
+    key = ("api.tosdr.org", "/service/v1")
+    metrics.observe_request(key=key, duration=0.05, status=200, bytes_received=100)
+    metrics.observe_request(key=key, duration=0.5, status=429)
+    metrics.observe_request(key=key, duration=2, error=TimeoutError())
+    metrics.record_retry(key)
+    metrics.observe_rate_limit_wait(key=key, duration=0.2)
+
+    prometheus = metrics.to_prometheus().splitlines()
+    labels = 'host="api.tosdr.org",endpoint="/service/v1"'
+    for line in (
+        f"tosdr_client_requests_total{{{labels}}} 3",
+        f'tosdr_client_responses_total{{{labels},status="429"}} 1',
+        f'tosdr_client_errors_total{{{labels},error="TimeoutError"}} 1',
+        f"tosdr_client_retries_total{{{labels}}} 1",
+        f"tosdr_client_received_bytes_total{{{labels}}} 100",
+        f'tosdr_client_request_duration_seconds_bucket{{{labels},le="0.1"}} 1',
+        f'tosdr_client_request_duration_seconds_bucket{{{labels},le="1"}} 2',
+        f'tosdr_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3',
+        f"tosdr_client_request_duration_seconds_count{{{labels}}} 3",
+        f"tosdr_client_rate_limit_wait_seconds_sum{{{labels}}} 0.2",
+        "# TYPE tosdr_client_request_duration_seconds histogram",
+    ):
+        assert line in prometheus, f"Expected {line} in the Prometheus dump"
+
+    (summary,) = json.loads(metrics.to_json())
+    assert summary["statuses"] == {"200": 1, "429": 1}
+    assert summary["errors"] == {"TimeoutError": 1}
+    assert summary["retries"] == 1
+    assert summary["latency_max"] == 2  # noqa: PLR2004
+
+    total = ClientMetrics(latency_buckets=(0.1, 1))
+    total.merge(metrics)
+    total.merge(metrics)
+    metrics.reset()
+    assert not metrics.keys()
+    assert total.summarize(key).requests == 6  # noqa: PLR2004
+    assert total.latency[key].count == 6  # noqa: PLR2004
+
+
+def test_metrics_key() -> None:
+    assert BaseAPIClient(base_url="").metrics_key("https://edit.tosdr.org/cases/12") == (
+        "edit.tosdr.org",
+        "/cases/{id}",
+    )
+    assert DocumentClient().metrics_key("https://example.com/legal/terms") == ("example.com", "*")
+
+
+def test_sync_request_metrics(mocker: MockFixture) -> None:
+    client = BaseAPIClient(base_url="https://api.tosdr.org")
+    mocker.patch("requests.Session.request", side_effect=ConnectionError("refused"))
+    with pytest.raises(ConnectionError):
+        client.request(method="GET", url="https://api.tosdr.org/service/v1")
+    summary = client.metrics.summarize(("api.tosdr.org", "/service/v1"))
+    assert summary.requests == 1
+    assert summary.errors == {"ConnectionError": 1}
+
+
+@pytest.mark.asyncio
+async def test_async_request_metrics() -> None:
+    config = MockServerConfig(num_services=20, num_cases=4, page_size=10, case_points_per_case=2, throttle_rate=0.3)
+    metrics = ClientMetrics()
+    async with MockToSDRServer(config=config) as server, APIClient(
+        rate_limiter=_fast_limiter(), metrics=metrics
+    ) as api_client, EditSiteClient(rate_limiter=_fast_limiter(), metrics=metrics) as edit_client:
+        api_client.base_url = edit_client.base_url = server.url
+        assert len(await api_client.async_get_services(services_ids=list(range(1, 21)))) == 20  # noqa: PLR2004
+        assert len(await edit_client.async_get_multiple_case_points(case_ids=[1, 2, 3, 4])) == 8  # noqa: PLR2004
+        with pytest.raises(ClientResponseError, match="Not Found"):
+            await api_client.async_get_service(service_id=21)
+
+    assert metrics.keys() == [("127.0.0.1", "/cases/{id}"), ("127.0.0.1", "/service/v1")]
+    services_summary = metrics.summarize(("127.0.0.1", "/service/v1"))
+    throttled = server.throttled_counts["/service/v1"]
+    assert throttled, "Expected some throttled requests"
+    assert services_summary.requests == server.request_counts["/service/v1"]
+    assert services_summary.statuses == {200: 20, 404: 1, 429: throttled}
+    assert services_summary.retries == throttled, "Expected every throttled request to be retried"
+    assert not services_summary.errors
+    assert services_summary.bytes_received > 0
+    assert metrics.rate_limit_wait[("127.0.0.1", "/service/v1")].count == services_summary.requests
+    cases_summary = metrics.summarize(("127.0.0.1", "/cases/{id}"))
+    assert cases_summary.requests == server.request_counts["/cases/{case_id}"]
+    assert cases_summary.retries == server.throttled_counts["/cases/{case_id}"]
@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from aiohttp import ClientResponseError, RequestInfo
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from src.data.base_client import BaseAPIClient, retry_on_throttle
+from src.data.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+
+
+def _too_many_requests_error(retry_after: None | str = None) -> ClientResponseError:
+    headers = CIMultiDictProxy(CIMultiDict({"Retry-After": retry_after} if retry_after else {}))
+    request_info = RequestInfo(url=URL("https://example.com"), method="GET", headers=headers)
+    return ClientResponseError(request_info=request_info, history=(), status=429, headers=headers)
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("2") == 2  # noqa: PLR2004
+    assert parse_retry_after("invalid") is None
+    retry_at = datetime.now(tz=timezone.utc) + timedelta(seconds=30)
+    delay = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert delay is not None
+    assert 0 < delay <= 30  # noqa: PLR2004
+
+
+def test_rate_limiter_aimd() -> None:
+    limiter = AdaptiveRateLimiter(initial_rate=1, min_rate=0.5, max_rate=1.2, increase_step=0.1)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 1.2, "Expected rate to grow additively up to max rate"  # noqa: PLR2004
+    limiter.on_throttle()
+    assert limiter.rate == 0.6, "Expected rate to be halved on throttle"  # noqa: PLR2004
+    limiter.on_throttle()
+    assert limiter.rate == 0.5, "Expected rate to not go under min rate"  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_paces_requests() -> None:
+    limiter = AdaptiveRateLimiter(initial_rate=20, max_rate=20)
+    start = time.monotonic()
+    for _ in range(5):
+        async with limiter:
+            pass
+    assert time.monotonic() - start >= 4 / 20, "Expected requests to be paced at 20 req/s"
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_honors_retry_after() -> None:
+    limiter = AdaptiveRateLimiter(initial_rate=10, max_rate=100)
+    with pytest.raises(ClientResponseError):
+        async with limiter:
+            raise _too_many_requests_error(retry_after="0.3")
+    assert limiter.rate == 5, "Expected rate to be cut on 429"  # noqa: PLR2004
+
+    start = time.monotonic()
+    async with limiter:
+        pass
+    assert time.monotonic() - start >= 0.25, "Expected next request to wait for Retry-After"  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_retry_on_throttle() -> None:
+    limiter = AdaptiveRateLimiter(initial_rate=10, max_rate=100)
+    calls = 0
+
+    @retry_on_throttle(max_tries=3)
+    async def _request() -> int:
+        nonlocal calls
+        calls += 1
+        async with limiter:
+            if calls < 3:  # noqa: PLR2004
+                raise _too_many_requests_error()
+            return calls
+
+    assert await _request() == 3, "Expected request to be retried until success"  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_retry_on_throttle_records_client_retries() -> None:
+    class _Client(BaseAPIClient):
+        calls = 0
+
+        @retry_on_throttle(max_tries=3)
+        async def get(self) -> int:
+            self.calls += 1
+            if self.calls < 3:  # noqa: PLR2004
+                raise _too_many_requests_error()
+            return self.calls
+
+    client = _Client(base_url="https://example.com")
+    assert await client.get() == 3  # noqa: PLR2004
+    summary = client.metrics.summarize(("example.com", "/"))
+    assert summary.retries == client.calls - 1, "Expected retries in the client metrics"
@@ -0,0 +1,145 @@
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from src.data.base_client import BaseAPIClient, BaseAPIOperation
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.response_cache import ResponseCache
+
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResponseCache:
+    return ResponseCache(cache_dir=tmp_path / "cache", ttl=60, max_size=10)
+
+
+def test_build_key() -> None:
+    key = ResponseCache.build_key(method="get", url="https://example.com", params={"a": 1, "b": 2})
+    assert key == ResponseCache.build_key(method="GET", url="https://example.com", params={"b": "2", "a": "1"})
+    assert key != ResponseCache.build_key(method="GET", url="https://example.com", params={"a": 2})
+    assert ResponseCache.build_key(method="POST", url="https://example.com") is None, "Expected POST to be uncached"
+
+
+def test_put_get(cache: ResponseCache) -> None:
+    entry = cache.put(key="k1", headers={"ETag": ETAG, "Content-Length": "5"}, body=b"hello")
+    assert entry.headers == {"ETag": ETAG}, "Expected only validators and content type to be stored"
+
+    cached_entry = cache.get(key="k1")
+    assert cached_entry is not None
+    assert cache.read_body(cached_entry) == b"hello"
+    assert cache.conditional_headers(cached_entry) == {"If-None-Match": ETAG}
+    assert cache.is_fresh(cached_entry)
+    assert cache.get(key="missing") is None
+
+
+def test_content_addressed_bodies(cache: ResponseCache) -> None:
+    cache.put(key="k1", headers={}, body=b"same")
+    cache.put(key="k2", headers={}, body=b"same")
+    assert cache.size == len(b"same"), "Expected identical bodies to be stored once"
+    cache.delete(key="k1")
+    entry = cache.get(key="k2")
+    assert entry is not None, "Expected shared body to be kept while referenced"
+    assert cache.read_body(entry) == b"same"
+
+
+def test_lru_eviction(cache: ResponseCache) -> None:
+    cache.put(key="k1", headers={}, body=b"1234")
+    cache.put(key="k2", headers={}, body=b"5678")
+    time.sleep(0.01)
+    cache.get(key="k1")
+    cache.put(key="k3", headers={}, body=b"9012")
+    assert cache.get(key="k2") is None, "Expected least recently accessed entry to be evicted"
+    assert cache.get(key="k1") is not None
+    assert cache.get(key="k3") is not None
+    assert cache.size <= cache.max_size
+
+
+def test_size_tracking(cache: ResponseCache, tmp_path: Path) -> None:
+    cache.put(key="k1", headers={}, body=b"12")
+    cache.put(key="k2", headers={}, body=b"12")
+    cache.put(key="k1", headers={}, body=b"345")
+    assert cache.size == 5, "Expected the size of bodies still referenced only"  # noqa: PLR2004
+    cache.delete(key="k2")
+    assert cache.size == 3  # noqa: PLR2004
+    assert [path.stat().st_size for path in cache.bodies_dir.rglob("*") if path.is_file()] == [
+        3
+    ], "Expected unreferenced bodies to be deleted"
+
+    cache.put(key="k2", headers={}, body=b"6789")
+    time.sleep(0.01)
+    cache.get(key="k1")
+    cache.close()
+    reopened = ResponseCache(cache_dir=tmp_path / "cache", max_size=10)
+    assert reopened.size == 7  # noqa: PLR2004
+    reopened.put(key="k3", headers={}, body=b"0123")
+    assert reopened.get(key="k2") is None, "Expected access times of hits to be written on close"
+    assert reopened.get(key="k1") is not None
+
+
+class _ServerState:
+    def __init__(self) -> None:
+        self.full_responses = 0
+        self.not_modified_responses = 0
+
+
+@pytest_asyncio.fixture
+async def server_state() -> _ServerState:
+    return _ServerState()
+
+
+@pytest_asyncio.fixture
+async def server(server_state: _ServerState) -> AsyncIterator[TestServer]:
+    async def _handler(request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == ETAG:
+            server_state.not_modified_responses += 1
+            return web.Response(status=304)
+        server_state.full_responses += 1
+        return web.json_response({"page": request.query.get("page")}, headers={"ETag": ETAG})
+
+    app = web.Application()
+    app.router.add_get("/items", _handler)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    yield test_server
+    await test_server.close()
+
+
+class GetItemsOp(BaseAPIOperation):
+    method: str = "GET"
+    path: str = "/items"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ttl,exp_not_modified_responses", [(60, 0), (0, 2)])
+async def test_async_send_with_cache(
+    server: TestServer, server_state: _ServerState, tmp_path: Path, ttl: float, exp_not_modified_responses: int
+) -> None:
+    client = BaseAPIClient(
+        base_url=str(server.make_url("")).rstrip("/"),
+        rate_limiter=AdaptiveRateLimiter(initial_rate=100, max_rate=100),
+        response_cache=ResponseCache(cache_dir=tmp_path, ttl=ttl),
+    )
+    async with ClientSession(raise_for_status=True) as session:
+        for _ in range(3):
+            async with client.async_send(session=session, api_op=GetItemsOp(params={"page": 1})) as resp:
+                assert await resp.json() == {"page": "1"}
+
+    assert server_state.full_responses == 1, "Expected a single full response"
+    assert server_state.not_modified_responses == exp_not_modified_responses
+
+
+def test_request_with_cache(cache: ResponseCache) -> None:
+    cache.max_size = 1024
+    client = BaseAPIClient(base_url="https://example.com", response_cache=cache)
+    cache_key = cache.build_key(method="GET", url="https://example.com/items")
+    assert cache_key is not None
+    cache.put(key=cache_key, headers={"Content-Type": "application/json"}, body=b'{"page": 1}')
+
+    resp = client.request(api_op=GetItemsOp())
+    assert resp.json() == {"page": 1}, "Expected fresh response to be served from the cache"
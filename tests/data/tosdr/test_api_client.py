@@ -1,9 +1,27 @@
 import asyncio
+import gc
+import json
+from datetime import datetime, timezone
+from typing import Any
 
 import pytest
 from pytest_mock import MockFixture
 
-from src.data.tosdr import APIClient, Case, Service, ServiceMetadata
+from src.benchmarks.mock_server import (
+    MockServerConfig,
+    MockToSDRServer,
+    make_service_payload,
+    make_services_metadata_page_payload,
+)
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import (
+    APIClient,
+    Case,
+    GetServiceMetadataPageResponse,
+    GetServiceResponse,
+    Service,
+    ServiceMetadata,
+)
 
 TEST_SERVICE_ID = 222
 TEST_SERVICE_NAME = "DuckDuckGo"
@@ -61,3 +79,102 @@ def test_get_all_cases(client: APIClient) -> None:
     all_cases = client.get_all_cases()
     assert len(all_cases) == total_cases_count, f"Expected {total_cases_count} cases, got {len(all_cases)}"
     assert all(isinstance(case, Case) for case in all_cases), "Expected all return Case Models"
+
+
+@pytest.mark.asyncio
+async def test_iter_all_services_metadata() -> None:
+    config = MockServerConfig(num_services=250, page_size=100)
+    async with MockToSDRServer(config=config) as server, APIClient(
+        num_workers=1, rate_limiter=AdaptiveRateLimiter(initial_rate=1000, max_rate=1000)
+    ) as client:
+        client.base_url = server.url
+        services_metadata = [serv async for serv in client.async_iter_all_services_metadata()]
+
+    assert all(isinstance(serv, ServiceMetadata) for serv in services_metadata)
+    assert len({ser.id for ser in services_metadata}) == config.num_services, "Expected all services id are unique"
+
+
+def test_decode_v1_timestamp_objects() -> None:
+    body = json.dumps(make_services_metadata_page_payload(num_services=3, page=1)).encode("utf-8")
+    page = GetServiceMetadataPageResponse.model_validate_json(body)
+    expected = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert [serv.created_at for serv in page.services_metadata] == [expected] * 3, "Expected the pgsql timestamps"
+
+    service = GetServiceResponse.model_validate_json(json.dumps({"parameters": make_service_payload(1)})).service
+    assert service.updated_at == expected
+    assert service.model_dump(mode="json")["updated_at"] == "2023-01-01T00:00:00Z"
+
+
+@pytest.mark.asyncio
+async def test_async_decode_responses() -> None:
+    config = MockServerConfig(num_services=12, num_cases=3, page_size=5)
+    async with MockToSDRServer(config=config) as server, APIClient(
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1000, max_rate=1000)
+    ) as client:
+        client.base_url = server.url
+        services_metadata = [serv async for serv in client.async_iter_all_services_metadata()]
+        assert sorted(serv.id for serv in services_metadata) == list(range(1, 13))
+        service = await client.async_get_service(service_id=3)
+        assert len(service.points) == config.points_per_service
+        assert [case.id async for case in client.async_iter_all_cases()] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_async_iter_pages_speculation() -> None:
+    config = MockServerConfig(num_services=30, page_size=10, latency=0.01)
+    async with MockToSDRServer(config=config) as server, APIClient(
+        num_workers=8, rate_limiter=AdaptiveRateLimiter(initial_rate=20, max_rate=20)
+    ) as client:
+        client.base_url = server.url
+        speculative_pages = 6
+        pages = [
+            page
+            async for page in client.async_iter_pages(
+                client.async_get_service_metadata_page, ordered=True, speculative_pages=speculative_pages
+            )
+        ]
+        assert [page.current_page for page in pages] == [1, 2, 3]
+        num_requests = server.request_counts["/service/v1"]
+        assert num_requests < 1 + speculative_pages, "Expected speculative pages past the end to be cancelled"
+
+
+@pytest.mark.asyncio
+async def test_async_iter_pages_first_page_failure() -> None:
+    async def _get_page(page_idx: int) -> GetServiceMetadataPageResponse:
+        raise ValueError(f"page {page_idx}")
+
+    async with APIClient(num_workers=3) as client:
+        with pytest.raises(ValueError, match="page 1"):
+            [page async for page in client.async_iter_pages(_get_page)]
+
+
+@pytest.mark.asyncio
+async def test_async_iter_pages_drops_pages_past_the_end() -> None:
+    loop = asyncio.get_running_loop()
+    errors: list[dict[str, Any]] = []
+    loop.set_exception_handler(lambda _, context: errors.append(context))
+    gate = asyncio.Event()
+    loop.call_later(0.01, gate.set)
+    pending: list[asyncio.Task] = []
+
+    async def _get_page(page_idx: int) -> GetServiceMetadataPageResponse:
+        if page_idx == 4:  # noqa: PLR2004
+            pending.append(asyncio.current_task())  # type: ignore[arg-type]
+            await asyncio.sleep(60)
+        await gate.wait()
+        if page_idx > 1:
+            raise ValueError(f"page {page_idx}")
+        return GetServiceMetadataPageResponse.model_validate(
+            make_services_metadata_page_payload(num_services=3, page=1)
+        )
+
+    try:
+        async with APIClient(num_workers=4) as client:
+            pages = [page async for page in client.async_iter_pages(_get_page, speculative_pages=3)]
+        assert [page.current_page for page in pages] == [1]
+        assert pending[0].cancelled(), "Expected pages in flight past the end to be cancelled and awaited"
+        pending.clear()
+        gc.collect()
+        assert not errors, "Expected the failures of pages past the end to be retrieved"
+    finally:
+        loop.set_exception_handler(None)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from src.data.tosdr import CaseIndex, case_point_key
+from tests.factories import make_case, make_case_point
+
+CASES = [
+    make_case(1, "This service sells your data", "Personal data is sold to third parties"),
+    make_case(2, "You can delete your account", rating="good"),
+]
+
+
+def test_case_point_key() -> None:
+    assert case_point_key(make_case_point(1, "a")) == case_point_key(make_case_point(1, "a"))
+    assert case_point_key(make_case_point(1, "a")) != case_point_key(make_case_point(1, "b"))
+    assert case_point_key(make_case_point(1, "a")).startswith("case-point:1:s:")
+
+
+def test_suggest_cases() -> None:
+    index = CaseIndex()
+    assert index.add_cases(CASES) == len(CASES)
+    assert index.add_case_points([make_case_point(2, "Users may remove their profile permanently")]) == 1
+    assert index.add_case_points([make_case_point(2, "Users may remove their profile permanently")]) == 0
+
+    candidates = index.suggest("Profiles are removed permanently.")
+    assert [(c.case_id, c.human_rating) for c in candidates] == [(2, "good")], "Expected a match through a quote"
+    assert index.suggest("We sell personal data", top_k=1)[0].case_id == 1
+    assert index.suggest("nothing related") == []
+
+
+def test_case_index_incremental(tmp_path: Path) -> None:
+    index = CaseIndex()
+    index.add_cases(CASES)
+    index.save(tmp_path / "case_index")
+
+    loaded = CaseIndex.load(tmp_path / "case_index")
+    assert loaded.cases == {case.id: case for case in CASES}
+    assert loaded.add_cases(CASES) == 0
+    assert loaded.add_case_points([make_case_point(1, "We monetize browsing histories")]) == 1
+    assert loaded.suggest("browsing histories are monetized")[0].case_id == 1
+    assert loaded.suggest("account deletion is possible, delete account")[0].case_id == 2  # noqa: PLR2004
+
+
+def test_case_index_reindexes_changed_cases(tmp_path: Path) -> None:
+    index = CaseIndex()
+    index.add_cases(CASES)
+    index.save(tmp_path / "case_index")
+
+    loaded = CaseIndex.load(tmp_path / "case_index")
+    changed = make_case(1, "Your messages are read by moderators")
+    assert loaded.add_cases([changed, CASES[1]]) == 1, "Expected only the changed case to be indexed again"
+    assert loaded.suggest("messages read by moderators")[0].case_id == 1
+    assert loaded.suggest("We sell personal data") == [], "Expected the previous text of a case to be dropped"
+    assert loaded.suggest("delete your account")[0].case_id == 2  # noqa: PLR2004
+    loaded.save(tmp_path / "case_index")
+    assert CaseIndex.load(tmp_path / "case_index").index.keys == ["case:2", "case:1"]
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from src.data.tosdr import DocumentTextRecord, DocumentTextStore, chunk_corpus
+from src.text.chunker import ChunkCache, TextChunker
+from tests.factories import T0, make_point, make_service
+
+POLICY_TEXT = """1. Data
+We sell your personal data to data brokers. We keep it for ten years.
+2. Accounts
+You cannot delete your account once it is created."""
+
+
+def _store(tmp_path: Path) -> DocumentTextStore:
+    store = DocumentTextStore(store_dir=tmp_path / "documents")
+    content_hash = store.put(POLICY_TEXT)
+    store.write_index(
+        DocumentTextRecord(
+            document_id=doc_id,
+            service_id=1,
+            url="https://example.com",
+            content_hash=content_hash,
+            document_updated_at=T0,
+            fetched_at=T0,
+        )
+        for doc_id in (10, 11)
+    )
+    return store
+
+
+def test_chunk_corpus(tmp_path: Path) -> None:
+    points = [make_point(1, case_id=1, analysis="Data is sold."), make_point(2, case_id=1, analysis="")]
+    services = [make_service(1, points=points)]
+    chunker = TextChunker(max_tokens=12, overlap_tokens=0)
+    cache = ChunkCache(db_file=tmp_path / "chunk_cache.sqlite3")
+
+    chunks = list(chunk_corpus(services=services, store=_store(tmp_path), chunker=chunker, cache=cache))
+    num_document_chunks = len(chunker.chunk(POLICY_TEXT))
+    assert num_document_chunks > 1
+    assert [(chunk.source, chunk.source_id, chunk.index) for chunk in chunks] == [
+        *(("document", doc_id, i) for doc_id in (10, 11) for i in range(num_document_chunks)),
+        ("point", 1, 0),
+    ], "Expected the chunks of every document and of the points with an analysis"
+    assert chunks[0].text == "1. Data\nWe sell your personal data to data brokers."
+    assert chunks[-1].text == "Data is sold."
+    assert all(chunk.token_count <= chunker.max_tokens for chunk in chunks)
+    assert cache.get_many([chunker.cache_key(POLICY_TEXT)]), "Expected the chunks to be cached"
+
+    assert list(chunk_corpus(services=services, store=None, chunker=chunker, cache=cache)) == chunks[-1:]
+    cache.close()
@@ -0,0 +1,96 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.benchmarks.mock_server import MockServerConfig, MockToSDRServer
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import APIClient, Case, CasePoint, EditSiteClient, Service, crawl_all, recency_priority
+from src.utils.checkpoint import CrawlCheckpoint
+from src.utils.file_utils import read_ndjson_gz_field
+
+# updated_at of every service of the mock server
+MOCK_UPDATED_AT = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def _fast_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(initial_rate=1000, max_rate=1000)
+
+
+def test_recency_priority() -> None:
+    assert recency_priority(datetime(2024, 1, 1, tzinfo=timezone.utc)) < recency_priority(MOCK_UPDATED_AT)
+
+
+@pytest.mark.asyncio
+async def test_crawl_all(tmp_path: Path) -> None:
+    config = MockServerConfig(num_services=12, num_cases=6, page_size=5, case_points_per_case=3, latency=0.005)
+    metadata_file = tmp_path / "all_services_metadata.ndjson.gz"
+    cases_file = tmp_path / "all_cases.ndjson.gz"
+    async with MockToSDRServer(config=config) as server, APIClient(
+        num_workers=4, rate_limiter=_fast_limiter()
+    ) as api_client, EditSiteClient(num_workers=4, rate_limiter=_fast_limiter()) as edit_client:
+        api_client.base_url = edit_client.base_url = server.url
+        with CrawlCheckpoint(
+            output_file=tmp_path / "all_services.ndjson.gz", model_type=Service
+        ) as services_checkpoint, CrawlCheckpoint(
+            output_file=tmp_path / "all_case_points.ndjson.gz", model_type=CasePoint
+        ) as case_points_checkpoint:
+            headers = await crawl_all(
+                api_client=api_client,
+                edit_client=edit_client,
+                metadata_file=metadata_file,
+                cases_file=cases_file,
+                services_checkpoint=services_checkpoint,
+                case_points_checkpoint=case_points_checkpoint,
+                # service 1 is unchanged, service 2 was updated since
+                previous_services={1: MOCK_UPDATED_AT, 2: datetime(2022, 1, 1, tzinfo=timezone.utc)},
+            )
+            assert sorted(headers) == list(range(1, 13))
+            assert sorted(read_ndjson_gz_field(input_path=metadata_file, field="id")) == list(range(1, 13))
+            assert sorted(read_ndjson_gz_field(input_path=cases_file, field="id")) == list(range(1, 7))
+            assert services_checkpoint.done_ids == set(range(2, 13)), "Expected unchanged service to be skipped"
+            assert case_points_checkpoint.done_ids == set(range(1, 7))
+            assert len(list(case_points_checkpoint.iter_results())) == 18  # noqa: PLR2004
+
+    assert server.request_counts["/cases/{case_id}"] == config.num_cases
+
+
+@pytest.mark.asyncio
+async def test_crawl_all_failure_stops_all_tasks(tmp_path: Path, mocker: MockFixture) -> None:
+    config = MockServerConfig(num_services=40, num_cases=6, page_size=5, latency=0.01)
+
+    async def _failing_cases() -> AsyncIterator[Case]:
+        await asyncio.sleep(0.05)
+        raise ValueError("cases listing failed")
+        yield  # pragma: no cover
+
+    async with MockToSDRServer(config=config) as server, APIClient(
+        num_workers=4, rate_limiter=_fast_limiter()
+    ) as api_client, EditSiteClient(num_workers=4, rate_limiter=_fast_limiter()) as edit_client:
+        api_client.base_url = edit_client.base_url = server.url
+        mocker.patch.object(api_client, "async_iter_all_cases", side_effect=_failing_cases)
+        tasks_before = asyncio.all_tasks()
+        with CrawlCheckpoint(
+            output_file=tmp_path / "all_services.ndjson.gz", model_type=Service
+        ) as services_checkpoint, CrawlCheckpoint(
+            output_file=tmp_path / "all_case_points.ndjson.gz", model_type=CasePoint
+        ) as case_points_checkpoint:
+            with pytest.raises(ValueError, match="cases listing failed"):
+                await crawl_all(
+                    api_client=api_client,
+                    edit_client=edit_client,
+                    metadata_file=tmp_path / "all_services_metadata.ndjson.gz",
+                    cases_file=tmp_path / "all_cases.ndjson.gz",
+                    services_checkpoint=services_checkpoint,
+                    case_points_checkpoint=case_points_checkpoint,
+                )
+            pending = [
+                task
+                for task in asyncio.all_tasks() - tasks_before
+                # requests of the mock server still being handled
+                if not task.done() and "RequestHandler." not in repr(task.get_coro())
+            ]
+            assert not pending, "Expected every task of the crawl to be stopped once it fails"
@@ -0,0 +1,103 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.data.rate_limiter import AdaptiveRateLimiter
+from src.data.tosdr import (
+    DocumentClient,
+    DocumentTextStore,
+    Service,
+    download_documents,
+    extract_document_text,
+    normalize_text,
+)
+from tests.factories import T0, T1, make_document, make_service
+
+POLICY_HTML = """
+<html><head><style>p {color: red}</style></head>
+<body><nav>Menu</nav><div id="content"><h1>Privacy  Policy</h1><p>We collect
+   your data.</p><p>We sell it.</p></div><script>track()</script></body></html>
+"""
+
+
+def test_normalize_text() -> None:
+    assert normalize_text("  a \t b \n\n\n c\u00a0d ") == "a b\nc d"
+
+
+def test_extract_document_text() -> None:
+    assert extract_document_text(markup=POLICY_HTML, xpath="//*[@id='content']") == (
+        "Privacy Policy\nWe collect your data.\nWe sell it."
+    )
+    assert extract_document_text(markup=POLICY_HTML.encode()).startswith("Menu\nPrivacy Policy"), "Expected full page"
+    with pytest.raises(ValueError, match="matched nothing"):
+        extract_document_text(markup=POLICY_HTML, xpath="//article")
+
+
+def test_document_client_rate_limiter_per_host() -> None:
+    client = DocumentClient()
+    limiter = client.get_rate_limiter("https://example.com/terms")
+    assert client.get_rate_limiter("https://example.com/privacy") is limiter, "Expected one limiter per host"
+    assert client.get_rate_limiter("https://example.org/terms") is not limiter, "Expected hosts paced separately"
+    limiter.on_throttle()
+    assert client.get_rate_limiter("https://example.org/terms").rate > limiter.rate
+
+    shared = AdaptiveRateLimiter()
+    client = DocumentClient(rate_limiter=shared)
+    assert client.get_rate_limiter("https://example.org/terms") is shared, "Expected a given limiter to be shared"
+
+
+@pytest.fixture
+def pages() -> dict[str, str]:
+    return {"/a": POLICY_HTML, "/b": POLICY_HTML}
+
+
+@pytest_asyncio.fixture
+async def documents_server(pages: dict[str, str]) -> AsyncIterator[TestServer]:
+    async def _handle(request: web.Request) -> web.Response:
+        return web.Response(text=pages[request.path], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", _handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+def _service(service_id: int, documents: list[tuple[int, str]], base_url: str, updated_at: datetime = T0) -> Service:
+    privacy_documents = [
+        make_document(
+            doc_id, url=f"{base_url}{path}", name="Privacy", xpath="//*[@id='content']", updated_at=updated_at
+        )
+        for doc_id, path in documents
+    ]
+    return make_service(service_id, documents=privacy_documents)
+
+
+@pytest.mark.asyncio
+async def test_download_documents(documents_server: TestServer, pages: dict[str, str], tmp_path: Path) -> None:
+    base_url = str(documents_server.make_url("")).rstrip("/")
+    store = DocumentTextStore(store_dir=tmp_path / "documents")
+    services = [_service(1, [(10, "/a"), (11, "/b")], base_url), _service(2, [(20, "/a")], base_url)]
+
+    async with DocumentClient() as client:
+        stats = await download_documents(client=client, services=services, store=store)
+        assert (stats.fetched, stats.changed) == (2, 3), "Expected a shared url to be fetched once"
+        index = store.load_index()
+        assert len({record.content_hash for record in index.values()}) == 1, "Expected identical texts stored once"
+        assert len(list(store.texts_dir.rglob("*.txt.gz"))) == 1
+        assert store.read(index[10].content_hash) == "Privacy Policy\nWe collect your data.\nWe sell it."
+
+        stats = await download_documents(client=client, services=services, store=store)
+        assert (stats.skipped, stats.fetched) == (3, 0), "Expected documents not updated to be skipped"
+
+        pages["/b"] = POLICY_HTML.replace("We sell it.", "We do not sell it.")
+        services = [_service(1, [(10, "/a"), (11, "/b")], base_url, updated_at=T1)]
+        stats = await download_documents(client=client, services=services, store=store)
+        assert (stats.fetched, stats.unchanged, stats.changed) == (2, 1, 1), "Expected texts to be compared by hash"
+        assert store.load_index().keys() == {10, 11}, "Expected documents of removed services to be dropped"
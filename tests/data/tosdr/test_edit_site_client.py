@@ -1,8 +1,16 @@
 import asyncio
+import gzip
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 
 import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from pytest_mock import MockFixture
 
-from src.data.tosdr import CasePoint, EditSiteClient
+from src.data.tosdr import CasePoint, EditSiteClient, parse_case_points_from_html
 
 TEST_CASE_ID = 175
 EXPECTED_CASE_POINTS_COUNT = 144
@@ -30,3 +38,42 @@ def test_get_multiple_case_points(client: EditSiteClient) -> None:
     assert all(isinstance(cp, CasePoint) for cp in case_points), "Expected all returned are CasePoint models"
     for c_id in case_ids:
         assert any(cp.case_id == c_id for cp in case_points), f"Expected at at least one CasePoint with case_id {c_id}"
+
+
+@pytest.fixture
+def example_case_html(resources_dir_path: Path) -> bytes:
+    with gzip.open(resources_dir_path / "example_case.html.gz", mode="rb") as f:
+        return f.read()
+
+
+@pytest_asyncio.fixture
+async def edit_site_server(example_case_html: bytes) -> AsyncIterator[TestServer]:
+    async def _handle_case(request: web.Request) -> web.Response:
+        return web.Response(body=example_case_html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/cases/{case_id}", _handle_case)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+def test_parse_case_points_in_process_pool(example_case_html: bytes) -> None:
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        case_points = executor.submit(parse_case_points_from_html, example_case_html, TEST_CASE_ID).result()
+    assert case_points == parse_case_points_from_html(
+        markup=example_case_html, case_id=TEST_CASE_ID
+    ), "Expected the same case points parsed in a process"
+
+
+@pytest.mark.asyncio
+async def test_async_get_case_points_parses_in_executor(edit_site_server: TestServer, mocker: MockFixture) -> None:
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        submit_spy = mocker.spy(executor, "submit")
+        async with EditSiteClient(parse_executor=executor) as client:
+            client.base_url = str(edit_site_server.make_url("")).rstrip("/")
+            case_points = await client.async_get_case_points(case_id=TEST_CASE_ID)
+    submit_spy.assert_called_once()
+    assert case_points, "Expected case points parsed from the page"
+    assert all(cp.case_id == TEST_CASE_ID for cp in case_points), f"Expected all has case_id {TEST_CASE_ID}"
@@ -1,9 +1,12 @@
 import gzip
+import io
 from pathlib import Path
 
 import pytest
+from pytest_mock import MockFixture
 
-from src.data.tosdr import parse_case_point_rows_from_html
+from src.data.tosdr import TagNotFoundException, html_parser, parse_case_point_rows_from_html
+from src.data.tosdr.html_parser import _parse_table_lxml, parse_table_bs4
 
 
 @pytest.fixture
@@ -19,3 +22,23 @@ def test_parse_case_point_from_html(example_case_html: bytes) -> None:
     case_point_rows = list(parse_case_point_rows_from_html(markup=example_case_html))
     assert len(case_point_rows) == 3, "Expect parsed 3 case points"  # noqa: PLR2004
     assert all(is_valid_case_point_row(row=row) for row in case_point_rows)
+
+
+def test_fast_parser_matches_bs4(example_case_html: bytes) -> None:
+    fast_rows = _parse_table_lxml(markup=example_case_html)
+    assert fast_rows == list(parse_table_bs4(markup=example_case_html)), "Expected the same rows as BeautifulSoup"
+    assert fast_rows == _parse_table_lxml(markup=example_case_html.decode("utf-8")), "Expected str markup support"
+    assert fast_rows == list(parse_case_point_rows_from_html(markup=io.BytesIO(example_case_html)))
+
+
+def test_parse_case_point_from_html_skips_fallback(example_case_html: bytes, mocker: MockFixture) -> None:
+    bs4_spy = mocker.spy(html_parser, "parse_table_bs4")
+    list(parse_case_point_rows_from_html(markup=example_case_html))
+    bs4_spy.assert_not_called()
+
+
+def test_parse_case_point_from_html_fallback(mocker: MockFixture) -> None:
+    bs4_spy = mocker.spy(html_parser, "parse_table_bs4")
+    with pytest.raises(TagNotFoundException):
+        list(parse_case_point_rows_from_html(markup="<html><body><table><tr><td>1</td></tr></table></body></html>"))
+    bs4_spy.assert_called_once()
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.data.tosdr import (
+    POINTS_SCHEMA,
+    export_case_points_parquet,
+    export_cases_parquet,
+    export_services_parquet,
+)
+from tests.factories import T0, make_case, make_case_point, make_point, make_service
+
+
+def test_export_services_parquet(tmp_path: Path) -> None:
+    services = [
+        make_service(
+            1, [make_point(10, case_id=100, status="approved"), make_point(11, case_id=101, status="declined")]
+        ),
+        make_service(2, [make_point(20, case_id=100, status="approved")]),
+    ]
+    counts = export_services_parquet(services=services, output_dir=tmp_path, row_group_size=2)
+    assert counts == {"services": 2, "points": 3, "documents": 2}
+
+    points = pq.read_table(tmp_path / "points")
+    assert points.schema.equals(POINTS_SCHEMA), "Expected points to be their own normalized table"
+    assert points.column("service_id").to_pylist() == [1, 1, 2]
+    approved = pq.read_table(tmp_path / "points", columns=["case_id"], filters=[("status", "=", "approved")])
+    assert pc.unique(approved.column("case_id")).to_pylist() == [100]
+
+    services_table = pq.read_table(tmp_path / "services")
+    assert "points" not in services_table.column_names
+    assert services_table.column("updated_at").to_pylist() == [T0, T0]
+
+
+def test_export_cases_and_case_points_parquet(tmp_path: Path) -> None:
+    case = make_case(1, title="t", description="d", rating="good")
+    assert export_cases_parquet(cases=[case], output_dir=tmp_path) == 1
+    assert pq.read_table(tmp_path / "cases", columns=["rating"]).to_pylist() == [{"rating": "good"}]
+
+    case_point = make_case_point(1, quote="q", status="APPROVED")
+    assert export_case_points_parquet(case_points=[case_point], output_dir=tmp_path) == 1
+    assert pq.read_table(tmp_path / "case_points").to_pylist() == [
+        {"case_id": 1, "service_name": "s", "quote": "q", "status": "APPROVED"}
+    ]
@@ -0,0 +1,115 @@
+import gc
+import json
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.benchmarks.mock_server import make_service_payload
+from src.data.tosdr import (
+    CasePoint,
+    CasePointRecords,
+    PointRecords,
+    Service,
+    ServiceRecords,
+    StringPool,
+)
+from src.utils.file_utils import write_pydantic_models_ndjson_gz
+
+
+def _services(count: int, num_points: int = 5) -> list[Service]:
+    return [Service.model_validate(make_service_payload(i, num_points=num_points)) for i in range(1, count + 1)]
+
+
+def test_string_pool() -> None:
+    pool = StringPool()
+    assert [pool.encode(value) for value in ("a", "b", "a", None)] == [0, 1, 0, -1]
+    assert len(pool) == 2  # noqa: PLR2004
+    assert [pool.decode(code) for code in (1, 0, -1)] == ["b", "a", None]
+
+
+def test_service_records_round_trip() -> None:
+    services = _services(3)
+    services[1].documents = None
+    services[2].rating = None
+    services[2].points[0].document_id = None
+    records = ServiceRecords.from_models(services)
+    assert len(records) == 3  # noqa: PLR2004
+    assert records.to_models() == services
+    assert records[-1] == services[-1]
+    with pytest.raises(IndexError):
+        records[3]
+
+    assert len(records.points) == 15  # noqa: PLR2004
+    assert records.point_service_ids().tolist() == [1] * 5 + [2] * 5 + [3] * 5
+    assert records.points.column("id").tolist() == [point.id for serv in services for point in serv.points]
+    assert records.points.column("document_id")[10] == -1
+    assert records.column("updated_at")[0] == np.datetime64("2023-01-01T00:00:00", "us")
+    assert records.values("rating") == ["B", "C", None]
+    assert records.points.strings is records.strings, "Expected the nested records to share the string pool"
+    with pytest.raises(KeyError, match="No array column"):
+        records.column("name")
+
+
+def test_service_records_append_after_column() -> None:
+    services = _services(3)
+    records = ServiceRecords.from_models(services[:1])
+    updated_at = records.column("updated_at")
+    records.append(services[1])
+    assert len(updated_at) == 1, "Expected columns to be copies"
+    assert len(records.column("updated_at")) == len(records.column("id")) == 2  # noqa: PLR2004
+
+    broken = services[2].model_copy()
+    broken.points = [*broken.points[:2], None]  # type: ignore[list-item]
+    with pytest.raises(AttributeError):
+        records.append(broken)
+    assert records.to_models() == services[:2], "Expected a failed append to leave no partial row"
+    assert len(records.points) == 10  # noqa: PLR2004
+    records.append(services[2])
+    assert records.to_models() == services
+
+
+def test_point_records_normalize_timestamps_to_utc() -> None:
+    point = _services(1)[0].points[0]
+    point.created_at = datetime(2023, 5, 1, 12, 30, 0, 123456, tzinfo=timezone(timedelta(hours=2)))
+    (decoded,) = PointRecords.from_models([point])
+    assert decoded.created_at == point.created_at
+    assert decoded.created_at.tzinfo == timezone.utc
+    assert decoded == point
+
+
+def test_case_point_records(tmp_path: Path) -> None:
+    case_points = [
+        CasePoint(case_id=i % 3, Service=f"Service {i % 4}", Title=f"Quote {i}", Status="approved") for i in range(20)
+    ]
+    input_path = tmp_path / "case_points.ndjson.gz"
+    write_pydantic_models_ndjson_gz(models=case_points, output_file=input_path)
+    records = CasePointRecords.load_ndjson_gz(input_path)
+    assert records.to_models() == case_points
+    assert len(records.strings) == 5  # noqa: PLR2004
+    assert np.bincount(records.column("case_id")).tolist() == [7, 7, 6]
+    assert records.values("quote")[:2] == ["Quote 0", "Quote 1"]
+
+
+def test_service_records_memory() -> None:
+    payloads = [json.dumps(make_service_payload(i, num_points=20)) for i in range(1, 301)]
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        services = [Service.model_validate_json(payload) for payload in payloads]
+        models_size = tracemalloc.get_traced_memory()[0] - start
+        del services
+        gc.collect()
+
+        start = tracemalloc.get_traced_memory()[0]
+        records = ServiceRecords()
+        for payload in payloads:
+            records.append(Service.model_validate_json(payload))
+        gc.collect()
+        records_size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    assert len(records.points) == 6000  # noqa: PLR2004
+    assert records_size < models_size / 3, f"Expected records much smaller than models: {records_size}, {models_size}"
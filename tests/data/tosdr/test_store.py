@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.data.tosdr import CorpusStore
+from tests.factories import T0, T1, make_case, make_case_point, make_point, make_service
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> CorpusStore:
+    store = CorpusStore(db_file=tmp_path / "tosdr.sqlite3")
+    store.upsert_services(
+        services=[
+            make_service(
+                1, [make_point(10, case_id=100, document_id=1), make_point(11, case_id=101, status="declined")]
+            ),
+            make_service(2, [make_point(20, case_id=100)]),
+        ],
+        batch_size=1,
+    )
+    return store
+
+
+def test_store_uses_wal_and_indexes(store: CorpusStore) -> None:
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = store._conn.execute("EXPLAIN QUERY PLAN SELECT * FROM points WHERE case_id = ?", (100,)).fetchall()
+    assert any("points_case_id" in row[-1] for row in plan), "Expected point lookups by case to use the index"
+
+
+def test_store_get_service(store: CorpusStore) -> None:
+    service = store.get_service(service_id=1)
+    assert service == make_service(
+        1, [make_point(10, case_id=100, document_id=1), make_point(11, case_id=101, status="declined")]
+    )
+    assert store.get_service(service_id=3) is None
+
+
+def test_store_query_points_and_services(store: CorpusStore) -> None:
+    assert [p.id for p in store.get_points(service_id=1)] == [10, 11]
+    assert [p.id for p in store.get_points(case_id=100)] == [10, 20]
+    assert [p.id for p in store.get_points(document_id=1)] == [10]
+    assert [p.id for p in store.get_points(service_id=1, status="declined")] == [11]
+    assert [serv.id for serv in store.get_services(case_id=100)] == [1, 2]
+    assert [doc.id for doc in store.get_documents(service_id=2)] == [2]
+
+
+def test_store_get_services_in_batches(store: CorpusStore, mocker: MockFixture) -> None:
+    mocker.patch("src.data.tosdr.store._MAX_IN_PARAMS", 1)
+    store.upsert_services(services=[make_service(3, [make_point(30, case_id=102), make_point(31, case_id=100)])])
+    services = store.get_services()
+    assert [serv.id for serv in services] == [1, 2, 3]
+    assert [[p.id for p in serv.points] for serv in services] == [[10, 11], [20], [30, 31]]
+    assert all(serv.documents for serv in services), "Expected the documents of every batch of services"
+
+
+def test_store_upsert_replaces_points(store: CorpusStore) -> None:
+    store.upsert_services(services=[make_service(1, [make_point(12, case_id=102)], updated_at=T1)])
+    assert [p.id for p in store.get_points(service_id=1)] == [12], "Expected the points of the service to be replaced"
+    assert [serv.id for serv in store.get_services(updated_since=T0)] == [1]
+    assert store.get_services_timestamps() == {1: T1, 2: T0}
+
+    store.delete_services(service_ids=[2])
+    assert store.get_points(case_id=100) == [], "Expected the points of a deleted service to be removed"
+
+
+def test_store_cases_and_case_points(store: CorpusStore) -> None:
+    case = make_case(100, title="t", description="d", rating="good")
+    store.upsert_cases(cases=[case])
+    assert store.get_case(case_id=100) == case
+
+    store.upsert_case_points(case_points=[make_case_point(100, quote) for quote in ("a", "b")], batch_size=1)
+    assert [cp.quote for cp in store.get_case_points(case_id=100)] == ["a", "b"], "Expected points across batches kept"
+    store.upsert_case_points(case_points=[make_case_point(100, "c")])
+    assert [cp.quote for cp in store.get_case_points(case_id=100)] == ["c"], "Expected case points to be replaced"
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from src.data.tosdr import (
+    DocumentTextRecord,
+    DocumentTextStore,
+    case_label_texts,
+    summarize_documents,
+)
+from src.text.summarizer import ExtractiveSummarizer
+from src.text.tfidf import TfidfVocabulary
+from tests.factories import T0, make_case, make_point, make_service
+
+POLICY_TEXT = """We sell your personal data to data brokers.
+The office has a nice view of the river and the city.
+You cannot delete your account once it is created."""
+
+
+def test_case_label_texts() -> None:
+    cases = [make_case(1, "This service sells your data"), make_case(2, "You cannot delete your account")]
+    analyses = [(1, "Personal data is sold to brokers"), (1, ""), (2, "Accounts are kept forever")]
+    points = [make_point(i, case_id=case_id, analysis=analysis) for i, (case_id, analysis) in enumerate(analyses)]
+    services = [make_service(1, points=points)]
+    assert case_label_texts(cases=cases, services=services) == {
+        1: "This service sells your data\nPersonal data is sold to brokers",
+        2: "You cannot delete your account\nAccounts are kept forever",
+    }
+
+
+def test_summarize_documents(tmp_path: Path) -> None:
+    store = DocumentTextStore(store_dir=tmp_path / "documents")
+    content_hash = store.put(POLICY_TEXT)
+    store.write_index(
+        DocumentTextRecord(
+            document_id=doc_id,
+            service_id=1,
+            url="https://example.com",
+            content_hash=content_hash,
+            document_updated_at=T0,
+            fetched_at=T0,
+        )
+        for doc_id in (10, 11)
+    )
+    labels = {1: "This service sells your personal data", 2: "You cannot delete your account"}
+    vocabulary = TfidfVocabulary.fit([*POLICY_TEXT.splitlines(), *labels.values()], min_df=1, max_df=1)
+    summarizer = ExtractiveSummarizer(vocabulary=vocabulary, labels=labels, num_sentences=2)
+
+    summaries = list(summarize_documents(store=store, summarizer=summarizer))
+    assert [summary.document_id for summary in summaries] == [10, 11], "Expected a summary per document"
+    assert summaries[0].sentences == summaries[1].sentences
+    assert [(sent.text, sent.case_id) for sent in summaries[0].sentences] == [
+        ("We sell your personal data to data brokers.", 1),
+        ("You cannot delete your account once it is created.", 2),
+    ]
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from src.data.tosdr import (
+    Service,
+    ServiceHeader,
+    ServiceMetadata,
+    merge_services_snapshot,
+    plan_services_sync,
+    read_services_headers,
+    read_services_timestamps,
+)
+from src.utils.file_utils import iter_ndjson_gz_models, write_pydantic_models_ndjson_gz
+from tests.factories import T0, T1, make_service
+
+
+@pytest.fixture
+def previous_services_file(tmp_path: Path) -> Path:
+    fp = tmp_path / "all_services.ndjson.gz"
+    write_pydantic_models_ndjson_gz(models=[make_service(serv_id, name="old") for serv_id in (1, 2, 3)], output_file=fp)
+    return fp
+
+
+def test_read_services_timestamps(previous_services_file: Path, tmp_path: Path) -> None:
+    assert read_services_timestamps(services_file=previous_services_file) == {1: T0, 2: T0, 3: T0}
+    assert read_services_timestamps(services_file=tmp_path / "missing.ndjson.gz") == {}
+
+
+def test_plan_services_sync() -> None:
+    plan = plan_services_sync(current={1: T0, 2: T1, 4: T0}, previous={1: T0, 2: T0, 3: T0})
+    assert sorted(plan.fetch_ids) == [2, 4], "Expected updated and new services to be fetched"
+    assert plan.keep_ids == {1}
+    assert plan.removed_ids == {3}
+
+
+def test_plan_services_sync_order() -> None:
+    plan = plan_services_sync(current={1: T0, 2: T1, 3: T1 + timedelta(days=1)}, previous={1: T0 - timedelta(days=1)})
+    assert plan.fetch_ids == [3, 2, 1], "Expected most recently updated services to be fetched first"
+
+
+def test_read_services_headers(tmp_path: Path) -> None:
+    metadata_file = tmp_path / "all_services_metadata.ndjson.gz"
+    serv_meta = ServiceMetadata.model_validate(
+        {"id": 1, "name": "Renamed", "rating": {"human": "A"}, "created_at": T0, "updated_at": T1}
+    )
+    write_pydantic_models_ndjson_gz(models=[serv_meta], output_file=metadata_file)
+    assert read_services_headers(metadata_file=metadata_file) == {1: ServiceHeader(id=1, name="Renamed", updated_at=T1)}
+
+
+def test_merge_services_snapshot(previous_services_file: Path) -> None:
+    plan = plan_services_sync(current={1: T0, 2: T1, 4: T1}, previous={1: T0, 2: T0, 3: T0})
+    fetched = [make_service(4, name="new", updated_at=T1)]  # service 2 failed to be fetched
+    count = merge_services_snapshot(
+        previous_file=previous_services_file, fetched_services=fetched, plan=plan, output_file=previous_services_file
+    )
+
+    services = {serv.id: serv for batch in iter_ndjson_gz_models(previous_services_file, Service) for serv in batch}
+    assert count == len(services) == 3  # noqa: PLR2004
+    assert services.keys() == {1, 2, 4}, "Expected removed service to be dropped and failed one to be kept"
+    assert services[4].name == "new"
+    assert services[2].updated_at == T0, "Expected previous version of service failed to be fetched"
+
+
+def test_merge_services_snapshot_headers(previous_services_file: Path, tmp_path: Path) -> None:
+    headers = {serv_id: ServiceHeader(id=serv_id, name=f"renamed {serv_id}", updated_at=T0) for serv_id in (1, 2)}
+    headers[3] = ServiceHeader(id=3, name="new", updated_at=T1)
+    plan = plan_services_sync(current={1: T0, 2: T0, 3: T1}, previous={1: T0, 2: T0, 3: T0}, headers=headers)
+    assert plan.headers.keys() == {1, 2}, "Expected headers of the kept services only"
+
+    output_file = tmp_path / "new_services.ndjson.gz"
+    merge_services_snapshot(
+        previous_file=previous_services_file, fetched_services=[], plan=plan, output_file=output_file
+    )
+    services = {serv.id: serv for batch in iter_ndjson_gz_models(output_file, Service) for serv in batch}
+    assert services[1].name == "renamed 1", "Expected kept services to be refreshed from the metadata pages"
+    assert services[3].name == "old", "Expected failed services to keep their previous version"
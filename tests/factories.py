@@ -0,0 +1,76 @@
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+from src.data.tosdr import Case, CasePoint, Service
+
+T0 = datetime(2023, 1, 1, tzinfo=timezone.utc)
+T1 = T0 + timedelta(days=1)
+
+
+def make_point(  # noqa: PLR0913
+    point_id: int,
+    case_id: int,
+    status: str = "approved",
+    document_id: None | int = None,
+    title: None | str = None,
+    analysis: str = "",
+) -> dict:
+    return {
+        "id": point_id,
+        "title": title or f"point {point_id}",
+        "status": status,
+        "analysis": analysis,
+        "case_id": case_id,
+        "document_id": document_id,
+        "created_at": T0,
+        "updated_at": T0,
+    }
+
+
+def make_document(
+    document_id: int,
+    url: str = "https://example.com",
+    name: str = "Terms",
+    xpath: None | str = None,
+    updated_at: datetime = T0,
+) -> dict:
+    return {"id": document_id, "name": name, "url": url, "xpath": xpath, "created_at": T0, "updated_at": updated_at}
+
+
+def make_service(  # noqa: PLR0913
+    service_id: int,
+    points: Sequence[dict] = (),
+    documents: None | Sequence[dict] = None,
+    name: None | str = None,
+    urls: Sequence[str] = ("example.com",),
+    updated_at: datetime = T0,
+) -> Service:
+    """A service with a single terms document unless `documents` are given"""
+    return Service.model_validate(
+        {
+            "id": service_id,
+            "name": name or f"service {service_id}",
+            "points": list(points),
+            "urls": list(urls),
+            "documents": [make_document(service_id)] if documents is None else list(documents),
+            "created_at": T0,
+            "updated_at": updated_at,
+        }
+    )
+
+
+def make_case(case_id: int, title: str = "", description: str = "", rating: str = "bad") -> Case:
+    return Case.model_validate(
+        {
+            "id": case_id,
+            "title": title or f"case {case_id}",
+            "description": description,
+            "classification": {"human": rating},
+            "created_at": T0,
+            "updated_at": T0,
+        }
+    )
+
+
+def make_case_point(case_id: int, quote: str, service_name: str = "s", status: str = "approved") -> CasePoint:
+    return CasePoint.model_validate({"case_id": case_id, "Service": service_name, "Title": quote, "Status": status})
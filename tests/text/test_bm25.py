@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.text.bm25 import BM25Index
+
+TEXTS = {
+    "sell": "We sell your personal data to advertisers.",
+    "delete": "You can delete your account at any time.",
+    "cookies": "We use cookies and tracking pixels. Cookies track you.",
+}
+
+
+def test_search() -> None:
+    index = BM25Index()
+    index.add_many(TEXTS.items())
+    assert [key for key, _ in index.search("tracking pixels", top_k=3)] == ["cookies"], "Expected only matches"
+    assert index.search("data sold to advertisers")[0][0] == "sell"
+    assert index.search("unknown words only") == []
+    assert index.scores("account").shape == (len(TEXTS),)
+    with pytest.raises(ValueError, match="already indexed"):
+        index.add("sell", "again")
+
+
+def test_save_load_memory_mapped(tmp_path: Path) -> None:
+    index = BM25Index(k1=1.5)
+    index.add_many(TEXTS.items())
+    index.save(tmp_path / "index")
+
+    loaded = BM25Index.load(tmp_path / "index")
+    assert isinstance(loaded._postings_docs, np.memmap), "Expected postings to be memory-mapped"
+    assert loaded.k1 == 1.5  # noqa: PLR2004
+    assert loaded.keys == list(TEXTS)
+    assert np.allclose(loaded.scores("delete your cookies"), index.scores("delete your cookies"))
+
+
+def test_incremental_updates(tmp_path: Path) -> None:
+    index = BM25Index()
+    index.add_many(list(TEXTS.items())[:2])
+    index.save(tmp_path / "index")
+
+    loaded = BM25Index.load(tmp_path / "index")
+    loaded.add("cookies", TEXTS["cookies"])
+    assert "cookies" in loaded
+    assert loaded.search("cookies")[0][0] == "cookies", "Expected texts added after loading to be searched"
+    loaded.save(tmp_path / "index")
+
+    full = BM25Index()
+    full.add_many(TEXTS.items())
+    reloaded = BM25Index.load(tmp_path / "index")
+    assert reloaded.keys == full.keys
+    assert np.allclose(reloaded.scores("cookies delete data"), full.scores("cookies delete data"))
+
+
+def test_remove(tmp_path: Path) -> None:
+    index = BM25Index()
+    index.add_many(TEXTS.items())
+    index.save(tmp_path / "index")
+
+    loaded = BM25Index.load(tmp_path / "index")
+    loaded.remove("sell")
+    loaded.add("sell", "We never sell anything.")
+    with pytest.raises(ValueError, match="not indexed"):
+        loaded.remove("unknown")
+    expected = BM25Index()
+    expected.add_many([("delete", TEXTS["delete"]), ("cookies", TEXTS["cookies"]), ("sell", "We never sell anything.")])
+    assert loaded.keys == expected.keys, "Expected a replaced text to move to the end"
+    assert np.allclose(loaded.scores("sell your data cookies"), expected.scores("sell your data cookies"))
+    assert loaded.search("advertisers") == [], "Expected removed texts to be left out"
+
+    loaded.save(tmp_path / "index")
+    reloaded = BM25Index.load(tmp_path / "index")
+    assert len(reloaded) == len(TEXTS)
+    assert reloaded.keys == expected.keys
+    assert np.allclose(reloaded.scores("sell your data cookies"), expected.scores("sell your data cookies"))
+    assert "advertisers" not in reloaded._terms, "Expected the postings of removed texts to be dropped"
@@ -0,0 +1,81 @@
+from itertools import pairwise
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.text.chunker import ChunkCache, TextChunker, chunk_texts, split_sentences
+
+POLICY_TEXT = """1. Introduction
+This policy explains how Acme Inc. uses your data, e.g. logs. We collect it! Do we sell it? No.
+2. Retention
+We keep logs for 30 days. We share data with partners such as Google Ltd. for analytics. You may opt out."""
+
+
+def test_split_sentences() -> None:
+    sentences = [POLICY_TEXT[start:end] for start, end in split_sentences(POLICY_TEXT)]
+    assert sentences[:3] == [
+        "1. Introduction",
+        "This policy explains how Acme Inc. uses your data, e.g. logs.",
+        "We collect it!",
+    ], "Expected abbreviations and enumerators not to end sentences"
+    assert "No." in sentences, "Expected line breaks to end sentences"
+    assert len(sentences) == 9  # noqa: PLR2004
+
+
+def test_chunker_limits_and_overlap() -> None:
+    chunker = TextChunker(max_tokens=24, overlap_tokens=6)
+    chunks = chunker.chunk(POLICY_TEXT)
+    assert all(chunk.token_count <= chunker.max_tokens for chunk in chunks)
+    assert all(chunk.token_count == chunker.tokenizer.count(chunk.get_text(POLICY_TEXT)) for chunk in chunks)
+    assert chunks[0].start == 0
+    assert chunks[-1].end == len(POLICY_TEXT), "Expected the whole text to be covered"
+    assert all(
+        not POLICY_TEXT[prev.end : nxt.start].strip() for prev, nxt in pairwise(chunks)
+    ), "Expected no text left out between chunks"
+    assert any(prev.end > nxt.start for prev, nxt in pairwise(chunks)), "Expected overlapping chunks"
+
+
+def test_chunker_breaks_at_sections() -> None:
+    text = "This first sentence has exactly ten tokens in it.\nSection 2\nThe next one is short."
+    chunks = TextChunker(max_tokens=20, overlap_tokens=5).chunk(text)
+    assert [chunk.get_text(text) for chunk in chunks] == [
+        "This first sentence has exactly ten tokens in it.",
+        "Section 2\nThe next one is short.",
+    ], "Expected a new chunk without overlap at a section heading"
+
+
+def test_chunker_splits_long_sentence() -> None:
+    text = " ".join(f"w{i}" for i in range(25))
+    chunks = TextChunker(max_tokens=10, overlap_tokens=2).chunk(text)
+    assert [chunk.token_count for chunk in chunks] == [10, 10, 9]
+    assert chunks[1].get_text(text).startswith("w8 "), "Expected token overlap between cut chunks"
+
+
+def test_chunk_texts_cache(tmp_path: Path, mocker: MockFixture) -> None:
+    chunker = TextChunker(max_tokens=24, overlap_tokens=6)
+    texts = [POLICY_TEXT, "Short text.", POLICY_TEXT]
+    cache = ChunkCache(db_file=tmp_path / "chunks.sqlite3")
+
+    expected = [chunker.chunk(text) for text in texts]
+    assert list(chunk_texts(texts=texts, chunker=chunker, cache=cache, batch_size=2)) == expected
+
+    chunk_spy = mocker.spy(chunker, "chunk_spans")
+    assert list(chunk_texts(texts=texts, chunker=chunker, cache=cache)) == expected
+    chunk_spy.assert_not_called()
+
+    other_chunker = TextChunker(max_tokens=100, overlap_tokens=0)
+    assert list(chunk_texts(texts=texts[:1], chunker=other_chunker, cache=cache)) == [
+        other_chunker.chunk(POLICY_TEXT)
+    ], "Expected chunks of other parameters not to be reused"
+
+
+def test_chunk_texts_processes() -> None:
+    chunker = TextChunker(max_tokens=24, overlap_tokens=6)
+    texts = [POLICY_TEXT, "Short text."] * 4
+    assert list(chunk_texts(texts=texts, chunker=chunker, processes=2)) == [chunker.chunk(text) for text in texts]
+
+
+def test_chunker_invalid_overlap() -> None:
+    with pytest.raises(ValueError, match="overlap_tokens"):
+        TextChunker(max_tokens=10, overlap_tokens=10)
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.text.dedup import MinHasher, MinHashLSH
+
+BOILERPLATE = (
+    "We may share your personal information with third parties for advertising purposes. By using the service you "
+    "agree that we can change these terms at any time without notice."
+)
+TEXTS = {
+    "a": BOILERPLATE,
+    "b": "Unrelated: the service deletes your account and all associated data when you ask for it.",
+    "c": BOILERPLATE.replace("advertising", "marketing"),
+    "d": BOILERPLATE.upper(),
+    "e": "  ".join(BOILERPLATE.split()),
+}
+
+
+def test_minhasher_similarity() -> None:
+    hasher = MinHasher()
+    signatures = dict(zip(TEXTS, hasher.signatures(TEXTS.values()), strict=True))
+    assert signatures["a"].dtype == np.uint32
+    assert (signatures["a"] == signatures["d"]).all(), "Expected case and whitespace to be ignored"
+    assert (signatures["a"] == signatures["e"]).all()
+    assert (signatures["a"] == signatures["c"]).mean() > 0.8  # noqa: PLR2004
+    assert (signatures["a"] == signatures["b"]).mean() < 0.2  # noqa: PLR2004
+    assert (hasher.signature("") == np.iinfo(np.uint32).max).all()
+    assert (MinHasher().signature(BOILERPLATE) == signatures["a"]).all(), "Expected signatures to be reproducible"
+
+
+def test_minhasher_long_text() -> None:
+    hasher = MinHasher(num_perm=16)
+    text = " ".join(f"word{i}" for i in range(5000))
+    assert len(hasher.shingles(text)) > 4096, "Expected shingles to be hashed in several blocks"  # noqa: PLR2004
+    assert (hasher.signature(text) == hasher.signatures([text])[0]).all()
+
+
+def test_lsh_clusters_and_canonical() -> None:
+    hasher = MinHasher()
+    index = MinHashLSH(threshold=0.7)
+    index.add_many(TEXTS, hasher.signatures(TEXTS.values()))
+    clusters = index.clusters()
+    assert len(clusters) == 1
+    assert clusters[0].canonical == "a", "Expected the earliest indexed text to be canonical"
+    assert sorted(clusters[0].members) == ["a", "c", "d", "e"]
+    assert index.canonical("c") == "a"
+    assert index.canonical("b") == "b"
+    assert index.query(hasher.signature(BOILERPLATE)) == ["a", "c"], "Expected identical copies to be returned once"
+    with pytest.raises(ValueError, match="already indexed"):
+        index.add("a", hasher.signature(BOILERPLATE))
+
+
+def test_lsh_incremental_save_load(tmp_path: Path) -> None:
+    hasher = MinHasher()
+    index = MinHashLSH(threshold=0.7)
+    index.add("a", hasher.signature(TEXTS["a"]))
+    index.add("b", hasher.signature(TEXTS["b"]))
+    assert not index.clusters()
+
+    index_file = tmp_path / "index.npz"
+    index.save(index_file)
+    loaded = MinHashLSH.load(index_file)
+    assert len(loaded) == len(index)
+    assert loaded.threshold == index.threshold
+    assert "a" in loaded
+
+    loaded.add("c", hasher.signature(TEXTS["c"]))
+    assert [cluster.members for cluster in loaded.clusters()] == [["a", "c"]], "Expected new texts to join clusters"
+
+
+def test_lsh_invalid_params() -> None:
+    with pytest.raises(ValueError, match="divide"):
+        MinHashLSH(num_perm=128, num_bands=10)
+    with pytest.raises(ValueError, match="signature"):
+        MinHashLSH(num_perm=128).add("a", np.zeros(64, dtype=np.uint32))
+
+
+def test_lsh_subset() -> None:
+    hasher = MinHasher()
+    index = MinHashLSH(threshold=0.7)
+    for key in ("a", "b", "c"):
+        index.add(key, hasher.signature(TEXTS[key]))
+    assert list(index) == ["a", "b", "c"]
+
+    subset = index.subset(["c", "b"])
+    assert list(subset) == ["b", "c"], "Expected the insertion order to be kept"
+    assert not subset.clusters(), "Expected clusters without the dropped keys"
+    assert subset.query(hasher.signature(TEXTS["a"])) == ["c"]
@@ -0,0 +1,55 @@
+import pytest
+
+from src.text.summarizer import ExtractiveSummarizer, summarize_texts
+from src.text.tfidf import TfidfVocabulary
+
+TEXT = """Terms of Service
+We collect your personal data when you use the service.
+Your personal data is shared with third party advertisers.
+We share your personal data with advertisers for targeted advertising.
+The weather in the office was usually nice.
+You can delete your account and personal data at any time."""
+
+LABELS = {
+    1: "Your personal data is shared with advertisers",
+    2: "You can delete your account",
+}
+
+
+@pytest.fixture
+def vocabulary() -> TfidfVocabulary:
+    return TfidfVocabulary.fit([*TEXT.splitlines(), *LABELS.values()], min_df=1, max_df=1)
+
+
+def test_summarize_ranks_central_sentences(vocabulary: TfidfVocabulary) -> None:
+    summary = ExtractiveSummarizer(vocabulary=vocabulary, num_sentences=2).summarize(TEXT)
+    texts = [sent.get_text(TEXT) for sent in summary]
+    assert len(texts) == 2  # noqa: PLR2004
+    assert "The weather in the office was usually nice." not in texts
+    assert "Terms of Service" not in texts, "Expected sentences shorter than min_sentence_tokens to be skipped"
+    assert [sent.start for sent in summary] == sorted(sent.start for sent in summary), "Expected text order"
+    assert all(sent.label is None for sent in summary)
+
+
+def test_summarize_labels(vocabulary: TfidfVocabulary) -> None:
+    summarizer = ExtractiveSummarizer(vocabulary=vocabulary, labels=LABELS, num_sentences=5)
+    labels = {sent.get_text(TEXT): sent.label for sent in summarizer.summarize(TEXT)}
+    assert labels["You can delete your account and personal data at any time."] == 2  # noqa: PLR2004
+    assert labels["Your personal data is shared with third party advertisers."] == 1
+    assert labels["The weather in the office was usually nice."] is None
+    assert summarizer.summarize("") == []
+
+
+def test_centroid_ranking_of_long_texts(vocabulary: TfidfVocabulary) -> None:
+    textrank = ExtractiveSummarizer(vocabulary=vocabulary, num_sentences=1).summarize(TEXT)
+    centroid = ExtractiveSummarizer(vocabulary=vocabulary, num_sentences=1, max_textrank_sentences=2).summarize(TEXT)
+    assert "weather" not in textrank[0].get_text(TEXT)
+    assert "weather" not in centroid[0].get_text(TEXT)
+
+
+def test_summarize_texts_in_processes(vocabulary: TfidfVocabulary) -> None:
+    summarizer = ExtractiveSummarizer(vocabulary=vocabulary, labels=LABELS)
+    texts = [TEXT, "", TEXT.lower()]
+    expected = list(summarizer.summarize_many(texts))
+    assert list(summarize_texts(texts, summarizer=summarizer, processes=2, batch_size=2)) == expected
+    assert list(summarize_texts(texts, summarizer=summarizer)) == expected
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.text.tfidf import TfidfVocabulary
+
+CORPUS = [
+    "We share your data with advertisers.",
+    "We never share your data.",
+    "You can delete your account.",
+    "Your account is deleted after a year.",
+]
+
+
+def test_fit_drops_rare_and_common_terms() -> None:
+    vocabulary = TfidfVocabulary.fit(CORPUS, min_df=2, max_df=0.9)
+    assert set(vocabulary.terms) == {"we", "share", "data", "account"}, "Expected 'your' in every text to be dropped"
+    assert vocabulary.idf.shape == (len(vocabulary),)
+
+
+def test_transform_unit_rows() -> None:
+    vocabulary = TfidfVocabulary.fit(CORPUS, min_df=1)
+    matrix = vocabulary.transform([*CORPUS, "nothing known here"])
+    assert matrix.shape == (len(CORPUS) + 1, len(vocabulary))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    assert norms[:-1] == pytest.approx(1)
+    assert norms[-1] == 0, "Expected a zero row for a text without known terms"
+    similarities = (matrix @ matrix.T).toarray()
+    assert similarities[0, 1] > similarities[0, 2], "Expected texts sharing terms to be more similar"
+
+
+def test_save_load(tmp_path: Path) -> None:
+    vocabulary = TfidfVocabulary.fit(CORPUS, min_df=1)
+    vocabulary.save(tmp_path / "vocabulary.json")
+    loaded = TfidfVocabulary.load(tmp_path / "vocabulary.json")
+    assert loaded.terms == vocabulary.terms
+    assert (loaded.transform(CORPUS) != vocabulary.transform(CORPUS)).nnz == 0
@@ -0,0 +1,9 @@
+from src.text.tokenizer import RegexTokenizer
+
+
+def test_regex_tokenizer() -> None:
+    tokenizer = RegexTokenizer()
+    text = "We don't sell Data."
+    assert tokenizer.tokenize(text) == ["we", "don", "'", "t", "sell", "data", "."]
+    assert tokenizer.count(text) == 7  # noqa: PLR2004
+    assert [text[start:end] for start, end in tokenizer.spans(text)][-2:] == ["Data", "."]
@@ -0,0 +1,68 @@
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from src.utils.checkpoint import CrawlCheckpoint, get_checkpoint_file
+
+
+class SampleModel(BaseModel):
+    pos: int
+
+
+@pytest.fixture
+def output_file(tmp_path: Path) -> Path:
+    return tmp_path / "sample.ndjson.gz"
+
+
+def test_checkpoint_resume(output_file: Path) -> None:
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel) as checkpoint:
+        checkpoint.record_success(item_id=1, results=[SampleModel(pos=1), SampleModel(pos=2)])
+        checkpoint.record_failure(item_id=2, error=ValueError("failed"))
+    assert get_checkpoint_file(output_file=output_file).exists(), "Expected checkpoint file next to output file"
+
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel, resume=True) as checkpoint:
+        assert checkpoint.done_ids == {1}
+        assert checkpoint.failed_ids == {2}
+        checkpoint.record_success(item_id=2, results=[SampleModel(pos=3)])
+        assert checkpoint.failed_ids == set(), "Expected retried id to not be failed anymore"
+        assert [mod.pos for mod in checkpoint.iter_results()] == [1, 2, 3]
+
+
+def test_checkpoint_without_resume_starts_over(output_file: Path) -> None:
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel) as checkpoint:
+        checkpoint.record_success(item_id=1, results=[SampleModel(pos=1)])
+
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel) as checkpoint:
+        assert checkpoint.done_ids == set()
+        assert list(checkpoint.iter_results()) == []
+
+
+def test_checkpoint_ignores_truncated_entry(output_file: Path) -> None:
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel) as checkpoint:
+        checkpoint.record_success(item_id=1, results=[SampleModel(pos=1)])
+    with checkpoint.path.open("a") as f:
+        f.write('{"id": 2, "error": null, "res')
+
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel, resume=True) as checkpoint:
+        assert checkpoint.done_ids == {1}
+        checkpoint.record_success(item_id=3, results=[SampleModel(pos=3)])
+        assert [mod.pos for mod in checkpoint.iter_results()] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_record_all(output_file: Path) -> None:
+    async def _results() -> AsyncIterator[tuple[int, SampleModel | list[SampleModel] | BaseException]]:
+        yield 1, SampleModel(pos=1)
+        yield 2, RuntimeError("failed")
+        yield 3, [SampleModel(pos=3), SampleModel(pos=4)]
+
+    with CrawlCheckpoint(output_file=output_file, model_type=SampleModel) as checkpoint:
+        await checkpoint.record_all(item_results=_results())
+        assert checkpoint.done_ids == {1, 3}
+        assert checkpoint.failed_ids == {2}
+        assert [mod.pos for mod in checkpoint.iter_results()] == [1, 3, 4]
+
+    checkpoint.remove()
+    assert not checkpoint.path.exists()
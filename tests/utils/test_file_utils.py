@@ -1,10 +1,20 @@
-from collections.abc import Generator
+from collections.abc import AsyncIterator, Generator
 from pathlib import Path
 
 import pytest
 from pydantic import BaseModel
 
-from src.utils.file_utils import read_ndjson_gz, write_ndjson_gz, write_pydantic_models_ndjson_gz
+from src.utils.file_utils import (
+    NdjsonGzWriter,
+    async_write_pydantic_models_ndjson_gz,
+    iter_ndjson_gz,
+    iter_ndjson_gz_models,
+    iter_ndjson_gz_projections,
+    read_ndjson_gz,
+    read_ndjson_gz_field,
+    write_ndjson_gz,
+    write_pydantic_models_ndjson_gz,
+)
 
 
 class SampleModel(BaseModel):
@@ -42,3 +52,74 @@ def test_write_pydantic_models_ndjson_gz(
     assert sample_output_ndjson_gz_file.exists(), f"Expected file {sample_output_ndjson_gz_file}"
     data = read_ndjson_gz(input_path=sample_output_ndjson_gz_file)
     assert sample_ndjson == data, "Expected data read from gz ndjson file to be the same"
+
+
+@pytest.mark.asyncio
+async def test_async_write_pydantic_models_ndjson_gz(
+    sample_models: list[BaseModel], sample_ndjson: list[dict], sample_output_ndjson_gz_file: Path
+) -> None:
+    async def _models() -> AsyncIterator[BaseModel]:
+        for mod in sample_models:
+            yield mod
+
+    count = await async_write_pydantic_models_ndjson_gz(models=_models(), output_file=sample_output_ndjson_gz_file)
+    assert count == len(sample_models), f"Expected {len(sample_models)} written models"
+    data = read_ndjson_gz(input_path=sample_output_ndjson_gz_file)
+    assert sample_ndjson == data, "Expected data read from gz ndjson file to be the same"
+
+
+def test_ndjson_gz_writer_is_atomic(sample_ndjson: list[dict], sample_output_ndjson_gz_file: Path) -> None:
+    write_ndjson_gz(data=sample_ndjson, output_file=sample_output_ndjson_gz_file)
+
+    with pytest.raises(RuntimeError), NdjsonGzWriter(output_file=sample_output_ndjson_gz_file) as writer:
+        writer.write({"pos": 3})
+        raise RuntimeError("interrupted")
+
+    assert not writer.tmp_file.exists(), "Expected temporary file to be removed on failure"
+    data = read_ndjson_gz(input_path=sample_output_ndjson_gz_file)
+    assert sample_ndjson == data, "Expected previous file to be untouched by a failed write"
+
+
+@pytest.mark.parametrize("compress_level", [0, 9])
+def test_ndjson_gz_writer_compress_level(
+    sample_ndjson: list[dict], sample_output_ndjson_gz_file: Path, compress_level: int
+) -> None:
+    count = write_ndjson_gz(
+        data=sample_ndjson, output_file=sample_output_ndjson_gz_file, compress_level=compress_level, buffer_size=16
+    )
+    assert count == len(sample_ndjson), f"Expected {len(sample_ndjson)} written records"
+    data = read_ndjson_gz(input_path=sample_output_ndjson_gz_file)
+    assert sample_ndjson == data, "Expected data read from gz ndjson file to be the same"
+
+
+def test_ndjson_gz_writer_invalid_suffix(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match=".ndjson.gz"):
+        NdjsonGzWriter(output_file=tmp_path / "sample.json")
+
+
+@pytest.fixture
+def sample_nested_ndjson_gz_file(sample_output_ndjson_gz_file: Path) -> Path:
+    data = [{"pos": pos, "name": f"name_{pos}", "nested": {"pos": [pos]}} for pos in range(5)]
+    write_ndjson_gz(data=data, output_file=sample_output_ndjson_gz_file)
+    return sample_output_ndjson_gz_file
+
+
+def test_iter_ndjson_gz(sample_ndjson: list[dict], sample_output_ndjson_gz_file: Path) -> None:
+    write_ndjson_gz(data=sample_ndjson, output_file=sample_output_ndjson_gz_file)
+    assert list(iter_ndjson_gz(input_path=sample_output_ndjson_gz_file, batch_size=1)) == sample_ndjson
+
+
+def test_iter_ndjson_gz_models(sample_nested_ndjson_gz_file: Path) -> None:
+    batches = list(iter_ndjson_gz_models(input_path=sample_nested_ndjson_gz_file, model_type=SampleModel, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1], "Expected records to be read in batches of 2"
+    assert [mod.pos for batch in batches for mod in batch] == list(range(5))
+    assert all(isinstance(mod, SampleModel) for batch in batches for mod in batch), "Expected SampleModel models"
+
+
+def test_iter_ndjson_gz_projections(sample_nested_ndjson_gz_file: Path) -> None:
+    batches = list(iter_ndjson_gz_projections(input_path=sample_nested_ndjson_gz_file, fields=("pos", "name")))
+    assert batches == [[{"pos": pos, "name": f"name_{pos}"} for pos in range(5)]], "Expected only projected fields"
+
+
+def test_read_ndjson_gz_field(sample_nested_ndjson_gz_file: Path) -> None:
+    assert read_ndjson_gz_field(input_path=sample_nested_ndjson_gz_file, field="pos", batch_size=3) == list(range(5))
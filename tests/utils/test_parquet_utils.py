@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.utils.parquet_utils import ParquetDatasetWriter, read_parquet_columns
+
+SCHEMA = pa.schema([pa.field("id", pa.int64(), nullable=False), pa.field("name", pa.string())])
+
+
+def test_parquet_dataset_writer_row_groups(tmp_path: Path) -> None:
+    output_dir = tmp_path / "table"
+    with ParquetDatasetWriter(output_dir=output_dir, schema=SCHEMA, row_group_size=2, max_rows_per_file=4) as writer:
+        writer.write_many({"id": i, "name": f"n{i}"} for i in range(10))
+        assert not output_dir.exists(), "Expected the dataset to only appear once fully written"
+
+    assert writer.count == 10  # noqa: PLR2004
+    part_files = sorted(output_dir.glob("*.parquet"))
+    assert len(part_files) == 3, "Expected a new part file every 4 rows"  # noqa: PLR2004
+    assert pq.ParquetFile(part_files[0]).num_row_groups == 2, "Expected row groups of 2 rows"  # noqa: PLR2004
+    table = read_parquet_columns(input_dir=output_dir, columns=["id"])
+    assert table.column_names == ["id"]
+    assert sorted(table.column("id").to_pylist()) == list(range(10))
+
+
+def test_parquet_dataset_writer_empty(tmp_path: Path) -> None:
+    with ParquetDatasetWriter(output_dir=tmp_path / "table", schema=SCHEMA):
+        pass
+    table = read_parquet_columns(input_dir=tmp_path / "table")
+    assert table.num_rows == 0
+    assert table.schema.names == SCHEMA.names, "Expected an empty dataset to keep its schema"
+
+
+def test_parquet_dataset_writer_failure_keeps_previous(tmp_path: Path) -> None:
+    output_dir = tmp_path / "table"
+    with ParquetDatasetWriter(output_dir=output_dir, schema=SCHEMA) as writer:
+        writer.write({"id": 1, "name": "old"})
+
+    with pytest.raises(RuntimeError), ParquetDatasetWriter(output_dir=output_dir, schema=SCHEMA) as writer:
+        writer.write({"id": 2, "name": "new"})
+        raise RuntimeError("failed")
+
+    assert read_parquet_columns(input_dir=output_dir).to_pylist() == [{"id": 1, "name": "old"}]
+    assert not (tmp_path / ".table.tmp").exists(), "Expected the temporary dataset to be removed"
+
+
+def test_parquet_dataset_writer_replaces_previous(tmp_path: Path) -> None:
+    output_dir = tmp_path / "table"
+    for name in ("old", "new"):
+        with ParquetDatasetWriter(output_dir=output_dir, schema=SCHEMA) as writer:
+            writer.write({"id": 1, "name": name})
+    assert read_parquet_columns(input_dir=output_dir).to_pylist() == [{"id": 1, "name": "new"}]
+    assert not (tmp_path / ".table.old").exists(), "Expected the previous dataset to be deleted after the replace"
+
+    # state left by a crash between renaming the previous dataset aside and moving the new one in place
+    output_dir.replace(tmp_path / ".table.old")
+    ParquetDatasetWriter(output_dir=output_dir, schema=SCHEMA).open().close(commit=False)
+    assert read_parquet_columns(input_dir=output_dir).to_pylist() == [{"id": 1, "name": "new"}]
+    assert not (tmp_path / ".table.old").exists()